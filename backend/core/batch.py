@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from backend.core.ingestion import IngestionPool
+from backend.core.orchestration import IngestResult, analyze_file, process_file
+from backend.core.recovery import iter_files
+from backend.services.ai_service import configure_batching
+from backend.services.db_service import claim_job, enqueue_job, get_due_retries, get_job
+from backend.utils.config import DATA_DIR
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = {".txt", ".msg", ".eml"}
+STAGES = ["claim", "extract", "analyse", "insert", "move"]
+
+def default_checkpoint_path(directory: Path) -> Path:
+    """Checkpoint file for a batch directory, kept in data/ so archives stay untouched."""
+    digest = hashlib.sha1(str(directory.resolve()).encode("utf-8")).hexdigest()[:10]
+    return DATA_DIR / "batch_checkpoints" / f"{directory.name}-{digest}.jsonl"
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class BatchIngestor:
+    """
+    Offline backfill of a directory of archived .txt/.msg/.eml files.
+
+    Files are run through process_file (or, with dry_run, only extracted and
+    analysed in place) by a bounded IngestionPool. Each finished file is
+    appended to a checkpoint so an interrupted run can resume where it
+    stopped, and a throughput report is built at the end.
+
+    Failed files that were requeued (their jobs stay QUEUED, often with the
+    file already in staging) are retried after the INGEST_RETRY_DELAY backoff
+    before the run returns, until they succeed or run out of attempts. Files
+    that end up failed in staging are listed in the report.
+    """
+    def __init__(self, directory: Path, concurrency: int = 4, dry_run: bool = False,
+                 resume: bool = False, checkpoint_path: Optional[Path] = None,
+                 retry_delay: Optional[float] = None, retry_interval: Optional[float] = None):
+        self.directory = directory
+        self.concurrency = concurrency
+        self.dry_run = dry_run
+        self.resume = resume
+        self.checkpoint_path = checkpoint_path or default_checkpoint_path(directory)
+        # Priority: constructor arg > environment variable > default value
+        self.retry_delay = retry_delay
+        self.retry_interval = retry_interval or float(os.getenv("INGEST_RETRY_INTERVAL", "10"))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:batch"
+        self.results: List[IngestResult] = []
+        # Source file of each job this run created, and the latest result per job
+        self._jobs: Dict[int, Path] = {}
+        self._job_results: Dict[int, IngestResult] = {}
+        self.skipped = 0
+        self.elapsed = 0.0
+        self._checkpoint = None
+
+    def _load_checkpoint(self) -> Set[str]:
+        if not self.resume or not self.checkpoint_path.exists():
+            return set()
+        done = set()
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["file"])
+                except (ValueError, KeyError):
+                    continue  # Tolerate a line truncated by a crash
+        return done
+
+    async def _handle(self, item: Union[Path, Tuple[int, Path]]):
+        # Retries are queued as (job_id, source file); new files as their path
+        retry_of, file_path = item if isinstance(item, tuple) else (None, item)
+        job_id = retry_of
+        try:
+            if self.dry_run:
+                result = await analyze_file(file_path)
+            else:
+                if job_id is None:
+                    job_id = enqueue_job(str(file_path))
+                job = claim_job(job_id, self.worker_id)
+                if job is None:
+                    # The live service is already processing this file
+                    if retry_of is None:
+                        self.skipped += 1
+                    return
+                self._jobs[job_id] = file_path
+                # A requeued job's file is usually in staging by now
+                staging_path = job.get("staging_path")
+                source = Path(staging_path) if staging_path and Path(staging_path).exists() else file_path
+                result = await process_file(source, job_id=job_id)
+                result.file_path = file_path
+        except Exception as e:
+            result = IngestResult(file_path=file_path, error=str(e))
+        previous = self._job_results.get(job_id) if job_id is not None else None
+        if previous is not None:
+            # A retry replaces the file's earlier failure in the report
+            self.results[self.results.index(previous)] = result
+        else:
+            self.results.append(result)
+        if job_id is not None:
+            self._job_results[job_id] = result
+        if result.ok:
+            self._checkpoint.write(json.dumps({"file": str(file_path), "task_id": result.task_id}) + "\n")
+            self._checkpoint.flush()
+        else:
+            logger.warning(f"Failed: {file_path}: {result.error}")
+
+    async def run(self) -> Dict[str, Any]:
+        """Processes every supported file in the directory and returns the report."""
+        done = self._load_checkpoint()
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        self._checkpoint = open(self.checkpoint_path, 'a' if self.resume else 'w', encoding='utf-8')
+
+        # max_in_flight is passed too, so INGEST_MAX_IN_FLIGHT cannot cap --concurrency
+        pool = IngestionPool(self._handle, workers=self.concurrency, max_in_flight=self.concurrency,
+                             high_water=self.concurrency * 4, low_water=self.concurrency)
+        pool.start(asyncio.get_running_loop())
+        configure_batching(lambda: pool.stats()["queue_depth"], self.concurrency)
+        started = time.perf_counter()
+        try:
+            for file_path in iter_files(self.directory):
+                if file_path.suffix.lower() not in SUPPORTED_SUFFIXES:
+                    continue
+                if str(file_path) in done:
+                    self.skipped += 1
+                    continue
+                await pool.put(file_path)
+            await pool.join()
+            await self._drain_retries(pool)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            configure_batching(None)
+            pool.stop()
+            self._checkpoint.close()
+        return self.report()
+
+    def _requeued_jobs(self) -> List[int]:
+        """This run's failed jobs that are queued for another attempt."""
+        requeued = []
+        for job_id, result in self._job_results.items():
+            if not result.ok:
+                job = get_job(job_id)
+                if job is not None and job["state"] == "QUEUED":
+                    requeued.append(job_id)
+        return requeued
+
+    async def _drain_retries(self, pool: IngestionPool):
+        """Retries this run's requeued jobs once their backoff has passed, until none are left."""
+        while True:
+            requeued = await asyncio.to_thread(self._requeued_jobs)
+            if not requeued:
+                return
+            logger.info(f"Waiting to retry {len(requeued)} failed files.")
+            await asyncio.sleep(self.retry_interval)
+            # Chunked to stay under SQLite's limit on query parameters
+            for start in range(0, len(requeued), 500):
+                chunk = requeued[start:start + 500]
+                for job in await asyncio.to_thread(get_due_retries, self.retry_delay, len(chunk), chunk):
+                    await pool.put((job["id"], self._jobs[job["id"]]))
+            await pool.join()
+
+    def _stranded(self) -> List[Dict[str, Any]]:
+        """Failed files this run left in staging, where neither a rescan nor --resume finds them."""
+        stranded = []
+        for job_id, result in self._job_results.items():
+            job = get_job(job_id) if not result.ok else None
+            staging_path = job.get("staging_path") if job else None
+            if staging_path and Path(staging_path).exists():
+                stranded.append({"file": str(result.file_path), "staging_path": staging_path, "error": result.error})
+        return stranded
+
+    def report(self) -> Dict[str, Any]:
+        """Summarises throughput, per-stage latency percentiles and failures."""
+        succeeded = [r for r in self.results if r.ok]
+        failed = [r for r in self.results if not r.ok]
+        stages = {}
+        for stage in STAGES:
+            values = [r.timings[stage] for r in self.results if stage in r.timings]
+            if values:
+                stages[stage] = {
+                    "count": len(values),
+                    "p50": percentile(values, 50),
+                    "p90": percentile(values, 90),
+                    "p99": percentile(values, 99),
+                    "max": max(values),
+                }
+        return {
+            "directory": str(self.directory),
+            "dry_run": self.dry_run,
+            "files": len(self.results),
+            "succeeded": len(succeeded),
+            "failed": len(failed),
+            "skipped": self.skipped,
+            "truncated": sum(1 for r in succeeded if r.truncated),
+            "fast_path": sum(1 for r in succeeded if r.fast_path),
+            "tokens_before": sum(r.tokens_before for r in self.results),
+            "tokens_after": sum(r.tokens_after for r in self.results),
+            "llm_tokens": sum(r.llm_tokens for r in self.results),
+            "deferred": sum(1 for r in self.results if r.deferred),
+            "elapsed_seconds": self.elapsed,
+            "files_per_second": len(self.results) / self.elapsed if self.elapsed else 0.0,
+            "stages": stages,
+            "failures": [{"file": str(r.file_path), "error": r.error} for r in failed],
+            "stranded": self._stranded(),
+        }
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Renders a batch report as plain text for the terminal."""
+    mode = " (dry run)" if report["dry_run"] else ""
+    lines = [
+        f"Batch ingest of {report['directory']}{mode}",
+        f"  Files: {report['files']} processed, {report['succeeded']} succeeded, "
+        f"{report['failed']} failed, {report['skipped']} skipped, {report['truncated']} truncated",
+        f"  Elapsed: {report['elapsed_seconds']:.1f}s ({report['files_per_second']:.2f} files/sec)",
+        f"  Fast path: {report['fast_path']} of {report['succeeded']} tasks routed by rules without a model call",
+        f"  Prompt tokens (est.): {report['tokens_before']} extracted, {report['tokens_after']} sent after stripping quotes and signatures",
+        f"  Model tokens used: {report['llm_tokens']} ({report['deferred']} files deferred by token budgets)",
+        "  Stage latency (seconds):",
+    ]
+    for stage, s in report["stages"].items():
+        lines.append(f"    {stage:<8} p50={s['p50']:.3f} p90={s['p90']:.3f} p99={s['p99']:.3f} max={s['max']:.3f} (n={s['count']})")
+    if report["failures"]:
+        lines.append("  Failures:")
+        for failure in report["failures"]:
+            lines.append(f"    {failure['file']}: {failure['error']}")
+    if report["stranded"]:
+        lines.append("  Left in staging (move back into the archive to retry):")
+        for stranded in report["stranded"]:
+            lines.append(f"    {stranded['file']} -> {stranded['staging_path']}")
+    return "\n".join(lines)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional
+from backend.utils.parsers import ExtractionBudget, ParsedContent, apply_budget, get_parser
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Times a file is resubmitted after another file's timeout restarted the process pool
+RESUBMIT_ATTEMPTS = 2
+
+class ExtractionTimeout(Exception):
+    """Raised when extracting a single file takes longer than the per-file timeout."""
+
+def extract_parsed(file_path: Path, budget: Optional[ExtractionBudget] = None) -> ParsedContent:
+    """
+    Parses a .txt, .msg or .eml file with the parser registry, bounded by
+    the extraction budget (read from the environment if not given).
+    Errors are logged and yield an empty body rather than raising.
+    """
+    parser = get_parser(file_path)
+    if parser is None:
+        return ParsedContent(subject=file_path.name, body=f"Unsupported file type: {file_path.suffix}")
+    budget = budget or ExtractionBudget.from_env()
+    try:
+        parsed = apply_budget(parser.extract(file_path, budget), budget)
+        if parsed.truncated:
+            logger.info(f"Truncated {file_path.name}: {len(parsed.body)} of {parsed.original_chars} characters kept")
+        return parsed
+    except Exception as e:
+        logger.error(f"Error extracting from {file_path}: {e}")
+        return ParsedContent(subject=file_path.name, body="")
+
+def extract_content(file_path: Path) -> tuple[str, str]:
+    """
+    Extracts subject and body from .txt, .msg, or .eml files.
+    Returns: (subject, body)
+    """
+    parsed = extract_parsed(file_path)
+    return parsed.subject, parsed.body
+
+class ExtractionExecutor:
+    """
+    Runs extract_parsed off the event loop.
+
+    .msg files and anything above the size threshold are parsed in a process
+    pool, since extract_msg is CPU-bound and holds the GIL; small text and
+    .eml files go to a thread pool. Each file has a timeout, and a process
+    pool stuck on a pathological file is torn down and rebuilt so it cannot
+    freeze ingestion. Other files that were being parsed in the torn-down
+    pool are resubmitted to the new one rather than failed.
+    """
+    def __init__(self, process_workers: Optional[int] = None,
+                 thread_workers: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 process_min_bytes: Optional[int] = None,
+                 budget: Optional[ExtractionBudget] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.process_workers = process_workers if process_workers is not None else int(os.getenv("EXTRACT_PROCESS_WORKERS", "2"))
+        self.thread_workers = thread_workers or int(os.getenv("EXTRACT_THREAD_WORKERS", "4"))
+        self.timeout = timeout or float(os.getenv("EXTRACT_TIMEOUT", "60"))
+        self.process_min_bytes = process_min_bytes if process_min_bytes is not None else int(os.getenv("EXTRACT_PROCESS_MIN_BYTES", str(1024 * 1024)))
+        self.budget = budget or ExtractionBudget.from_env()
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        # Bumped on every process pool reset, so callers can tell their pool was killed
+        self._generation = 0
+        self.resubmitted = 0
+
+    def _use_process_pool(self, file_path: Path) -> bool:
+        if self.process_workers <= 0:
+            return False
+        if file_path.suffix.lower() == '.msg':
+            return True
+        try:
+            return file_path.stat().st_size >= self.process_min_bytes
+        except OSError:
+            return False
+
+    def _get_executor(self, use_process: bool) -> Executor:
+        if use_process:
+            if self._process_pool is None:
+                # spawn avoids forking the watcher's threads and event loop
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="extract")
+        return self._thread_pool
+
+    def _reset_process_pool(self):
+        """Kills the process pool so a hung parse does not hold a worker forever."""
+        pool, self._process_pool = self._process_pool, None
+        if pool is None:
+            return
+        self._generation += 1
+        # ProcessPoolExecutor has no public way to stop a running task. Every
+        # other file in the pool then fails with BrokenProcessPool, which
+        # extract() catches to resubmit it.
+        for proc in list(getattr(pool, "_processes", {}).values()):
+            proc.terminate()
+        pool.shutdown(wait=False)
+
+    async def extract(self, file_path: Path) -> ParsedContent:
+        """
+        Parses the file in the pool suited to it.
+
+        Raises:
+            ExtractionTimeout: If the file is not parsed within the timeout.
+        """
+        use_process = self._use_process_pool(file_path)
+        loop = asyncio.get_running_loop()
+        for attempt in range(RESUBMIT_ATTEMPTS + 1):
+            generation = self._generation
+            future = loop.run_in_executor(self._get_executor(use_process), extract_parsed, file_path, self.budget)
+            try:
+                return await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                if use_process:
+                    logger.error(f"Extraction of {file_path} exceeded {self.timeout:.0f}s; restarting extraction processes.")
+                    self._reset_process_pool()
+                else:
+                    # Threads cannot be killed; the parse finishes in the background and is discarded
+                    logger.error(f"Extraction of {file_path} exceeded {self.timeout:.0f}s; abandoning it.")
+                raise ExtractionTimeout(f"Extraction timed out after {self.timeout:.0f}s")
+            except BrokenProcessPool:
+                # Killed because another file timed out; this one gets a fresh start
+                if self._generation == generation or attempt == RESUBMIT_ATTEMPTS:
+                    raise
+                self.resubmitted += 1
+                logger.warning(f"Extraction processes were restarted while parsing {file_path.name}; resubmitting it.")
+
+    def shutdown(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+# Singleton instance
+_executor_instance: Optional[ExtractionExecutor] = None
+
+async def extract_parsed_async(file_path: Path) -> ParsedContent:
+    """
+    Standalone function to parse a file off the event loop using a
+    singleton ExtractionExecutor.
+    """
+    global _executor_instance
+    if _executor_instance is None:
+        _executor_instance = ExtractionExecutor()
+
+    return await _executor_instance.extract(file_path)
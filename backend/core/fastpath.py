@@ -0,0 +1,309 @@
+import calendar
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Pattern, Tuple
+from backend.core.models import TaskProposal
+from backend.utils.config import config_signature, load_projects, load_team
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Confidence given to proposals built without the model
+FAST_PATH_CONFIDENCE = 0.9
+# Characters of the email kept as the task description
+DESCRIPTION_CHARS = 1000
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS["sept"] = 9
+WEEKDAYS = {name.lower(): i for i, name in enumerate(calendar.day_name)}
+WEEKDAYS.update({name.lower(): i for i, name in enumerate(calendar.day_abbr)})
+
+_MONTH = "(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_WEEKDAY = "(" + "|".join(sorted(WEEKDAYS, key=len, reverse=True)) + r")\.?"
+_ORDINAL = r"(\d{1,2})(?:st|nd|rd|th)?"
+
+# Words that introduce a deadline; the date expression must follow directly
+DEADLINE_TRIGGER = re.compile(
+    r"\b(?:due(?:\s+(?:on|by|date))?|deadline(?:\s+is)?|by|before|no later than|not later than|until|submit(?:ted)? by)"
+    r"\s*:?\s+(?:the\s+|this\s+)?",
+    re.IGNORECASE,
+)
+# Anchored date expressions tried right after a trigger, in order
+DATE_FORMS: List[Tuple[str, Pattern]] = [
+    ("iso", re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})\b")),
+    ("numeric", re.compile(r"(\d{1,2})[/.](\d{1,2})[/.](\d{2,4})\b")),
+    ("day_month", re.compile(_ORDINAL + r"\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+(\d{4}))?\b", re.IGNORECASE)),
+    ("month_day", re.compile(_MONTH + r"\s+" + _ORDINAL + r"(?:,?\s+(\d{4}))?\b", re.IGNORECASE)),
+    ("next_weekday", re.compile(r"next\s+" + _WEEKDAY + r"\b", re.IGNORECASE)),
+    ("weekday", re.compile(r"(?:on\s+)?" + _WEEKDAY + r"\b", re.IGNORECASE)),
+    ("today", re.compile(r"(?:today|tonight|eod|cob|close of business|end of (?:the\s+)?day)\b", re.IGNORECASE)),
+    ("tomorrow", re.compile(r"tomorrow\b", re.IGNORECASE)),
+    ("end_of_week", re.compile(r"(?:end of (?:the\s+)?week|eow)\b", re.IGNORECASE)),
+    ("end_of_month", re.compile(r"(?:end of (?:the\s+)?month|eom)\b", re.IGNORECASE)),
+]
+# "within 5 days", "in 2 weeks" need no trigger word
+RELATIVE_PERIOD = re.compile(r"\b(?:within|in)\s+(\d{1,3})\s+(working\s+|business\s+)?(day|week)s?\b", re.IGNORECASE)
+REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg)\s*:\s*)+", re.IGNORECASE)
+
+def _add_working_days(start: date, days: int) -> date:
+    current = start
+    while days > 0:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            days -= 1
+    return current
+
+def _with_year(day: int, month: int, year: Optional[str], reference: date) -> date:
+    if year:
+        return date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+    candidate = date(reference.year, month, day)
+    # A date without a year that has already passed means next year
+    return candidate if candidate >= reference else date(reference.year + 1, month, day)
+
+def _parse_form(kind: str, match: re.Match, reference: date, day_first: bool) -> date:
+    g = match.groups()
+    if kind == "iso":
+        return date(int(g[0]), int(g[1]), int(g[2]))
+    if kind == "numeric":
+        day, month = (int(g[0]), int(g[1])) if day_first else (int(g[1]), int(g[0]))
+        return _with_year(day, month, g[2], reference)
+    if kind == "day_month":
+        return _with_year(int(g[0]), MONTHS[g[1].lower()], g[2], reference)
+    if kind == "month_day":
+        return _with_year(int(g[1]), MONTHS[g[0].lower()], g[2], reference)
+    if kind == "next_weekday":
+        ahead = (WEEKDAYS[g[0].lower()] - reference.weekday()) % 7 or 7
+        return reference + timedelta(days=ahead)
+    if kind == "weekday":
+        return reference + timedelta(days=(WEEKDAYS[g[0].lower()] - reference.weekday()) % 7)
+    if kind == "today":
+        return reference
+    if kind == "tomorrow":
+        return reference + timedelta(days=1)
+    if kind == "end_of_week":
+        return reference + timedelta(days=(4 - reference.weekday()) % 7)
+    if kind == "end_of_month":
+        return date(reference.year, reference.month, calendar.monthrange(reference.year, reference.month)[1])
+    raise ValueError(f"Unknown date form: {kind}")
+
+def find_deadline(text: str, reference: date, day_first: bool = True) -> Tuple[Optional[date], Optional[str]]:
+    """
+    Finds the stated deadline in the text.
+
+    Returns (deadline, phrase). The phrase is set whenever deadline wording
+    was found; the date is None if any such wording could not be resolved to
+    a date after `reference` (e.g. "by the next site meeting", "by 5pm
+    Friday", "issued by 3 May 2024", or "by Monday" written on a Monday),
+    so the email goes to the model rather than getting a wrong deadline.
+    """
+    resolved = None
+    unresolved = None
+    for trigger in DEADLINE_TRIGGER.finditer(text):
+        rest = text[trigger.end():trigger.end() + 40]
+        deadline = None
+        for kind, pattern in DATE_FORMS:
+            match = pattern.match(rest)
+            if match:
+                try:
+                    deadline = _parse_form(kind, match, reference, day_first)
+                except ValueError:
+                    pass  # e.g. 31/02; treat like unresolved wording
+                # A past date is something that already happened, and a bare
+                # weekday naming today could mean today or a week from now
+                if deadline is not None and (deadline < reference or (kind == "weekday" and deadline == reference)):
+                    deadline = None
+                break
+        if deadline is not None:
+            if resolved is None:
+                resolved = (deadline, (trigger.group(0) + match.group(0)).strip())
+        elif unresolved is None:
+            unresolved = (trigger.group(0) + rest.split("\n")[0]).strip()
+
+    if unresolved is not None:
+        return None, unresolved
+    if resolved is not None:
+        return resolved
+
+    match = RELATIVE_PERIOD.search(text)
+    if match:
+        count, working, unit = int(match.group(1)), match.group(2), match.group(3).lower()
+        if unit == "week":
+            return reference + timedelta(weeks=count), match.group(0)
+        if working:
+            return _add_working_days(reference, count), match.group(0)
+        return reference + timedelta(days=count), match.group(0)
+    return None, None
+
+def _normalise(term: str) -> str:
+    """Lower case with separators removed, so spelling variants of an id compare equal."""
+    return re.sub(r"[-_\s]+", "", term.lower())
+
+@dataclass
+class FastPathResult:
+    """What the rules could tell about an email."""
+    project_ids: List[str] = field(default_factory=list)
+    assignees: List[str] = field(default_factory=list)
+    deadline: Optional[date] = None
+    deadline_phrase: Optional[str] = None
+    # Set when the rules were certain enough to skip the model
+    proposal: Optional[TaskProposal] = None
+
+    @property
+    def has_hints(self) -> bool:
+        return bool(self.project_ids or self.assignees or self.deadline_phrase)
+
+    def hints(self) -> str:
+        """Findings phrased for the model, appended to the email it analyses."""
+        lines = []
+        if self.project_ids:
+            lines.append(f"- Project IDs or names mentioned: {', '.join(self.project_ids)}")
+        if self.assignees:
+            lines.append(f"- Engineers on those projects: {', '.join(self.assignees)}")
+        if self.deadline:
+            lines.append(f"- Deadline wording \"{self.deadline_phrase}\" resolves to {self.deadline.isoformat()}")
+        elif self.deadline_phrase:
+            lines.append(f"- Possible deadline wording: \"{self.deadline_phrase}\"")
+        return "[Pre-screening hints, verify against the email]\n" + "\n".join(lines)
+
+class FastPathClassifier:
+    """
+    Rule-based pre-classifier run before the model.
+
+    Project ids, names and optional "aliases" from projects.json are compiled
+    into one case-insensitive regex; explicit and relative deadlines are
+    resolved against the email's date; the assignee is taken from team
+    membership of the matched project. The TaskProposal is built locally
+    only when the subject names exactly one project by its id, nothing else
+    names another project, one engineer matches and all deadline wording
+    resolves. Otherwise whatever was found is passed to the model as hints.
+    """
+    def __init__(self, enabled: Optional[bool] = None, day_first: Optional[bool] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.enabled = enabled if enabled is not None else os.getenv("FASTPATH_ENABLED", "true").lower() != "false"
+        self.day_first = day_first if day_first is not None else os.getenv("FASTPATH_DAY_FIRST", "true").lower() != "false"
+        self._signature = None
+        self._pattern: Optional[Pattern] = None
+        # Normalised id, name or alias -> project id
+        self._terms: Dict[str, str] = {}
+        # Normalised project ids themselves
+        self._ids: Dict[str, str] = {}
+        self._members: Dict[str, List[str]] = {}
+        self.classified = 0
+        self.shortcut = 0
+        self.hinted = 0
+
+    def refresh(self):
+        """Recompiles the matcher if the projects or team changed."""
+        signature = config_signature()
+        if signature == self._signature:
+            return
+        raw_terms: Dict[str, str] = {}
+        for project in load_projects():
+            for term in [project["id"], project.get("name", ""), *project.get("aliases", [])]:
+                if term and len(term.strip()) >= 2:
+                    raw_terms[term.strip()] = project["id"]
+        members: Dict[str, List[str]] = {}
+        for member in load_team():
+            for project_id in member.get("projects", []):
+                members.setdefault(project_id, []).append(member["name"])
+
+        self._terms = {_normalise(term): project_id for term, project_id in raw_terms.items()}
+        self._ids = {_normalise(project["id"]): project["id"] for project in load_projects()}
+        self._members = members
+        if raw_terms:
+            # Longest first so "CE40 HSK to LSF" wins over "CE40"; separators are optional
+            # so "SB-01", "SB 01" and "SB01" all match
+            alternatives = [r"[-_\s]?".join(re.escape(part) for part in re.split(r"[-_\s]+", term))
+                            for term in sorted(raw_terms, key=len, reverse=True)]
+            self._pattern = re.compile(r"(?<![\w-])(" + "|".join(alternatives) + r")(?![\w-])", re.IGNORECASE)
+        else:
+            self._pattern = None
+        self._signature = signature
+
+    def _match_projects(self, text: str, ids_only: bool = False) -> List[str]:
+        """Projects mentioned by id, name or alias, or by id alone if ids_only."""
+        found: List[str] = []
+        if self._pattern is None:
+            return found
+        terms = self._ids if ids_only else self._terms
+        for match in self._pattern.finditer(text):
+            project_id = terms.get(_normalise(match.group(1)))
+            if project_id and project_id not in found:
+                found.append(project_id)
+        return found
+
+    def _title(self, subject: str, body: str) -> str:
+        """The subject without reply prefixes, or the body's first line if that leaves only a project id."""
+        title = REPLY_PREFIX.sub("", subject).strip()
+        remainder = self._pattern.sub("", title) if self._pattern else title
+        if re.search(r"\w", remainder):
+            return title
+        first_line = next((line.strip() for line in body.splitlines() if line.strip()), "")
+        return first_line[:100] or title
+
+    def _pick_assignee(self, candidates: List[str], text: str) -> List[str]:
+        """All engineers on the project, narrowed to those named in the email if any are."""
+        named = [name for name in candidates
+                 if re.search(r"\b" + re.escape(name.split()[0]) + r"\b", text, re.IGNORECASE)]
+        return named or candidates
+
+    def classify(self, subject: str, body: str, received: Optional[datetime] = None) -> FastPathResult:
+        self.refresh()
+        self.classified += 1
+        result = FastPathResult()
+        text = f"{subject}\n{body}"
+
+        # Subject matches come first; they are the most deliberate
+        result.project_ids = self._match_projects(subject)
+        for project_id in self._match_projects(body):
+            if project_id not in result.project_ids:
+                result.project_ids.append(project_id)
+        if len(result.project_ids) == 1:
+            result.assignees = self._pick_assignee(self._members.get(result.project_ids[0], []), body)
+        reference = (received or datetime.now()).date()
+        result.deadline, result.deadline_phrase = find_deadline(text, reference, self.day_first)
+
+        # Only a project id in the subject is deliberate enough to skip the
+        # model; names and aliases, or mentions in the body, are just hints
+        certain = (
+            self.enabled
+            and len(result.project_ids) == 1
+            and result.project_ids == self._match_projects(subject, ids_only=True)
+            and len(result.assignees) == 1
+            and (result.deadline_phrase is None or result.deadline is not None)
+        )
+        if certain:
+            result.proposal = TaskProposal(
+                title=self._title(subject, body),
+                description=body.strip()[:DESCRIPTION_CHARS],
+                deadline=datetime.combine(result.deadline, datetime.min.time()) if result.deadline else None,
+                assigned_to=result.assignees[0],
+                project_id=result.project_ids[0],
+                confidence=FAST_PATH_CONFIDENCE,
+            )
+            self.shortcut += 1
+        elif result.has_hints:
+            self.hinted += 1
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Counts of emails classified, answered without the model, and sent with hints."""
+        return {
+            "classified": self.classified,
+            "llm_calls_avoided": self.shortcut,
+            "hinted": self.hinted,
+            "avoided_share": self.shortcut / self.classified if self.classified else 0.0,
+        }
+
+# Singleton instance
+_classifier_instance: Optional[FastPathClassifier] = None
+
+def get_fast_path() -> FastPathClassifier:
+    global _classifier_instance
+    if _classifier_instance is None:
+        _classifier_instance = FastPathClassifier()
+    return _classifier_instance
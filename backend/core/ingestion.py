@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+class IngestionPool:
+    """
+    Bounded worker pool that feeds inbox files through the processing pipeline.
+
+    Items are queued on an asyncio queue and drained by a fixed number of
+    consumer tasks. A semaphore caps how many items are processed at once,
+    and once the number of queued items reaches the high-water mark, intake
+    from the watchdog thread blocks until the queue drains below the
+    low-water mark.
+    """
+    def __init__(self, handler: Optional[Callable[[Any], Awaitable[None]]] = None,
+                 workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 high_water: Optional[int] = None,
+                 low_water: Optional[int] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.handler = handler
+        self.workers = workers or int(os.getenv("INGEST_WORKERS", "4"))
+        self.max_in_flight = max_in_flight or int(os.getenv("INGEST_MAX_IN_FLIGHT", str(self.workers)))
+        self.high_water = high_water or int(os.getenv("INGEST_HIGH_WATER", "100"))
+        self.low_water = low_water if low_water is not None else self.high_water // 2
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._tasks: List[asyncio.Task] = []
+
+        # Intake state is shared with the watchdog thread
+        self._lock = threading.Lock()
+        self._intake_open = threading.Event()
+        self._intake_open.set()
+        self._depth = 0
+        self._in_flight = 0
+        self._processed = 0
+        self._failed = 0
+        self._stopped = False
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Binds the pool to an event loop. Consumers start on first use."""
+        if self.handler is None:
+            raise RuntimeError("IngestionPool needs a handler before it can start")
+        self.loop = loop
+        self._stopped = False
+
+    def submit_threadsafe(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """
+        Queues an item from a foreign thread (e.g. the watchdog observer).
+
+        Blocks while the queue is above the high-water mark so that the
+        observer stops pulling events until the workers catch up.
+
+        Returns:
+            bool: True if the item was queued, False if the pool is stopped
+            or the wait timed out.
+        """
+        if self.loop is None:
+            raise RuntimeError("IngestionPool.start() must be called before submitting")
+
+        while not self._intake_open.wait(timeout=0.5):
+            if self._stopped:
+                return False
+            if timeout is not None:
+                timeout -= 0.5
+                if timeout <= 0:
+                    return False
+        if self._stopped:
+            return False
+
+        self._increment_depth()
+        self.loop.call_soon_threadsafe(self._enqueue, item)
+        return True
+
+    async def put(self, item: Any) -> bool:
+        """Queues an item from within the event loop, waiting for intake to open."""
+        while not self._intake_open.is_set():
+            if self._stopped:
+                return False
+            await asyncio.sleep(0.1)
+        if self._stopped:
+            return False
+        self._increment_depth()
+        self._enqueue(item)
+        return True
+
+    async def wait_for_headroom(self):
+        """
+        Waits until the queue is at or below the low-water mark.
+        Background producers use this to leave room for live events.
+        """
+        while self._depth > self.low_water and not self._stopped:
+            await asyncio.sleep(0.1)
+
+    def _increment_depth(self):
+        with self._lock:
+            self._depth += 1
+            if self._depth >= self.high_water and self._intake_open.is_set():
+                logger.warning(f"Ingestion queue reached high-water mark ({self._depth}); pausing intake.")
+                self._intake_open.clear()
+
+    def _decrement_depth(self):
+        with self._lock:
+            self._depth -= 1
+            if self._depth <= self.low_water and not self._intake_open.is_set():
+                logger.info(f"Ingestion queue drained to {self._depth}; resuming intake.")
+                self._intake_open.set()
+
+    def _enqueue(self, item: Any):
+        self._ensure_workers()
+        self._queue.put_nowait(item)
+
+    def _ensure_workers(self):
+        self._tasks = [t for t in self._tasks if not t.done()]
+        for i in range(len(self._tasks), self.workers):
+            self._tasks.append(asyncio.get_running_loop().create_task(self._worker(i)))
+
+    async def _worker(self, worker_id: int):
+        while True:
+            item = await self._queue.get()
+            self._decrement_depth()
+            try:
+                async with self._semaphore:
+                    with self._lock:
+                        self._in_flight += 1
+                    try:
+                        await self.handler(item)
+                        self._processed += 1
+                    except Exception as e:
+                        self._failed += 1
+                        logger.error(f"Worker {worker_id} failed on {item}: {e}")
+                    finally:
+                        with self._lock:
+                            self._in_flight -= 1
+            finally:
+                self._queue.task_done()
+
+    async def join(self):
+        """Waits until every queued item has been processed."""
+        await self._queue.join()
+
+    def stop(self):
+        """Cancels the consumers and releases any thread blocked on intake."""
+        self._stopped = True
+        self._intake_open.set()
+        if self.loop is not None and self._tasks:
+            for task in self._tasks:
+                self.loop.call_soon_threadsafe(task.cancel)
+        self._tasks = []
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    @property
+    def intake_paused(self) -> bool:
+        return not self._intake_open.is_set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns queue depth and worker utilisation for sizing the pool."""
+        with self._lock:
+            return {
+                "queue_depth": self._depth,
+                "in_flight": self._in_flight,
+                "workers": self.workers,
+                "max_in_flight": self.max_in_flight,
+                "utilisation": self._in_flight / self.max_in_flight if self.max_in_flight else 0.0,
+                "intake_paused": self.intake_paused,
+                "processed": self._processed,
+                "failed": self._failed,
+            }
@@ -19,4 +19,8 @@ class TaskProposal(BaseModel):
     deadline: Optional[datetime] = Field(default=None, description="The deadline extracted from the content, or None")
     assigned_to: Optional[str] = Field(default=None, description="The name of the assigned team member")
     project_id: Optional[str] = Field(default=None, description="The matching Project ID")
-    confidence: float = Field(default=0.0, ge=0.0, le=1.0, description="Confidence score")
\ No newline at end of file
+    confidence: float = Field(default=0.0, ge=0.0, le=1.0, description="Confidence score")
+
+
+class BatchTaskProposal(TaskProposal):
+    index: int = Field(description="The index of the email this result belongs to")
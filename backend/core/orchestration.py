@@ -1,58 +1,126 @@
 import logging
 import shutil
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
-import extract_msg
-import email
-from email import policy
-import codecs
+from typing import Dict, List, Optional
+# extract_content is re-exported here for existing callers
+from backend.core.extraction import ExtractionTimeout, extract_content, extract_parsed_async
+from backend.core.fastpath import get_fast_path
+from backend.core.models import TaskProposal
+from backend.core.preprocess import prepare_content
 from backend.services.ai_service import analyze_content
-from backend.services.db_service import create_task
+from backend.services.db_service import create_task, advance_job, fail_job, link_usage
+from backend.services.telemetry import TokenBudgetExceeded, usage_scope
 from backend.utils.file_ops import move_to_processed
 from backend.utils.config import PROCESSED_DIR, STAGING_DIR
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-def extract_content(file_path: Path) -> tuple[str, str]:
+@dataclass
+class IngestResult:
+    """Outcome of one file's trip through the pipeline, with per-stage seconds."""
+    file_path: Path
+    task_id: Optional[int] = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Set when only part of the extracted text was analysed
+    truncated: bool = False
+    # Estimated prompt tokens before and after quoted replies and signatures were stripped
+    tokens_before: int = 0
+    tokens_after: int = 0
+    # Set when the rule-based fast path produced the task without a model call
+    fast_path: bool = False
+    # Tokens the model calls for this file reported, and their llm_usage rows
+    llm_tokens: int = 0
+    usage_ids: List[int] = field(default_factory=list)
+    # Set when a token budget postponed the analysis
+    deferred: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+def claim_file(file_path: Path, staging_dir: Optional[Path] = None) -> Optional[Path]:
     """
-    Extracts subject and body from .txt, .msg, or .eml files.
-    Returns: (subject, body)
+    Atomically claims a file by moving it into the staging directory.
+    Files already in that staging directory (orphans from a crash) are claimed
+    as they are. Returns the staging path, or None if another process won the race.
     """
+    staging_dir = staging_dir or STAGING_DIR
+    if file_path.parent == staging_dir:
+        logger.info(f"Resuming orphaned staging file: {file_path}")
+        return file_path
+
     try:
-        if file_path.suffix.lower() == '.txt':
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                return file_path.name, content
-        
-        elif file_path.suffix.lower() == '.msg':
-            # extract_msg requires string path
-            msg = extract_msg.Message(str(file_path))
-            subject = msg.subject if msg.subject else file_path.name
-            body = msg.body if msg.body else ""
-            msg.close()
-            return subject, body
-            
-        elif file_path.suffix.lower() == '.eml':
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-            
-            # Remove UTF-8 BOM if present
-            if raw_data.startswith(codecs.BOM_UTF8):
-                raw_data = raw_data[len(codecs.BOM_UTF8):]
-
-            msg = email.message_from_bytes(raw_data, policy=policy.default)
-            subject = msg['subject'] or file_path.name
-            body_part = msg.get_body(preferencelist=('plain', 'html'))
-            body = body_part.get_content() if body_part else ""
-            return subject, body
-        else:
-            return file_path.name, f"Unsupported file type: {file_path.suffix}"
+        staging_path = staging_dir / file_path.name
+        # If file already exists in staging, append timestamp or unique ID, but for now overwrite or skip
+        # shutil.move will fail if dest exists on some OS, or overwrite. 
+        # Ideally we want unique names.
+        if staging_path.exists():
+            staging_path = staging_dir / f"{file_path.stem}_{uuid.uuid4().hex[:6]}{file_path.suffix}"
             
+        shutil.move(str(file_path), str(staging_path))
+        logger.info(f"Moved {file_path.name} to staging: {staging_path}")
+        return staging_path
     except Exception as e:
-        logger.error(f"Error extracting from {file_path}: {e}")
-        return file_path.name, ""
+        logger.error(f"Failed to move to staging (race condition lost?): {e}")
+        return None
+
+async def _analyse(result: IngestResult, subject: str, text: str, received: Optional[datetime]) -> TaskProposal:
+    """Runs the fast-path rules, then the model if they were not conclusive."""
+    screened = get_fast_path().classify(subject, text, received)
+    if screened.proposal is not None:
+        logger.info(f"Fast path matched {screened.proposal.project_id} / {screened.proposal.assigned_to}; skipping the model.")
+        result.fast_path = True
+        return screened.proposal
+    if screened.has_hints:
+        text = f"{text}\n\n{screened.hints()}"
+    with usage_scope() as usage:
+        try:
+            return await analyze_content(text)
+        except TokenBudgetExceeded:
+            result.deferred = True
+            raise
+        finally:
+            result.llm_tokens, result.usage_ids = usage.tokens, usage.usage_ids
 
-async def process_file(file_path: Path):
+def _link_usage(result: IngestResult):
+    """Links the file's model usage rows to its task."""
+    try:
+        link_usage(result.usage_ids, result.task_id)
+    except Exception as e:
+        # Bookkeeping must never break ingestion itself
+        logger.error(f"Failed to link model usage to task {result.task_id}: {e}")
+
+def _record_job(job_id: Optional[int], state: str, **fields):
+    """Records a stage transition on the ingestion job, if the file has one."""
+    if job_id is None:
+        return
+    try:
+        advance_job(job_id, state, **fields)
+    except Exception as e:
+        # Bookkeeping must never break ingestion itself
+        logger.error(f"Failed to record job {job_id} as {state}: {e}")
+
+def _fail_job(job_id: Optional[int], error: str, retry: bool = True):
+    if job_id is None:
+        return
+    try:
+        fail_job(job_id, error, retry=retry)
+    except Exception as e:
+        logger.error(f"Failed to record failure for job {job_id}: {e}")
+
+def _fail(result: IngestResult, job_id: Optional[int], error: str, retry: bool = True) -> IngestResult:
+    result.error = error
+    _fail_job(job_id, error, retry=retry)
+    return result
+
+async def process_file(file_path: Path, job_id: Optional[int] = None,
+                       staging_dir: Optional[Path] = None) -> IngestResult:
     """
     Orchestrates the processing of a single file:
     1. Move to Staging (Atomic Claim)
@@ -60,72 +128,138 @@ async def process_file(file_path: Path):
     3. AI Analysis
     4. DB Insertion
     5. File Movement to Processed
+
+    If job_id is given, each stage is recorded on that ingest_jobs row.
+    Worker processes pass their own staging_dir so claims never collide.
+    Returns an IngestResult with the task id, any error and stage timings.
     """
+    result = IngestResult(file_path=file_path)
     if not file_path.exists():
         logger.warning(f"File not found (race condition): {file_path}")
-        return
+        return _fail(result, job_id, "File not found", retry=False)
 
     # Ensure staging directory exists
-    STAGING_DIR.mkdir(exist_ok=True)
+    staging_dir = staging_dir or STAGING_DIR
+    staging_dir.mkdir(parents=True, exist_ok=True)
     
     # 1. Move to Staging
-    try:
-        staging_path = STAGING_DIR / file_path.name
-        # If file already exists in staging, append timestamp or unique ID, but for now overwrite or skip
-        # shutil.move will fail if dest exists on some OS, or overwrite. 
-        # Ideally we want unique names.
-        if staging_path.exists():
-            import uuid
-            staging_path = STAGING_DIR / f"{file_path.stem}_{uuid.uuid4().hex[:6]}{file_path.suffix}"
-            
-        shutil.move(str(file_path), str(staging_path))
-        logger.info(f"Moved {file_path.name} to staging: {staging_path}")
-    except Exception as e:
-        logger.error(f"Failed to move to staging (race condition lost?): {e}")
-        return
+    started = time.perf_counter()
+    staging_path = claim_file(file_path, staging_dir)
+    if staging_path is None:
+        return _fail(result, job_id, "Failed to move to staging", retry=False)
+    result.timings["claim"] = time.perf_counter() - started
+    _record_job(job_id, "STAGED", staging_path=str(staging_path))
 
     # From now on, use staging_path
     
     # 2. Extract Content
-    subject, content = extract_content(staging_path)
+    started = time.perf_counter()
+    try:
+        # Parsing runs in an executor so a huge .msg cannot block the event loop
+        parsed = await extract_parsed_async(staging_path)
+    except ExtractionTimeout as e:
+        logger.error(f"Extraction failed for {staging_path}: {e}")
+        return _fail(result, job_id, str(e), retry=False)
+    except Exception as e:
+        logger.error(f"Extraction failed for {staging_path}: {e}")
+        return _fail(result, job_id, f"Extraction failed: {e}")
+    result.timings["extract"] = time.perf_counter() - started
+    subject, content = parsed.subject, parsed.body
     if not content:
         logger.warning(f"No content extracted from {staging_path}. Skipping.")
-        return
+        return _fail(result, job_id, "No content extracted", retry=False)
+    result.truncated = parsed.truncated
+    prepared = prepare_content(content)
+    result.tokens_before, result.tokens_after = prepared.tokens_before, prepared.tokens_after
+    _record_job(job_id, "EXTRACTED")
 
     # 3. AI Analysis
     logger.info("Running AI analysis...")
+    started = time.perf_counter()
     try:
-        analysis = await analyze_content(content)
+        analysis = await _analyse(result, subject, prepared.text, parsed.date)
+    except TokenBudgetExceeded as e:
+        # Left in staging and requeued; the retry loop (or a worker process)
+        # tries it again after the retry backoff, up to the job's max attempts
+        logger.warning(f"AI Analysis deferred for {staging_path}: {e}")
+        return _fail(result, job_id, f"Deferred: {e}")
     except Exception as e:
         logger.error(f"AI Analysis failed for {staging_path}: {e}")
         # Consider moving to an 'error' folder?
-        return
+        return _fail(result, job_id, f"AI Analysis failed: {e}")
+    result.timings["analyse"] = time.perf_counter() - started
+    _record_job(job_id, "ANALYSED")
     
     # 4. DB Insertion
     logger.info("Saving to database...")
+    started = time.perf_counter()
     try:
-        # Convert datetime to string for SQLite
-        deadline_str = analysis.deadline.strftime("%Y-%m-%d") if analysis.deadline else "None"
+        reasoning = f"{analysis.description}\n(Confidence: {analysis.confidence:.2f})"
+        if result.fast_path:
+            reasoning += "\n(Routed by project ID rules without AI analysis)"
+        if parsed.truncated:
+            # Let the reviewer know the AI did not see the whole email
+            reasoning += f"\n(Input truncated: {len(content)} of {parsed.original_chars} characters analysed)"
         
         task_id = create_task(
             source_file=file_path.name, # Keep original name for record
             original_subject=subject,
             summary=analysis.title,
-            deadline=deadline_str,
+            deadline=analysis.deadline,
             project_id=analysis.project_id,
             assignee=analysis.assigned_to,
-            reasoning=f"{analysis.description}\n(Confidence: {analysis.confidence:.2f})",
+            reasoning=reasoning,
             status="PENDING"
         )
     except Exception as e:
         logger.error(f"Database insertion failed: {e}")
-        return
+        return _fail(result, job_id, f"Database insertion failed: {e}")
+    result.task_id = task_id
+    _link_usage(result)
+    result.timings["insert"] = time.perf_counter() - started
+    _record_job(job_id, "INSERTED", task_id=task_id)
     
     # 5. File Movement
     logger.info(f"Moving file (Task ID: {task_id})...")
+    started = time.perf_counter()
     try:
         # Move from STAGING to PROCESSED
         new_path = move_to_processed(staging_path, PROCESSED_DIR, analysis.project_id, task_id)
         logger.info(f"File processed and moved to: {new_path}")
     except Exception as e:
         logger.error(f"Failed to move file: {e}")
+        # The task already exists, so retrying would create a duplicate
+        return _fail(result, job_id, f"Failed to move file: {e}", retry=False)
+    result.timings["move"] = time.perf_counter() - started
+    _record_job(job_id, "DONE")
+    return result
+
+async def analyze_file(file_path: Path) -> IngestResult:
+    """
+    Dry-run counterpart of process_file: extracts and analyses the file in
+    place without claiming, inserting or moving anything.
+    """
+    result = IngestResult(file_path=file_path)
+    started = time.perf_counter()
+    try:
+        parsed = await extract_parsed_async(file_path)
+    except Exception as e:
+        result.error = f"Extraction failed: {e}"
+        return result
+    result.timings["extract"] = time.perf_counter() - started
+    content = parsed.body
+    if not content:
+        result.error = "No content extracted"
+        return result
+    result.truncated = parsed.truncated
+    prepared = prepare_content(content)
+    result.tokens_before, result.tokens_after = prepared.tokens_before, prepared.tokens_after
+
+    started = time.perf_counter()
+    try:
+        await _analyse(result, parsed.subject, prepared.text, parsed.date)
+    except Exception as e:
+        result.error = f"AI Analysis failed: {e}"
+        return result
+    result.timings["analyse"] = time.perf_counter() - started
+    return result
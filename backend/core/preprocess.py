@@ -0,0 +1,117 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English prose; good enough to compare prompt sizes
+CHARS_PER_TOKEN = 4
+
+# Lines that start the quoted history of a reply; everything from here on is dropped
+REPLY_HEADER_PATTERNS = [
+    re.compile(r"^\s*On .{4,200}wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*Original Message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*_{10,}\s*$"),  # Outlook's rule above the quoted header block
+]
+# Outlook quotes the previous message under a From:/Sent:/To:/Subject: block
+OUTLOOK_HEADER = re.compile(r"^\s*\**From:\**\s.+$", re.IGNORECASE)
+OUTLOOK_HEADER_FIELDS = re.compile(r"^\s*\**(Sent|Date|To|Cc|Subject):\**\s", re.IGNORECASE)
+
+# Signature delimiters and sign-offs
+SIGNATURE_DELIMITER = re.compile(r"^--\s?$")
+SIGN_OFF = re.compile(
+    r"^\s*(best|kind|warm)?\s*(regards|thanks|thank you|cheers|sincerely|many thanks)[,!.]?\s*$",
+    re.IGNORECASE,
+)
+MOBILE_FOOTER = re.compile(r"^\s*Sent from my \w+", re.IGNORECASE)
+# Most lines, and longest line, after a sign-off that are still treated as the signature
+MAX_SIGNATURE_LINES = 8
+MAX_SIGNATURE_WIDTH = 60
+
+# Opening words of legal disclaimers and confidentiality footers
+DISCLAIMER = re.compile(
+    r"^\s*(\**\s*)?(confidentiality notice|disclaimer|this (e-?mail|message|communication)"
+    r"( and any (attachments?|files))? (is|are|may be) (confidential|intended))",
+    re.IGNORECASE,
+)
+
+@dataclass
+class PreparedContent:
+    """Text ready for analysis, with prompt size estimates before and after cleaning."""
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of the estimated tokens removed."""
+        if not self.tokens_before:
+            return 0.0
+        return 1 - self.tokens_after / self.tokens_before
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for logging and reports; no tokenizer required."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _is_outlook_header(lines: List[str], index: int) -> bool:
+    """A From: line followed closely by at least two other header fields."""
+    if not OUTLOOK_HEADER.match(lines[index]):
+        return False
+    following = lines[index + 1:index + 6]
+    return sum(1 for line in following if OUTLOOK_HEADER_FIELDS.match(line)) >= 2
+
+def strip_quoted(text: str) -> str:
+    """Removes '>' quoted lines and cuts the text at the start of the quoted history."""
+    lines = text.splitlines()
+    kept = []
+    for index, line in enumerate(lines):
+        if any(p.match(line) for p in REPLY_HEADER_PATTERNS):
+            break
+        # A header block at the very top is the message's own (e.g. a saved .txt email)
+        if any(k.strip() for k in kept) and _is_outlook_header(lines, index):
+            break
+        if line.lstrip().startswith(">"):
+            continue
+        kept.append(line)
+    return "\n".join(kept)
+
+def strip_signature(text: str) -> str:
+    """Removes signature blocks, mobile footers and legal disclaimers."""
+    lines = text.splitlines()
+    for index, line in enumerate(lines):
+        if SIGNATURE_DELIMITER.match(line) or DISCLAIMER.match(line):
+            lines = lines[:index]
+            break
+    lines = [line for line in lines if not MOBILE_FOOTER.match(line)]
+
+    # Drop a short block under the last sign-off (name, title, phone numbers)
+    for index in range(len(lines) - 1, max(-1, len(lines) - MAX_SIGNATURE_LINES - 2), -1):
+        if SIGN_OFF.match(lines[index]):
+            if all(len(line) <= MAX_SIGNATURE_WIDTH for line in lines[index + 1:]):
+                lines = lines[:index + 1]
+            break
+    return "\n".join(lines)
+
+def clean_content(text: str) -> str:
+    """Strips quoted replies, signatures and footers, collapsing the blank lines left behind."""
+    cleaned = strip_signature(strip_quoted(text))
+    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+    # An email that is nothing but a forwarded quote is analysed as it is
+    return cleaned or text.strip()
+
+def prepare_content(text: str, enabled: Optional[bool] = None) -> PreparedContent:
+    """
+    Cleans extracted text before it is sent to the AI and reports the saving.
+    Disabled by setting STRIP_QUOTED_REPLIES=false.
+    """
+    if enabled is None:
+        enabled = os.getenv("STRIP_QUOTED_REPLIES", "true").lower() != "false"
+    cleaned = clean_content(text) if enabled else text
+    prepared = PreparedContent(cleaned, estimate_tokens(text), estimate_tokens(cleaned))
+    if prepared.tokens_after < prepared.tokens_before:
+        logger.info(f"Preprocessing cut ~{prepared.tokens_before} to ~{prepared.tokens_after} tokens "
+                    f"({prepared.reduction:.0%} saved)")
+    return prepared
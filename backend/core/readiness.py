@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+class FileReadinessTracker:
+    """
+    Decides when a newly created file has been completely written.
+
+    A file is ready as soon as the platform reports it closed or moved into
+    place. Otherwise its size and mtime are polled with exponential backoff
+    until they stop changing, so small files are released within
+    milliseconds while slow copies (e.g. large .msg files over SMB) keep
+    being watched until the writer is done.
+    """
+    def __init__(self, initial_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None,
+                 timeout: Optional[float] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.initial_delay = initial_delay or float(os.getenv("INGEST_READY_INITIAL_DELAY", "0.05"))
+        self.max_delay = max_delay or float(os.getenv("INGEST_READY_MAX_DELAY", "2.0"))
+        self.timeout = timeout or float(os.getenv("INGEST_READY_TIMEOUT", "300"))
+        self._lock = threading.Lock()
+        self._signalled: Set[Path] = set()
+
+    def mark_ready(self, file_path: Path):
+        """Records a close/move event for the file. Safe to call from any thread."""
+        with self._lock:
+            self._signalled.add(file_path)
+
+    def forget(self, file_path: Path):
+        """Discards any recorded event for the file."""
+        with self._lock:
+            self._signalled.discard(file_path)
+
+    def _pop_signal(self, file_path: Path) -> bool:
+        with self._lock:
+            if file_path in self._signalled:
+                self._signalled.remove(file_path)
+                return True
+            return False
+
+    @staticmethod
+    def _snapshot(file_path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def _can_open(file_path: Path) -> bool:
+        # Windows refuses to open a file that is still being copied
+        try:
+            with open(file_path, 'rb'):
+                return True
+        except PermissionError:
+            return False
+        except FileNotFoundError:
+            return False
+
+    async def wait_until_ready(self, file_path: Path) -> bool:
+        """
+        Waits until the file is fully written.
+
+        Returns:
+            bool: True if the file is ready, False if it vanished or the
+            per-file timeout expired.
+        """
+        deadline = time.monotonic() + self.timeout
+        delay = self.initial_delay
+        # Files that look complete on arrival only need one quiet poll; once a
+        # file is seen growing it must stay quiet for max_delay.
+        quiet_needed = self.initial_delay
+        previous = self._snapshot(file_path)
+        last_change = time.monotonic()
+
+        while True:
+            if self._pop_signal(file_path):
+                return file_path.exists()
+            if previous is None:
+                return False
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out after {self.timeout:.0f}s waiting for write to finish: {file_path}")
+                return False
+
+            await asyncio.sleep(delay)
+            current = self._snapshot(file_path)
+            if current is None:
+                return False
+
+            now = time.monotonic()
+            if current != previous:
+                previous = current
+                last_change = now
+                quiet_needed = self.max_delay
+            else:
+                if current[0] == 0:
+                    # An empty file has often just been created and not written yet
+                    quiet_needed = self.max_delay
+                if now - last_change >= quiet_needed and self._can_open(file_path):
+                    return True
+            delay = min(delay * 2, self.max_delay)
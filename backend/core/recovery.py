@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+from backend.services.db_service import fail_job, get_jobs, requeue_stale_jobs
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+def iter_files(directory: Path) -> Iterator[Path]:
+    """
+    Streams the files under a directory tree using os.scandir.
+    Entries are yielded as they are read, so huge backlogs are never listed in full.
+    """
+    if not directory.exists():
+        return
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        yield Path(entry.path)
+        except OSError as e:
+            logger.error(f"Failed to scan {current}: {e}")
+
+def reconcile_jobs() -> Dict[str, int]:
+    """
+    Brings the ingest_jobs table back in line with the filesystem at startup.
+
+    Jobs that were in progress when the service stopped are put back on the
+    queue, and queued jobs whose file no longer exists anywhere are failed.
+    The backlog scan then re-submits the remaining files, which map back onto
+    their existing jobs.
+    """
+    requeued = requeue_stale_jobs()
+    missing = 0
+    for job in get_jobs("QUEUED", limit=None):
+        paths = [job["source_path"], job["staging_path"]]
+        if not any(p and Path(p).exists() for p in paths):
+            fail_job(job["id"], "File missing at startup", retry=False)
+            missing += 1
+    if requeued or missing:
+        logger.info(f"Job reconciliation: {requeued} interrupted jobs requeued, {missing} missing files failed.")
+    return {"requeued": requeued, "missing": missing}
+
+class BacklogScanner:
+    """
+    Startup reconciliation pass over files the watcher never saw.
+
+    Picks up files left in staging by a crash after the claim step and files
+    that were already sitting in the inbox when the service started, and feeds
+    them into the normal ingestion pipeline at a limited rate.
+    """
+    def __init__(self, rate: Optional[float] = None, log_every: int = 100):
+        # Priority: constructor arg > environment variable > default value
+        self.rate = rate or float(os.getenv("BACKLOG_SCAN_RATE", "20"))
+        self.log_every = log_every
+        self.scanned = 0
+        self.submitted = 0
+        self.skipped = 0
+        self.current_dir: Optional[Path] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    async def run(self, submit: Callable[[Path], Awaitable[bool]], directories: List[Path]):
+        """
+        Scans each directory in order and submits every file found.
+
+        Args:
+            submit: Coroutine that queues a file and returns False if it was
+                already being processed.
+            directories: Directories to drain, in priority order.
+        """
+        self.started_at = time.monotonic()
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        logger.info(f"Backlog scan started on {', '.join(str(d) for d in directories)}")
+        try:
+            for directory in directories:
+                self.current_dir = directory
+                for file_path in iter_files(directory):
+                    self.scanned += 1
+                    if await submit(file_path):
+                        self.submitted += 1
+                        # Throttle so the backlog never crowds out live events
+                        await asyncio.sleep(interval)
+                    else:
+                        self.skipped += 1
+                    if self.scanned % self.log_every == 0:
+                        logger.info(f"Backlog scan progress: {self.progress()}")
+        finally:
+            self.current_dir = None
+            self.finished_at = time.monotonic()
+            logger.info(f"Backlog scan finished: {self.progress()}")
+
+    @property
+    def is_running(self) -> bool:
+        return self.started_at is not None and self.finished_at is None
+
+    def progress(self) -> Dict[str, Any]:
+        """Returns scan counters for logging and the dashboard."""
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "scanned": self.scanned,
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "current_dir": str(self.current_dir) if self.current_dir else None,
+            "elapsed": round(elapsed, 1),
+        }
@@ -1,11 +1,18 @@
-import time
 import logging
 import asyncio
+import os
+import socket
+import threading
 from pathlib import Path
-from typing import Set
+from typing import Optional, Set, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from backend.core.ingestion import IngestionPool
 from backend.core.orchestration import process_file
+from backend.core.readiness import FileReadinessTracker
+from backend.core.recovery import BacklogScanner, reconcile_jobs
+from backend.services.db_service import claim_job, enqueue_job, fail_job, get_due_retries
+from backend.utils.config import STAGING_DIR
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -13,57 +20,194 @@ logger = logging.getLogger(__name__)
 class InboxHandler(FileSystemEventHandler):
     """
     Handles file creation events in the inbox directory.
+    Each detected file is recorded as an ingest job and handed to a bounded
+    IngestionPool, whose workers claim the job and process the file once it
+    is fully written. With enqueue_only, jobs are left in the ingest_jobs
+    table for separate worker processes to claim.
     """
-    def __init__(self, loop):
+    def __init__(self, loop, pool: Optional[IngestionPool] = None,
+                 readiness: Optional[FileReadinessTracker] = None,
+                 worker_id: Optional[str] = None,
+                 enqueue_only: bool = False):
         self.loop = loop
+        self.enqueue_only = enqueue_only
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.readiness = readiness or FileReadinessTracker()
+        self.pool = pool or IngestionPool()
+        if self.pool.handler is None:
+            self.pool.handler = self._process_when_ready
+        self.pool.start(loop)
         self.processing_files: Set[Path] = set()
+        self._lock = threading.Lock()
 
     def on_created(self, event):
         if event.is_directory:
             return
-        
-        file_path = Path(event.src_path)
-        
-        if file_path in self.processing_files:
-            logger.info(f"Skipping duplicate event for: {file_path}")
+        self._submit(Path(event.src_path))
+
+    def on_closed(self, event):
+        # Emitted by inotify when a writer closes the file
+        if event.is_directory:
+            return
+        self.readiness.mark_ready(Path(event.src_path))
+
+    def on_moved(self, event):
+        # Writers that rename a temp file into place produce a complete file
+        if event.is_directory:
+            return
+        dest_path = Path(event.dest_path)
+        self._submit(dest_path)
+        self.readiness.mark_ready(dest_path)
+
+    def _claim(self, file_path: Path) -> bool:
+        with self._lock:
+            if file_path in self.processing_files:
+                logger.info(f"Skipping duplicate event for: {file_path}")
+                return False
+            self.processing_files.add(file_path)
+        # Drop any close event left over from an earlier file with this name
+        self.readiness.forget(file_path)
+        return True
+
+    def _enqueue_job(self, file_path: Path) -> Optional[int]:
+        try:
+            return enqueue_job(str(file_path))
+        except Exception as e:
+            logger.error(f"Failed to record ingest job for {file_path}: {e}")
+            self._release(file_path)
+            return None
+
+    def _submit(self, file_path: Path):
+        if not self._claim(file_path):
             return
 
         logger.info(f"New file detected: {file_path}")
-        self.processing_files.add(file_path)
+        job_id = self._enqueue_job(file_path)
+        if job_id is None:
+            return
+        if self.enqueue_only:
+            self._release(file_path)
+            return
         
-        # We need to wait a brief moment to ensure the file is fully written (especially for large files)
-        # However, blocking here stops the observer.
-        # Since process_file is async, we schedule it on the event loop.
-        asyncio.run_coroutine_threadsafe(self._process_with_delay(file_path), self.loop)
+        # Blocks the observer thread while the pool is above its high-water mark,
+        # so a large drop is absorbed by watchdog's event queue instead of
+        # spawning one coroutine per file.
+        if not self.pool.submit_threadsafe((job_id, file_path)):
+            self._release(file_path)
+
+    async def submit_backlog(self, file_path: Path) -> bool:
+        """
+        Queues a file found by the startup backlog scan.
+        Waits for spare queue capacity first so live events keep flowing.
+        """
+        if not self.enqueue_only:
+            await self.pool.wait_for_headroom()
+        if not self._claim(file_path):
+            return False
+        job_id = self._enqueue_job(file_path)
+        if job_id is None:
+            return False
+        if self.enqueue_only:
+            self._release(file_path)
+            return True
+        if not await self.pool.put((job_id, file_path)):
+            self._release(file_path)
+            return False
+        return True
+
+    async def submit_due_retries(self, retry_delay: Optional[float] = None) -> int:
+        """
+        Re-submits failed jobs that fail_job put back on the queue, once their
+        backoff has passed. fail_job marks them FAILED after max_attempts.
+        Returns the number of jobs submitted.
+        """
+        submitted = 0
+        jobs = await asyncio.to_thread(get_due_retries, retry_delay)
+        for job in jobs:
+            file_path = Path(job["source_path"])
+            # Skip jobs whose file is already queued or being processed
+            if not self._claim(file_path):
+                continue
+            if not await self.pool.put((job["id"], file_path)):
+                self._release(file_path)
+                break
+            submitted += 1
+        if submitted:
+            logger.info(f"Retrying {submitted} failed ingest jobs.")
+        return submitted
+
+    async def retry_loop(self, interval: Optional[float] = None, retry_delay: Optional[float] = None):
+        """Periodically re-submits due retries until the pool is stopped."""
+        # Priority: constructor arg > environment variable > default value
+        interval = interval or float(os.getenv("INGEST_RETRY_INTERVAL", "10"))
+        while not self.pool.stopped:
+            await asyncio.sleep(interval)
+            try:
+                await self.submit_due_retries(retry_delay)
+            except Exception as e:
+                logger.error(f"Failed to retry ingest jobs: {e}")
 
-    async def _process_with_delay(self, file_path: Path):
-        """Wait for file write to complete then process."""
+    def _release(self, file_path: Path):
+        with self._lock:
+            self.processing_files.discard(file_path)
+
+    async def _process_when_ready(self, item: Tuple[int, Path]):
+        """Claim the job, wait for file write to complete, then process."""
+        job_id, file_path = item
         try:
-            await asyncio.sleep(1) # Simple debounce/wait for write
-            
-            # Double check if it still exists (it might have been moved by another process if we are not careful, 
-            # though the set should handle our own concurrency)
-            if not file_path.exists():
-                logger.warning(f"File vanished before processing: {file_path}")
+            job = claim_job(job_id, self.worker_id)
+            if job is None:
+                logger.info(f"Job {job_id} already claimed elsewhere: {file_path}")
+                return
+
+            # A requeued job may already have been moved to staging
+            staging_path = job.get("staging_path")
+            if not file_path.exists() and staging_path and Path(staging_path).exists():
+                file_path = Path(staging_path)
+
+            if not await self.readiness.wait_until_ready(file_path):
+                # Either moved away by another process or never finished writing
+                if file_path.exists():
+                    logger.warning(f"File not ready, leaving it in the inbox: {file_path}")
+                    fail_job(job_id, "Timed out waiting for write to finish")
+                else:
+                    logger.warning(f"File vanished before processing: {file_path}")
+                    fail_job(job_id, "File vanished before processing", retry=False)
                 return
 
-            await process_file(file_path)
+            await process_file(file_path, job_id=job_id)
         finally:
             # Ensure we remove from the set even if processing fails
-            if file_path in self.processing_files:
-                self.processing_files.remove(file_path)
+            self._release(item[1])
 
-def start_watcher(inbox_path: Path, loop: asyncio.AbstractEventLoop) -> Observer:
+def start_watcher(inbox_path: Path, loop: asyncio.AbstractEventLoop,
+                  pool: Optional[IngestionPool] = None,
+                  scanner: Optional[BacklogScanner] = None,
+                  enqueue_only: bool = False) -> Observer:
     """
     Starts the watchdog observer on the inbox directory.
+    If no pool is given, a default IngestionPool is created from the environment.
+    With enqueue_only, files are only recorded as jobs for worker processes.
+    If a scanner is given, files orphaned in staging and files already in the
+    inbox are fed into the pool in the background once the observer is running.
+    In-process, failed jobs that were requeued are re-submitted after a backoff.
     Returns the observer instance.
     """
     if not inbox_path.exists():
         inbox_path.mkdir(parents=True, exist_ok=True)
         
-    event_handler = InboxHandler(loop)
+    event_handler = InboxHandler(loop, pool, enqueue_only=enqueue_only)
     observer = Observer()
     observer.schedule(event_handler, str(inbox_path), recursive=True)
     observer.start()
     logger.info(f"Watcher started on: {inbox_path}")
+
+    if not enqueue_only:
+        # Worker processes pick retries up themselves through claim_next_job
+        asyncio.run_coroutine_threadsafe(event_handler.retry_loop(), loop)
+    if scanner is not None:
+        reconcile_jobs()
+        asyncio.run_coroutine_threadsafe(
+            scanner.run(event_handler.submit_backlog, [STAGING_DIR, inbox_path]), loop
+        )
     return observer
\ No newline at end of file
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from backend.core.orchestration import process_file
+from backend.core.readiness import FileReadinessTracker
+from backend.services.ai_service import close_agent, configure_batching, warm_up
+from backend.services.db_service import claim_next_job, fail_job, get_job_counts, requeue_stale_jobs
+from backend.utils.config import STAGING_DIR
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Seconds an idle worker waits before polling the job queue again
+POLL_INTERVAL = 0.5
+
+def worker_id_for(pid: int) -> str:
+    """Job owner id used by a worker process; matches the watcher's in-process id format."""
+    return f"{socket.gethostname()}:{pid}"
+
+def worker_staging_dir(index: int) -> Path:
+    """Per-worker staging subfolder, stable across restarts of the same slot."""
+    return STAGING_DIR / f"worker-{index}"
+
+def queued_jobs_probe(max_age: float = 2.0) -> Callable[[], int]:
+    """Backlog depth for analysis batching, read from the job table at most every max_age seconds."""
+    cached = {"at": float("-inf"), "count": 0}
+
+    def probe() -> int:
+        now = time.monotonic()
+        if now - cached["at"] >= max_age:
+            cached["count"] = get_job_counts()["QUEUED"]
+            cached["at"] = now
+        return cached["count"]
+    return probe
+
+async def _run_job(job: Dict, staging_dir: Path, readiness: FileReadinessTracker):
+    # A requeued job may already have been moved into a (possibly dead) worker's staging folder
+    file_path = Path(job["source_path"])
+    staging_path = job.get("staging_path")
+    if staging_path and Path(staging_path).exists():
+        file_path = Path(staging_path)
+
+    if not await readiness.wait_until_ready(file_path):
+        if file_path.exists():
+            fail_job(job["id"], "Timed out waiting for write to finish")
+        else:
+            fail_job(job["id"], "File vanished before processing", retry=False)
+        return
+
+    await process_file(file_path, job_id=job["id"], staging_dir=staging_dir)
+
+async def _worker_loop(index: int, stop_event, concurrency: int):
+    worker_id = worker_id_for(os.getpid())
+    staging_dir = worker_staging_dir(index)
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    readiness = FileReadinessTracker()
+    if concurrency > 1:
+        # Only concurrent jobs in this process can share a model call
+        configure_batching(queued_jobs_probe(), concurrency)
+    await warm_up()
+
+    async def consume():
+        while not stop_event.is_set():
+            try:
+                job = await asyncio.to_thread(claim_next_job, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {index} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            try:
+                await _run_job(job, staging_dir, readiness)
+            except Exception as e:
+                logger.error(f"Worker {index} failed on job {job['id']}: {e}")
+                fail_job(job["id"], str(e))
+
+    logger.info(f"Worker {index} started (pid {os.getpid()}, staging {staging_dir}).")
+    await asyncio.gather(*(consume() for _ in range(concurrency)))
+    await close_agent()
+    logger.info(f"Worker {index} stopped.")
+
+def worker_main(index: int, stop_event, concurrency: int = 1):
+    """Entry point of a worker process: claims and processes jobs until stopped."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    # Ctrl-C reaches the whole process group; let the supervisor coordinate shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_loop(index, stop_event, concurrency))
+
+class WorkerSupervisor:
+    """
+    Runs N ingestion worker processes that drain the ingest_jobs queue.
+
+    Each worker claims files with an atomic rename into its own staging
+    subfolder. If a worker dies, its in-progress jobs are requeued and the
+    slot is restarted; the replacement picks the dead worker's files up from
+    that slot's staging folder.
+    """
+    def __init__(self, workers: int, concurrency: Optional[int] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.workers = workers
+        self.concurrency = concurrency or int(os.getenv("WORKER_CONCURRENCY", "1"))
+        # spawn avoids forking the parent's running event loop and observer threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop_event = self._ctx.Event()
+        self._processes: List[Optional[multiprocessing.process.BaseProcess]] = [None] * workers
+        self.restarts = 0
+
+    def _spawn(self, index: int):
+        proc = self._ctx.Process(
+            target=worker_main,
+            args=(index, self._stop_event, self.concurrency),
+            name=f"ingest-worker-{index}",
+            daemon=False,
+        )
+        proc.start()
+        self._processes[index] = proc
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"Started {self.workers} worker processes ({self.concurrency} concurrent jobs each).")
+
+    def check(self):
+        """Restarts dead workers and requeues the jobs they were holding."""
+        if self._stop_event.is_set():
+            return
+        for index, proc in enumerate(self._processes):
+            if proc is None or proc.is_alive():
+                continue
+            requeued = requeue_stale_jobs(worker_id_for(proc.pid))
+            logger.warning(f"Worker {index} (pid {proc.pid}) exited with code {proc.exitcode}; "
+                           f"requeued {requeued} jobs, restarting.")
+            self.restarts += 1
+            self._spawn(index)
+
+    def stop(self, timeout: float = 30.0):
+        """Asks workers to finish their current job, then terminates stragglers."""
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for proc in self._processes:
+            if proc is not None:
+                proc.join(max(0.0, deadline - time.monotonic()))
+        for proc in self._processes:
+            if proc is not None and proc.is_alive():
+                logger.warning(f"Terminating unresponsive worker pid {proc.pid}")
+                proc.terminate()
+                proc.join()
+            if proc is not None:
+                requeue_stale_jobs(worker_id_for(proc.pid))
+        logger.info("All worker processes stopped.")
+
+    def alive(self) -> int:
+        return sum(1 for proc in self._processes if proc is not None and proc.is_alive())
@@ -1,14 +1,28 @@
+import argparse
 import asyncio
+import json
 import logging
+import signal
 import sys
 from pathlib import Path
+from typing import List, Optional
 
 # Add project root to path to ensure imports work correctly
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 from backend.utils.config import INBOX_DIR
-from backend.services.db_service import init_db
+from backend.services.db_service import init_db, get_job_counts, get_usage_summary
+from backend.core.ingestion import IngestionPool
+from backend.core.recovery import BacklogScanner
 from backend.core.watcher import start_watcher
+from backend.core.workers import WorkerSupervisor
+from backend.core.batch import BatchIngestor, format_report
+from backend.core.fastpath import get_fast_path
+from backend.services.telemetry import get_telemetry
+from backend.services.ai_service import (
+    close_agent, configure_batching, get_analysis_cache, get_batcher_stats, get_cascade_stats,
+    get_scheduler_stats, warm_up,
+)
 
 # Setup logging
 logging.basicConfig(
@@ -20,29 +34,113 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def main():
+# Seconds between pool stats log lines while files are queued
+STATS_INTERVAL = 30
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AI Sentinel backend service")
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="Run extraction, analysis and DB insert in N worker processes "
+             "(default: 0, everything runs in this process)"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    batch = subparsers.add_parser("batch", help="Backfill a directory of archived emails and exit")
+    batch.add_argument("directory", type=Path, help="Directory of .txt/.msg/.eml files (searched recursively)")
+    batch.add_argument("--concurrency", type=int, default=4, help="Files processed at once (default: 4)")
+    batch.add_argument("--dry-run", action="store_true", help="Extract and analyse only; no DB writes or file moves")
+    batch.add_argument("--resume", action="store_true", help="Skip files recorded in the checkpoint of a previous run")
+    batch.add_argument("--checkpoint", type=Path, default=None, help="Checkpoint file (default: data/batch_checkpoints/)")
+    batch.add_argument("--report", type=Path, default=None, help="Also write the report as JSON to this path")
+    return parser.parse_args(argv)
+
+async def run_batch(args: argparse.Namespace):
+    init_db()
+    ingestor = BatchIngestor(
+        args.directory,
+        concurrency=args.concurrency,
+        dry_run=args.dry_run,
+        resume=args.resume,
+        checkpoint_path=args.checkpoint,
+    )
+    logger.info(f"Batch ingest of {args.directory} (checkpoint: {ingestor.checkpoint_path})")
+    report = await ingestor.run()
+    print(format_report(report))
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=4), encoding="utf-8")
+
+async def main(workers: int = 0):
     logger.info("Starting AI Sentinel Backend Service...")
     
     # 1. Initialize Database
     init_db()
     logger.info("Database initialized.")
 
-    # 2. Start Watcher
+    # Treat SIGTERM like Ctrl-C so workers and the observer shut down cleanly
     loop = asyncio.get_running_loop()
-    observer = start_watcher(INBOX_DIR, loop)
+    try:
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass  # Not supported on Windows
+
+    # 2. Start Watcher (and worker processes in multi-process mode)
+    pool = IngestionPool()
+    scanner = BacklogScanner()
+    supervisor = None
+    if workers > 0:
+        # The watcher only records jobs; worker processes claim and process them
+        observer = start_watcher(INBOX_DIR, loop, pool, scanner, enqueue_only=True)
+        supervisor = WorkerSupervisor(workers)
+        supervisor.start()
+    else:
+        # Connect to the model endpoint and load the model before the first file arrives
+        await warm_up()
+        observer = start_watcher(INBOX_DIR, loop, pool, scanner)
+        # Deep queues are analysed several emails per model call
+        configure_batching(lambda: pool.stats()["queue_depth"], pool.max_in_flight)
+        logger.info(f"Ingestion pool: {pool.workers} workers, max {pool.max_in_flight} in flight, high-water {pool.high_water}.")
     
-    # 3. Keep running
+    # 3. Keep running, reporting load while there is work queued
     try:
+        ticks = 0
         while True:
             await asyncio.sleep(1)
+            ticks += 1
+            if supervisor:
+                supervisor.check()
+            if ticks % STATS_INTERVAL != 0:
+                continue
+            job_counts = get_job_counts()
+            stats = pool.stats()
+            if supervisor and (job_counts["QUEUED"] or supervisor.alive() < workers):
+                logger.info(f"Worker processes alive: {supervisor.alive()}/{workers}, restarts: {supervisor.restarts}")
+                logger.info(f"Ingest jobs by state: {job_counts}")
+            elif not supervisor and (stats["queue_depth"] or stats["in_flight"]):
+                logger.info(f"Ingestion pool stats: {stats}")
+                logger.info(f"Ingest jobs by state: {job_counts}")
+                logger.info(f"Analysis cache: {get_analysis_cache().stats()}")
+                logger.info(f"Model endpoint: {get_scheduler_stats()}")
+                logger.info(f"Model cascade: {get_cascade_stats()}")
+                logger.info(f"Analysis batching: {get_batcher_stats()}")
+                logger.info(f"Fast path: {get_fast_path().stats()}")
+                logger.info(f"Token budgets: {get_telemetry().stats()}")
+                logger.info(f"Model usage, last hour: {get_usage_summary('model', since_hours=1)}")
     except asyncio.CancelledError:
         logger.info("Stopping service...")
     finally:
         observer.stop()
+        pool.stop()
         observer.join()
+        if supervisor:
+            supervisor.stop()
+        await close_agent()
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(main())
+        if args.command == "batch":
+            asyncio.run(run_batch(args))
+        else:
+            asyncio.run(main(args.workers))
     except KeyboardInterrupt:
-        pass
\ No newline at end of file
+        pass
@@ -1,12 +1,29 @@
+import asyncio
+import hashlib
 import logging
 import os
-from typing import List, Optional
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
+import httpx
 from dotenv import load_dotenv
+from openai import AsyncOpenAI
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.models import Model
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.ollama import OllamaProvider
-from backend.core.models import TaskProposal
-from backend.utils.config import load_projects, load_team
+from backend.core.models import BatchTaskProposal, TaskProposal
+from backend.core.preprocess import estimate_tokens
+from backend.services.analysis_batcher import AnalysisBatcher
+from backend.services.analysis_cache import AnalysisCache, make_cache_key
+from backend.services.fake_model import FakeModelBackend, is_fake_model
+from backend.services.http_client import build_http_client
+from backend.services.llm_scheduler import LLMScheduler
+from backend.services.retrieval import PromptSelection, RegistryIndex
+from backend.services.telemetry import (
+    SharedScope, TokenBudgetExceeded, current_scope, get_telemetry, member_scope, usage_scope,
+)
+from backend.utils.config import config_signature, load_projects, load_team
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,39 +31,26 @@ load_dotenv()
 # Setup logging
 logger = logging.getLogger(__name__)
 
-class TaskAnalysisAgent:
-    def __init__(self, model_name: Optional[str] = None, base_url: Optional[str] = None, api_key: Optional[str] = None):
-        # Priority: constructor arg > environment variable > default value
-        self.model_name = model_name or os.getenv("OLLAMA_MODEL", "gpt-oss:120b")
-        self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "https://ollama.com/v1/")
-        self.api_key = api_key or os.getenv("OLLAMA_API_KEY")
-        
-        # Configure the Ollama model using OpenAIChatModel and OllamaProvider
-        self.model = OpenAIChatModel(
-            model_name=self.model_name,
-            provider=OllamaProvider(
-                base_url=self.base_url,
-                api_key=self.api_key
-            )
-        )
-        self.agent = Agent(
-            self.model,
-            output_type=TaskProposal,
-            system_prompt="You are an expert Civil Engineering Project Manager AI (The Sentinel).",
-            retries=3
-        )
-        self._setup_agent()
+# Allowance for the structured answer when estimating a request's tokens
+OUTPUT_TOKENS_ESTIMATE = 400
 
-    def _setup_agent(self):
-        @self.agent.system_prompt
-        def get_dynamic_system_prompt(ctx: RunContext) -> str:
-            projects = load_projects()
-            team = load_team()
-            
-            projects_str = "\n".join([f"- {p['id']}: {p['name']} ({p['context']})" for p in projects])
-            team_str = "\n".join([f"- {t['name']} ({t['role']}): {', '.join(t['duties'])}. Projects: {', '.join(t['projects'])} " for t in team])
-            
-            return f"""
+BATCH_INSTRUCTIONS = """
+            **Batch Mode:**
+            The message contains several separate emails, each wrapped in <email index="N"> tags.
+            Analyze each email on its own and return exactly one result per email, with `index`
+            set to that email's index, all in a single `final_result` call.
+            """
+
+def format_batch(contents: List[str]) -> str:
+    """Packs several emails into one user message, numbered from 1."""
+    return "\n\n".join(f'<email index="{i}">\n{content}\n</email>' for i, content in enumerate(contents, 1))
+
+def build_system_prompt(projects: List[dict], team: List[dict]) -> str:
+    """Renders the routing instructions for the given projects and team."""
+    projects_str = "\n".join([f"- {p['id']}: {p['name']} ({p['context']})" for p in projects])
+    team_str = "\n".join([f"- {t['name']} ({t['role']}): {', '.join(t['duties'])}. Projects: {', '.join(t['projects'])} " for t in team])
+
+    return f"""
             Your job is to analyze incoming correspondence and route it to the correct engineer.
 
             **Active Projects:**
@@ -71,24 +75,515 @@ class TaskAnalysisAgent:
             - Do NOT output multiple JSON objects.
             """
 
+class SystemPromptCache:
+    """
+    Memoises the system prompt between runs.
+
+    The prompt is rebuilt only when config_signature() changes, i.e. when the
+    projects or team settings are saved or their files change on disk. An
+    unchanged prompt also lets the model server reuse its cached prompt prefix.
+    """
+    def __init__(self):
+        self._signature = None
+        self._prompt = ""
+        self.version: Optional[str] = None
+        self.builds = 0
+
+    def get(self) -> str:
+        # Take the signature before loading so an edit mid-load triggers another rebuild
+        signature = config_signature()
+        if signature != self._signature:
+            self._prompt = build_system_prompt(load_projects(), load_team())
+            # Derived from the prompt text, so it is stable across restarts
+            self.version = hashlib.sha256(self._prompt.encode("utf-8")).hexdigest()[:12]
+            self._signature = signature
+            self.builds += 1
+            logger.info(f"System prompt rebuilt (version {self.version})")
+        return self._prompt
+
+@dataclass
+class ModelTier:
+    """One model in the cascade, with the scheduler for its endpoint and its counters."""
+    name: str
+    model: Model
+    scheduler: LLMScheduler
+    base_url: Optional[str] = None
+    calls: int = 0
+    accepted: int = 0
+    escalated: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "accepted": self.accepted,
+            "escalated": self.escalated,
+            "failed": self.failed,
+            "hit_rate": self.accepted / self.calls if self.calls else 0.0,
+            "avg_seconds": self.seconds / self.calls if self.calls else 0.0,
+        }
+
+def parse_cascade(spec: str) -> List[tuple]:
+    """Parses "model[@base_url],..." into (model, base_url or None) pairs."""
+    tiers = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item:
+            name, _, url = item.partition("@")
+            tiers.append((name.strip(), url.strip() or None))
+    return tiers
+
+class TaskAnalysisAgent:
+    def __init__(self, model_name: Optional[str] = None, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 scheduler: Optional[LLMScheduler] = None, cascade: Optional[List[str]] = None,
+                 min_confidence: Optional[float] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.model_name = model_name or os.getenv("OLLAMA_MODEL", "gpt-oss:120b")
+        self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "https://ollama.com/v1/")
+        self.api_key = api_key or os.getenv("OLLAMA_API_KEY")
+        cascade_spec = ",".join(cascade) if cascade is not None else os.getenv("OLLAMA_CASCADE_MODELS", "")
+        self.min_confidence = min_confidence if min_confidence is not None else float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+
+        # Configure the Ollama model using OpenAIChatModel and OllamaProvider.
+        # Retries are left to the scheduler so an overloaded server is not
+        # hit by the client's own retries on top of ours.
+        self._providers: Dict[str, OllamaProvider] = {}
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.fake_backend: Optional[FakeModelBackend] = None
+        self._schedulers: Dict[str, LLMScheduler] = {self.base_url: scheduler or LLMScheduler()}
+        self.model = self._make_model(self.model_name, self.base_url)
+        self.scheduler = self._schedulers[self.base_url]
+
+        # Cheaper models tried first, each escalating to the next; OLLAMA_MODEL is the last tier
+        self.tiers: List[ModelTier] = []
+        for name, url in parse_cascade(cascade_spec):
+            url = url or self.base_url
+            self.tiers.append(ModelTier(name, self._make_model(name, url), self._scheduler_for(url), url))
+        self.tiers.append(ModelTier(self.model_name, self.model, self.scheduler, self.base_url))
+        self.prompt_cache = SystemPromptCache()
+        self.retrieval = RegistryIndex()
+        self.agent = Agent(
+            self.model,
+            deps_type=PromptSelection,
+            output_type=TaskProposal,
+            system_prompt="You are an expert Civil Engineering Project Manager AI (The Sentinel).",
+            retries=3
+        )
+        # Same prompt, but answers a list so several emails share one request
+        self.batch_agent = Agent(
+            self.model,
+            deps_type=PromptSelection,
+            output_type=List[BatchTaskProposal],
+            system_prompt="You are an expert Civil Engineering Project Manager AI (The Sentinel).",
+            retries=3
+        )
+        self._setup_agent()
+
+    def _make_model(self, name: str, base_url: str) -> Model:
+        # "fake" model names are answered locally, for offline benchmarking
+        if is_fake_model(name):
+            if self.fake_backend is None:
+                self.fake_backend = FakeModelBackend()
+            return self.fake_backend.model(name)
+        # One client per endpoint, shared by every model served from it. All
+        # endpoints share one pooled HTTP client so connections are reused.
+        if self.http_client is None:
+            self.http_client = build_http_client()
+        if base_url not in self._providers:
+            self._providers[base_url] = OllamaProvider(
+                openai_client=AsyncOpenAI(
+                    base_url=base_url,
+                    # Locally served models need no key, but the client requires one
+                    api_key=self.api_key or "api-key-not-set",
+                    max_retries=0,
+                    http_client=self.http_client
+                )
+            )
+        return OpenAIChatModel(model_name=name, provider=self._providers[base_url])
+
+    def _scheduler_for(self, base_url: str) -> LLMScheduler:
+        # Each endpoint gets its own limits and circuit breaker
+        if base_url not in self._schedulers:
+            self._schedulers[base_url] = LLMScheduler()
+        return self._schedulers[base_url]
+
+    def _setup_agent(self):
+        @self.agent.system_prompt
+        def get_dynamic_system_prompt(ctx: RunContext[PromptSelection]) -> str:
+            return self._system_prompt(ctx.deps)
+
+        @self.batch_agent.system_prompt
+        def get_batch_system_prompt(ctx: RunContext[PromptSelection]) -> str:
+            return self._system_prompt(ctx.deps) + BATCH_INSTRUCTIONS
+
+    def _system_prompt(self, selection: Optional[PromptSelection]) -> str:
+        """The shortlisted projects and team if retrieval picked them, else the cached full prompt."""
+        if selection is None:
+            return self.prompt_cache.get()
+        return build_system_prompt(selection.projects, selection.team)
+
+    def _run(self, agent: Agent, message: str, selection: Optional[PromptSelection],
+             model: Optional[Model] = None):
+        # deps and model are only passed when retrieval narrowed the prompt or
+        # a cheaper cascade tier overrides the agent's model
+        kwargs: Dict[str, Any] = {}
+        if selection is not None:
+            kwargs["deps"] = selection
+        if model is not None:
+            kwargs["model"] = model
+        return agent.run(message, **kwargs)
+
+    def escalation_reason(self, proposal: TaskProposal) -> Optional[str]:
+        """Why a cheaper tier's answer should go to the next model, or None to accept it."""
+        if proposal.confidence < self.min_confidence:
+            return f"confidence {proposal.confidence:.2f}"
+        self.retrieval.refresh()
+        if proposal.project_id not in {p["id"] for p in self.retrieval.projects}:
+            return f"unknown project {proposal.project_id!r}"
+        if proposal.assigned_to not in {t["name"] for t in self.retrieval.team}:
+            return f"unknown assignee {proposal.assigned_to!r}"
+        return None
+
+    async def _run_tier(self, tier: ModelTier, content: str, selection: Optional[PromptSelection]) -> TaskProposal:
+        # The last tier is the agent's own model, so no override is passed
+        model = tier.model if tier is not self.tiers[-1] else None
+        estimate = self.estimate_request_tokens(content, selection)
+        telemetry = get_telemetry()
+        telemetry.check_email(estimate)
+        attempts = 0
+
+        def call():
+            nonlocal attempts
+            attempts += 1
+            return self._run(self.agent, content, selection, model)
+
+        async with telemetry.reserve(estimate):
+            tier.calls += 1
+            started = time.perf_counter()
+            try:
+                result = await tier.scheduler.run(call, tokens=estimate, usage=_total_tokens)
+            except Exception:
+                tier.failed += 1
+                telemetry.record(tier.name, "failed", 0, 0, max(attempts - 1, 0), time.perf_counter() - started)
+                raise
+            finally:
+                tier.seconds += time.perf_counter() - started
+            _record_run(tier.name, "ok", result, attempts, time.perf_counter() - started)
+        return result.output
+
+    @property
+    def models_key(self) -> str:
+        """Identifies the model cascade, for cache keys."""
+        return ">".join(tier.name for tier in self.tiers)
+
+    async def warm_up(self, timeout: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """
+        Opens the endpoint connections and loads each model before the first
+        email arrives, by sending every tier a one-token request. Also builds
+        the system prompt and the registry index.
+
+        Returns the seconds each model took, or None where warm-up failed.
+        Failures are only logged; the first real request will retry.
+        """
+        # Priority: constructor arg > environment variable > default value
+        timeout = timeout or float(os.getenv("LLM_WARMUP_TIMEOUT", "60"))
+        self.prompt_cache.get()
+        self.retrieval.refresh()
+
+        async def ping(tier: ModelTier) -> Optional[float]:
+            if tier.base_url not in self._providers:
+                return 0.0  # Answered locally (fake model)
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._providers[tier.base_url].client.chat.completions.create(
+                    model=tier.name,
+                    messages=[{"role": "user", "content": "ping"}],
+                    max_tokens=1,
+                ), timeout)
+            except Exception as e:
+                logger.warning(f"Warm-up of model {tier.name} failed: {type(e).__name__}: {e}")
+                return None
+            return time.perf_counter() - started
+
+        seconds = await asyncio.gather(*(ping(tier) for tier in self.tiers))
+        timings = dict(zip((tier.name for tier in self.tiers), seconds))
+        logger.info(f"Model warm-up: {timings}")
+        return timings
+
+    async def aclose(self):
+        """Closes the pooled HTTP connections."""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+
+    def cascade_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tier hit rates and latency, cheapest tier first."""
+        return {tier.name: tier.stats() for tier in self.tiers}
+
+    @property
+    def prompt_version(self) -> str:
+        """Version id of the system prompt the next run will use."""
+        self.prompt_cache.get()
+        return self.prompt_cache.version
+
+    def estimate_request_tokens(self, content: str, selection: Optional[PromptSelection] = None) -> int:
+        """Rough size of one analysis request, for the scheduler's token limit."""
+        return estimate_tokens(self._system_prompt(selection)) + estimate_tokens(content) + OUTPUT_TOKENS_ESTIMATE
+
     async def analyze_content(self, content: str) -> TaskProposal:
+        return await self._cascade(content)
+
+    async def _cascade(self, content: str, start: int = 0, fallback: Optional[TaskProposal] = None) -> TaskProposal:
+        """
+        Tries the tiers from `start` on until one gives an acceptable answer.
+        `fallback` is an earlier tier's escalated answer, kept if the token
+        budget runs out.
+        """
         try:
-            result = await self.agent.run(content)
-            return result.output
+            selection = self.retrieval.select(content)
+            for tier in self.tiers[start:-1]:
+                try:
+                    proposal = await self._run_tier(tier, content, selection)
+                except TokenBudgetExceeded:
+                    if fallback is None:
+                        raise
+                    logger.warning("Token budget reached; keeping the previous model's answer.")
+                    return fallback
+                except Exception as e:
+                    # Includes output that failed validation after the agent's retries
+                    reason = f"error: {e}"
+                else:
+                    reason = self.escalation_reason(proposal)
+                    if reason is None:
+                        tier.accepted += 1
+                        return proposal
+                    fallback = proposal
+                tier.escalated += 1
+                logger.info(f"Escalating from {tier.name} ({reason}).")
+            try:
+                proposal = await self._run_tier(self.tiers[-1], content, selection)
+            except TokenBudgetExceeded:
+                if fallback is None:
+                    raise
+                logger.warning("Token budget reached; keeping the previous model's answer.")
+                return fallback
+            self.tiers[-1].accepted += 1
+            return proposal
         except Exception as e:
             logger.error(f"AI Analysis failed: {e}")
             raise e
 
-# Singleton instance
+    async def analyze_batch(self, contents: List[str]) -> List[Union[TaskProposal, Exception]]:
+        """
+        Analyses several emails in one request. Results come back in input order.
+
+        The request goes to the first cascade tier. Answers that tier would
+        escalate continue through the remaining tiers one by one. Emails the
+        batch answer does not cover, or all of them if the batch fails, go
+        through the whole cascade one by one. Emails that cannot afford their share
+        of the call under the per-email token budget are left out and get
+        TokenBudgetExceeded. Like asyncio.gather with
+        return_exceptions, an email whose analysis failed gets its exception
+        in place of a result.
+        """
+        if len(contents) == 1:
+            try:
+                return [await self.analyze_content(contents[0])]
+            except Exception as e:
+                return [e]
+
+        message = format_batch(contents)
+        by_index: Dict[int, TaskProposal] = {}
+        # Answers the first tier gave but would escalate, by email
+        escalated: Dict[int, TaskProposal] = {}
+        tier = self.tiers[0]
+        last = tier is self.tiers[-1]
+        telemetry = get_telemetry()
+        try:
+            selection = self.retrieval.select_many(contents)
+            estimate = self.estimate_request_tokens(message, selection) + OUTPUT_TOKENS_ESTIMATE * (len(contents) - 1)
+            # Each email pays its share of the call, so each must be able to afford it
+            over_budget = self._check_email_budgets(len(contents), estimate // len(contents))
+            if over_budget:
+                return await self._analyze_within_budget(contents, over_budget)
+            attempts = 0
+
+            def call():
+                nonlocal attempts
+                attempts += 1
+                # The last tier is the agent's own model, so no override is passed
+                return self._run(self.batch_agent, message, selection, None if last else tier.model)
+
+            async with telemetry.reserve(estimate):
+                # Counted per email so hit rates compare with single calls
+                tier.calls += len(contents)
+                started = time.perf_counter()
+                try:
+                    result = await tier.scheduler.run(call, tokens=estimate, usage=_total_tokens)
+                except Exception:
+                    tier.failed += len(contents)
+                    telemetry.record(tier.name, "failed", 0, 0, max(attempts - 1, 0),
+                                     time.perf_counter() - started, batch_size=len(contents))
+                    raise
+                finally:
+                    tier.seconds += time.perf_counter() - started
+                _record_run(tier.name, "batch", result, attempts, time.perf_counter() - started, len(contents))
+            for proposal in result.output:
+                if not 1 <= proposal.index <= len(contents) or proposal.index in by_index or proposal.index in escalated:
+                    continue
+                answer = TaskProposal(**proposal.model_dump(exclude={"index"}))
+                reason = None if last else self.escalation_reason(answer)
+                if reason is None:
+                    tier.accepted += 1
+                    by_index[proposal.index] = answer
+                else:
+                    tier.escalated += 1
+                    escalated[proposal.index] = answer
+                    logger.info(f"Escalating email {proposal.index} of the batch from {tier.name} ({reason}).")
+        except Exception as e:
+            logger.warning(f"Batch analysis of {len(contents)} emails failed ({e}); analysing them one by one.")
+
+        missing = [i for i in range(1, len(contents) + 1) if i not in by_index and i not in escalated]
+        if (by_index or escalated) and missing:
+            logger.warning(f"Batch answer missed emails {missing}; analysing them one by one.")
+        async def single(index: int) -> TaskProposal:
+            # Usage of a one-by-one retry belongs to that email alone
+            with member_scope(index - 1):
+                if index in escalated:
+                    return await self._cascade(contents[index - 1], start=1, fallback=escalated[index])
+                return await self.analyze_content(contents[index - 1])
+
+        pending = missing + sorted(escalated)
+        singles = await asyncio.gather(*(single(i) for i in pending), return_exceptions=True)
+        by_index.update(zip(pending, singles))
+        return [by_index[i] for i in range(1, len(contents) + 1)]
+
+    def _check_email_budgets(self, count: int, share: int) -> Dict[int, Exception]:
+        """The batch emails (by 1-based index) that cannot afford `share` more tokens, with the reason."""
+        over_budget: Dict[int, Exception] = {}
+        for index in range(1, count + 1):
+            with member_scope(index - 1):
+                try:
+                    get_telemetry().check_email(share)
+                except TokenBudgetExceeded as e:
+                    over_budget[index] = e
+        return over_budget
+
+    async def _analyze_within_budget(self, contents: List[str], over_budget: Dict[int, Exception]) -> List[Union[TaskProposal, Exception]]:
+        """Defers the emails over their budget and batches the rest without them."""
+        keep = [i for i in range(1, len(contents) + 1) if i not in over_budget]
+        results: Dict[int, Union[TaskProposal, Exception]] = dict(over_budget)
+        if keep:
+            scope = current_scope()
+            subset = [contents[i - 1] for i in keep]
+            if isinstance(scope, SharedScope):
+                # Keep the remaining emails' usage attributed to them
+                with usage_scope(SharedScope([scope.members[i - 1] for i in keep])):
+                    results.update(zip(keep, await self.analyze_batch(subset)))
+            else:
+                results.update(zip(keep, await self.analyze_batch(subset)))
+        return [results[i] for i in range(1, len(contents) + 1)]
+
+def _total_tokens(result) -> int:
+    """Tokens a run actually used, or 0 if the model did not report usage."""
+    total = result.usage.total_tokens
+    return total if isinstance(total, int) else 0
+
+def _record_run(model_name: str, outcome: str, result, attempts: int, seconds: float, batch_size: int = 1):
+    """Stores a finished run's usage. Retries count scheduler retries and output validation retries."""
+    usage = result.usage
+    counts = [usage.input_tokens, usage.output_tokens, usage.requests]
+    input_tokens, output_tokens, requests = (c if isinstance(c, int) else 0 for c in counts)
+    retries = max(attempts - 1, 0) + max(requests - 1, 0)
+    get_telemetry().record(model_name, outcome, input_tokens, output_tokens, retries, seconds, batch_size=batch_size)
+
+# Singleton instances
 _agent_instance: Optional[TaskAnalysisAgent] = None
+_cache_instance: Optional[AnalysisCache] = None
+_batcher_instance: Optional[AnalysisBatcher] = None
+# Returns how many files are waiting; batching only kicks in when it is high
+_backlog_source: Optional[Callable[[], int]] = None
+_batch_concurrency: Optional[int] = None
 
-async def analyze_content(content: str) -> TaskProposal:
+def configure_batching(backlog: Optional[Callable[[], int]], concurrency: Optional[int] = None):
     """
-    Standalone function to analyze content using a singleton TaskAnalysisAgent.
-    This maintains backward compatibility with consumers expecting a function.
+    Enables batched analysis for this process. `backlog` reports how many
+    files are waiting to be processed; pass None to turn batching off.
+    `concurrency` is how many files the process analyses at once, which
+    caps the batch size.
     """
-    global _agent_instance
+    global _backlog_source, _batch_concurrency
+    _backlog_source, _batch_concurrency = backlog, concurrency
+    if _batcher_instance is not None:
+        _batcher_instance.backlog = backlog
+        _batcher_instance.concurrency = concurrency
+
+def get_analysis_cache() -> AnalysisCache:
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = AnalysisCache()
+    return _cache_instance
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    """Model endpoint scheduler counters, or an empty dict before the first analysis."""
+    return _agent_instance.scheduler.stats() if _agent_instance else {}
+
+def get_cascade_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-model cascade counters, or an empty dict before the first analysis."""
+    return _agent_instance.cascade_stats() if _agent_instance else {}
+
+def get_batcher_stats() -> Dict[str, Any]:
+    """Batching counters, or an empty dict before the first analysis."""
+    return _batcher_instance.stats() if _batcher_instance else {}
+
+def get_agent() -> TaskAnalysisAgent:
+    """The process-wide agent, created on first use together with its batcher."""
+    global _agent_instance, _batcher_instance
     if _agent_instance is None:
         _agent_instance = TaskAnalysisAgent()
-    
-    return await _agent_instance.analyze_content(content)
\ No newline at end of file
+        _batcher_instance = AnalysisBatcher(_agent_instance, backlog=_backlog_source, concurrency=_batch_concurrency)
+    return _agent_instance
+
+async def warm_up() -> Dict[str, Optional[float]]:
+    """
+    Creates the agent and warms its model endpoints, so the first email does
+    not pay for connection setup and model loading. Disabled by LLM_WARMUP=false.
+    """
+    if os.getenv("LLM_WARMUP", "true").lower() != "true":
+        return {}
+    return await get_agent().warm_up()
+
+async def close_agent():
+    """Releases the agent's pooled connections at shutdown."""
+    if _agent_instance is not None:
+        await _agent_instance.aclose()
+
+async def analyze_content(content: str, use_cache: bool = True) -> TaskProposal:
+    """
+    Standalone function to analyze content using a singleton TaskAnalysisAgent.
+    This maintains backward compatibility with consumers expecting a function.
+
+    Results are cached by content, model and prompt version; pass
+    use_cache=False (or set ANALYSIS_CACHE_ENABLED=false) to always call the model.
+    """
+    get_agent()
+
+    cache = get_analysis_cache()
+    if not (use_cache and cache.enabled):
+        return await _analyze_uncached(content)
+
+    context_version = _agent_instance.prompt_version
+    key = make_cache_key(content, _agent_instance.models_key, context_version)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info("AI analysis served from cache.")
+        return cached
+    result = await _analyze_uncached(content)
+    cache.put(key, result, _agent_instance.models_key, context_version)
+    return result
+
+async def _analyze_uncached(content: str) -> TaskProposal:
+    """Calls the model, joining a batch with other emails when the backlog is deep."""
+    if _batcher_instance is not None and _batcher_instance.should_batch(content):
+        return await _batcher_instance.submit(content)
+    return await _agent_instance.analyze_content(content)
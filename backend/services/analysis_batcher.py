@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from backend.core.models import TaskProposal
+from backend.services.telemetry import SharedScope, UsageScope, current_scope, usage_scope
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+class AnalysisBatcher:
+    """
+    Micro-batcher that groups concurrent analysis requests into one model call.
+
+    While the backlog is at least min_backlog files, short emails wait up to
+    max_wait seconds for others to join, and up to max_size of them are sent
+    together through the agent's analyze_batch. With a shallow backlog each
+    email is analysed on its own, so latency is unchanged when traffic is light.
+    `concurrency` is how many files this process analyses at once; no more
+    emails than that can be waiting, so a batch is sent once they all are.
+    """
+    def __init__(self, agent, backlog: Optional[Callable[[], int]] = None,
+                 max_size: Optional[int] = None, max_wait: Optional[float] = None,
+                 max_chars: Optional[int] = None, min_backlog: Optional[int] = None,
+                 concurrency: Optional[int] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.agent = agent
+        self.backlog = backlog
+        self.concurrency = concurrency
+        self.max_size = max_size or int(os.getenv("ANALYSIS_BATCH_SIZE", "5"))
+        self.max_wait = max_wait or float(os.getenv("ANALYSIS_BATCH_WAIT", "0.5"))
+        self.max_chars = max_chars or int(os.getenv("ANALYSIS_BATCH_MAX_CHARS", "4000"))
+        self.min_backlog = min_backlog or int(os.getenv("ANALYSIS_BATCH_MIN_BACKLOG", "10"))
+        # Each email keeps its submitter's usage scope so a batch's tokens are split between them
+        self._pending: List[Tuple[str, asyncio.Future, Optional[UsageScope]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_items = 0
+
+    @property
+    def batch_size(self) -> int:
+        """Largest batch this process can fill."""
+        return min(self.max_size, self.concurrency) if self.concurrency else self.max_size
+
+    def should_batch(self, content: str) -> bool:
+        """Only short emails are batched, and only while files are piling up."""
+        if self.batch_size <= 1 or self.backlog is None or len(content) > self.max_chars:
+            return False
+        try:
+            return self.backlog() >= self.min_backlog
+        except Exception as e:
+            logger.warning(f"Could not read backlog depth: {e}")
+            return False
+
+    async def submit(self, content: str) -> TaskProposal:
+        """Queues an email for the next batch and waits for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        scope = current_scope()
+        self._pending.append((content, future, scope if isinstance(scope, UsageScope) else None))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Keep a reference so the task is not garbage collected mid-flight
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, Optional[UsageScope]]]):
+        self.batches += 1
+        self.batched_items += len(batch)
+        try:
+            with usage_scope(SharedScope([scope for _, _, scope in batch])):
+                results = await self.agent.analyze_batch([content for content, _, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue  # The caller gave up (e.g. cancelled)
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "avg_batch_size": self.batched_items / self.batches if self.batches else 0.0,
+        }
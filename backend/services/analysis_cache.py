@@ -0,0 +1,108 @@
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from backend.core.models import TaskProposal
+from backend.services.db_service import evict_cached_analyses, get_cached_analysis, put_cached_analysis
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+def normalize_content(content: str) -> str:
+    """Canonical form of an email body for cache keys: NFKC, whitespace collapsed."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", content)).strip()
+
+def make_cache_key(content: str, model_name: str, context_version: str) -> str:
+    """Hash of the normalised content, the model and the system prompt version."""
+    digest = hashlib.sha256()
+    for part in (model_name, context_version, normalize_content(content)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """
+    Two-level cache of AI analysis results.
+
+    Recent results live in an in-memory LRU; every result is also written to
+    the analysis_cache table so duplicates are recognised across restarts and
+    worker processes. Entries expire after ttl seconds, and the table is
+    trimmed to max_entries least recently used rows. Cache errors are logged
+    and treated as misses so they never stop analysis.
+    """
+    def __init__(self, enabled: Optional[bool] = None, memory_entries: Optional[int] = None,
+                 max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 evict_every: int = 100):
+        # Priority: constructor arg > environment variable > default value
+        self.enabled = enabled if enabled is not None else os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() != "false"
+        self.memory_entries = memory_entries or int(os.getenv("ANALYSIS_CACHE_MEMORY_ENTRIES", "256"))
+        self.max_entries = max_entries or int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "10000"))
+        self.ttl = ttl or float(os.getenv("ANALYSIS_CACHE_TTL", str(30 * 24 * 3600)))
+        self.evict_every = evict_every
+        self._memory: "OrderedDict[str, TaskProposal]" = OrderedDict()
+        # key -> time.monotonic() when the entry entered memory
+        self._stored_at: Dict[str, float] = {}
+        self._puts = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[TaskProposal]:
+        now = time.monotonic()
+        if key in self._memory:
+            if now - self._stored_at[key] < self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key].model_copy()
+            self._forget(key)
+
+        try:
+            cached = get_cached_analysis(key, self.ttl)
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed: {e}")
+            cached = None
+        if cached is None:
+            self.misses += 1
+            return None
+        result = TaskProposal.model_validate_json(cached)
+        self._remember(key, result, now)
+        self.disk_hits += 1
+        return result.model_copy()
+
+    def put(self, key: str, result: TaskProposal, model_name: str, context_version: str):
+        self._remember(key, result, time.monotonic())
+        try:
+            put_cached_analysis(key, model_name, context_version, result.model_dump_json())
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                evict_cached_analyses(self.ttl, self.max_entries)
+        except Exception as e:
+            logger.warning(f"Analysis cache write failed: {e}")
+
+    def _remember(self, key: str, result: TaskProposal, now: float):
+        self._memory[key] = result.model_copy()
+        self._memory.move_to_end(key)
+        self._stored_at[key] = now
+        while len(self._memory) > self.memory_entries:
+            oldest, _ = self._memory.popitem(last=False)
+            self._stored_at.pop(oldest, None)
+
+    def _forget(self, key: str):
+        self._memory.pop(key, None)
+        self._stored_at.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for logging and the dashboard."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
@@ -1,16 +1,118 @@
+import os
+import re
 import sqlite3
-from typing import List, Dict, Optional, Any
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, Iterator, List, Dict, Optional, Any, Sequence, Tuple, Union
 from backend.utils.config import DATA_DIR
 
 DB_PATH = DATA_DIR / "tasks.db"
 
+# Each thread keeps one open connection per database file
+_local = threading.local()
+
+def _connect(path) -> sqlite3.Connection:
+    """
+    Opens a tuned connection. WAL lets readers (dashboard sessions) run while
+    the ingestion worker writes, and synchronous=NORMAL is durable in WAL mode
+    apart from the last commits before a power loss. Writers that find the
+    database locked wait up to DB_BUSY_TIMEOUT seconds instead of failing.
+    """
+    busy_timeout = float(os.getenv("DB_BUSY_TIMEOUT", "30"))
+    cache_size_kb = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+    mmap_size = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    statement_cache = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+    conn = sqlite3.connect(path, timeout=busy_timeout, cached_statements=statement_cache)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    # A negative cache_size is in KiB rather than pages
+    conn.execute(f"PRAGMA cache_size = -{cache_size_kb}")
+    conn.execute(f"PRAGMA mmap_size = {mmap_size}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns this thread's persistent connection to DB_PATH, opening it on
+    first use. Connections are never shared between threads or processes,
+    and reusing them keeps sqlite3's prepared statement cache warm.
+    """
+    key = (os.getpid(), str(DB_PATH))
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(key)
+    if conn is None:
+        conn = connections[key] = _connect(DB_PATH)
+    return conn
+
+def close_connection():
+    """Closes this thread's connections, e.g. before a thread exits."""
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
+
+@contextmanager
+def _cursor(immediate: bool = False) -> Iterator[sqlite3.Cursor]:
+    """
+    Cursor on this thread's connection. Changes are committed when the block
+    ends and rolled back if it raises. With immediate=True the write lock is
+    taken up front, so a read followed by a write cannot race another writer.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if immediate:
+            cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+        if conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
 def init_db():
-    """Initializes the database table if it doesn't exist."""
+    """Creates the database if needed and applies any pending migrations."""
     # Ensure data directory exists
     DATA_DIR.mkdir(parents=True, exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+
+    with _cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT
+            )
+        """)
+    for version, migration in enumerate(MIGRATIONS, 1):
+        # One transaction per migration, holding the write lock so processes
+        # starting together cannot both apply it
+        with _cursor(immediate=True) as cursor:
+            cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+            if cursor.fetchone():
+                continue
+            migration(cursor)
+            cursor.execute(f"INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, {_NOW})",
+                           (version, migration.__name__.lstrip("_")))
+
+def get_schema_version() -> int:
+    """The highest migration applied to the database."""
+    with _cursor() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+# --- Migrations ---
+# Applied in order by init_db and recorded in schema_version. Each must also be
+# safe to run against a database that already has its changes, since databases
+# created before versioning started at version 0.
+
+def _create_base_schema(cursor: sqlite3.Cursor):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS tasks (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -24,73 +126,763 @@ def init_db():
             status TEXT DEFAULT 'PENDING'
         )
     """)
-    conn.commit()
-    conn.close()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_path TEXT NOT NULL,
+            staging_path TEXT,
+            state TEXT NOT NULL DEFAULT 'QUEUED',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker_id TEXT,
+            task_id INTEGER,
+            last_error TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            claimed_at TEXT,
+            staged_at TEXT,
+            extracted_at TEXT,
+            analysed_at TEXT,
+            inserted_at TEXT,
+            finished_at TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_state ON ingest_jobs (state, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_source ON ingest_jobs (source_path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_staging ON ingest_jobs (staging_path)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            context_version TEXT,
+            result TEXT NOT NULL,
+            created_at TEXT,
+            last_used_at TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_used ON analysis_cache (last_used_at)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER,
+            model TEXT NOT NULL,
+            outcome TEXT,
+            input_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            retries INTEGER NOT NULL DEFAULT 0,
+            latency_seconds REAL,
+            batch_size INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_created ON llm_usage (created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_task ON llm_usage (task_id)")
 
-def get_connection():
-    return sqlite3.connect(DB_PATH)
+def _add_task_timestamps_and_typed_deadline(cursor: sqlite3.Cursor):
+    """
+    Rebuilds tasks with created_at/updated_at and a deadline that must be an
+    ISO date (YYYY-MM-DD) or NULL. Placeholder deadlines ("None", "") become
+    NULL; other free text that is not a date is kept in the reasoning.
+    Existing tasks take created_at from their ingest job where there is one.
+    """
+    cursor.execute("PRAGMA table_info(tasks)")
+    if "created_at" in {row["name"] for row in cursor.fetchall()}:
+        return
+    cursor.execute(f"""
+        CREATE TABLE tasks_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_file TEXT,
+            original_subject TEXT,
+            summary TEXT,
+            deadline TEXT CHECK (deadline IS NULL OR deadline = date(deadline)),
+            project_id TEXT,
+            assignee TEXT,
+            reasoning TEXT,
+            status TEXT DEFAULT 'PENDING',
+            created_at TEXT NOT NULL DEFAULT ({_NOW}),
+            updated_at TEXT NOT NULL DEFAULT ({_NOW})
+        )
+    """)
+    cursor.execute(f"""
+        INSERT INTO tasks_new (id, source_file, original_subject, summary, deadline, project_id,
+                               assignee, reasoning, status, created_at, updated_at)
+        SELECT t.id, t.source_file, t.original_subject, t.summary,
+               date(substr(trim(t.deadline), 1, 10)),
+               t.project_id, t.assignee,
+               CASE WHEN date(substr(trim(t.deadline), 1, 10)) IS NULL
+                         AND trim(COALESCE(t.deadline, '')) NOT IN ('', 'None', 'null', 'NULL')
+                    THEN COALESCE(t.reasoning, '') || char(10) || '(Deadline given as: ' || t.deadline || ')'
+                    ELSE t.reasoning END,
+               t.status,
+               COALESCE((SELECT MIN(j.inserted_at) FROM ingest_jobs j WHERE j.task_id = t.id), {_NOW}),
+               COALESCE((SELECT MIN(j.inserted_at) FROM ingest_jobs j WHERE j.task_id = t.id), {_NOW})
+        FROM tasks t
+    """)
+    cursor.execute("DROP TABLE tasks")
+    cursor.execute("ALTER TABLE tasks_new RENAME TO tasks")
+
+def _index_tasks(cursor: sqlite3.Cursor):
+    """Indexes for the dashboard's status filters and deadline ordering."""
+    # SQLite appends the rowid to every index, so "WHERE status = ? ORDER BY id" needs no sort
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status_project ON tasks (status, project_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status_assignee ON tasks (status, assignee)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_deadline ON tasks (deadline)")
+
+def _index_task_deadlines_by_status(cursor: sqlite3.Cursor):
+    """Lets query_tasks page a status sorted by deadline without a sort step."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status_deadline ON tasks (status, deadline)")
+
+# Text columns covered by full-text search, and their bm25 weights for ranking
+_SEARCH_COLUMNS = {"original_subject": 3.0, "summary": 3.0, "reasoning": 1.0, "source_file": 2.0}
+
+def _add_task_search_index(cursor: sqlite3.Cursor):
+    """
+    FTS5 index over the tasks' text, stored as an external-content table so
+    the text is not duplicated. Triggers keep it in step with tasks.
+    """
+    columns = ", ".join(_SEARCH_COLUMNS)
+    old = ", ".join(f"old.{column}" for column in _SEARCH_COLUMNS)
+    new = ", ".join(f"new.{column}" for column in _SEARCH_COLUMNS)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            {columns}, content='tasks', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, {columns}) VALUES (new.id, {new});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, {columns}) VALUES ('delete', old.id, {old});
+        END
+    """)
+    # Status and assignment changes leave the indexed text alone, so skip them
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF {columns} ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, {columns}) VALUES ('delete', old.id, {old});
+            INSERT INTO tasks_fts (rowid, {columns}) VALUES (new.id, {new});
+        END
+    """)
+    cursor.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _create_base_schema,
+    _add_task_timestamps_and_typed_deadline,
+    _index_tasks,
+    _index_task_deadlines_by_status,
+    _add_task_search_index,
+]
+
+# --- Tasks ---
+
+def normalize_deadline(value: Union[date, datetime, str, None]) -> Optional[str]:
+    """
+    Converts a deadline to the stored form: an ISO date string, or None.
+    Raises ValueError for text that is not a YYYY-MM-DD date.
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if value is None or value.strip() in ("", "None"):
+        return None
+    try:
+        return date.fromisoformat(value.strip()[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Deadline must be a date in YYYY-MM-DD form, got {value!r}")
 
 def create_task(source_file: str, original_subject: str, summary: str, 
-                deadline: str, project_id: str, assignee: str, reasoning: str, 
+                deadline: Union[date, datetime, str, None], project_id: str, assignee: str, reasoning: str,
                 status: str = "PENDING") -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO tasks (source_file, original_subject, summary, deadline, project_id, assignee, reasoning, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (source_file, original_subject, summary, deadline, project_id, assignee, reasoning, status))
-    task_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    deadline = normalize_deadline(deadline)
+    with _cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO tasks (source_file, original_subject, summary, deadline, project_id, assignee, reasoning, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (source_file, original_subject, summary, deadline, project_id, assignee, reasoning, status))
+        task_id = cursor.lastrowid
     if task_id is None:
         raise ValueError("Failed to retrieve task ID after insertion")
     return task_id
 
 def get_tasks(status: Optional[str] = None) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    if status:
-        cursor.execute("SELECT * FROM tasks WHERE status = ? ORDER BY id DESC", (status,))
-    else:
-        cursor.execute("SELECT * FROM tasks ORDER BY id DESC")
-        
-    rows = cursor.fetchall()
-    conn.close()
+    with _cursor() as cursor:
+        if status:
+            cursor.execute("SELECT * FROM tasks WHERE status = ? ORDER BY id DESC", (status,))
+        else:
+            cursor.execute("SELECT * FROM tasks ORDER BY id DESC")
+        rows = cursor.fetchall()
     return [dict(row) for row in rows]
 
+# Columns query_tasks can return
+TASK_COLUMNS = ("id", "source_file", "original_subject", "summary", "deadline", "project_id",
+                "assignee", "reasoning", "status", "created_at", "updated_at")
+# Sort keys: column and whether it is descending. Ties are broken by id in the
+# same direction, and tasks without a deadline always come last.
+TASK_SORTS = {
+    "id": ("id", False),
+    "-id": ("id", True),
+    "deadline": ("deadline", False),
+    "-deadline": ("deadline", True),
+}
+
+def search_expression(text: str) -> Optional[str]:
+    """
+    Turns free text into an FTS5 query matching tasks that contain every
+    word, each as a prefix ("cab insp" finds "cable inspection"). Returns
+    None if the text has no words.
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words) or None
+
+def _task_filters(status: Optional[str] = None, project_id: Optional[str] = None, assignee: Optional[str] = None,
+                  deadline_from: Union[date, str, None] = None, deadline_to: Union[date, str, None] = None,
+                  search: Optional[str] = None) -> Tuple[List[str], List[Any]]:
+    """WHERE clauses and parameters shared by query_tasks and count_tasks."""
+    clauses: List[str] = []
+    params: List[Any] = []
+    for column, value in (("status", status), ("project_id", project_id), ("assignee", assignee)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if deadline_from is not None:
+        clauses.append("deadline >= ?")
+        params.append(normalize_deadline(deadline_from))
+    if deadline_to is not None:
+        clauses.append("deadline <= ?")
+        params.append(normalize_deadline(deadline_to))
+    match = search_expression(search) if search else None
+    if match:
+        clauses.append("id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)")
+        params.append(match)
+    return clauses, params
+
+def _keyset(column: str, descending: bool, anchor_id: int, anchor_value: Any, before: bool) -> Tuple[str, List[Any]]:
+    """
+    Predicate for the rows after (or before) the anchor row in the order
+    "column [DESC] NULLS LAST, id [DESC]".
+    """
+    forward = "<" if descending else ">"
+    op = {"<": ">", ">": "<"}[forward] if before else forward
+    if column == "id":
+        return f"id {op} ?", [anchor_id]
+    if anchor_value is None:
+        # The anchor is among the trailing NULLs
+        if before:
+            return f"({column} IS NOT NULL OR id {op} ?)", [anchor_id]
+        return f"({column} IS NULL AND id {op} ?)", [anchor_id]
+    predicate = f"({column} {op} ? OR ({column} = ? AND id {op} ?)"
+    predicate += ")" if before else f" OR {column} IS NULL)"
+    return predicate, [anchor_value, anchor_value, anchor_id]
+
+def query_tasks(columns: Optional[Sequence[str]] = None, status: Optional[str] = None,
+                project_id: Optional[str] = None, assignee: Optional[str] = None,
+                deadline_from: Union[date, str, None] = None, deadline_to: Union[date, str, None] = None,
+                search: Optional[str] = None, sort: str = "-id",
+                after_id: Optional[int] = None, before_id: Optional[int] = None,
+                limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Returns one page of tasks, selecting only `columns` (id and the sort
+    column are always included).
+
+    Pages are keyset-based: pass the last row's id as after_id for the next
+    page, or the first row's id as before_id for the previous one. Each page
+    is an index range scan, so its cost does not grow with the table.
+    `search` keeps tasks containing every word of it (see search_tasks).
+    """
+    if sort not in TASK_SORTS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    column, descending = TASK_SORTS[sort]
+    selected = list(dict.fromkeys(["id", column, *(columns or TASK_COLUMNS)]))
+    unknown = set(selected) - set(TASK_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown task columns: {sorted(unknown)}")
+
+    clauses, params = _task_filters(status, project_id, assignee, deadline_from, deadline_to, search)
+    anchor_id = before_id if before_id is not None else after_id
+    before = before_id is not None
+    with _cursor() as cursor:
+        if anchor_id is not None:
+            anchor_value = None
+            if column != "id":
+                cursor.execute(f"SELECT {column} FROM tasks WHERE id = ?", (anchor_id,))
+                row = cursor.fetchone()
+                anchor_value = row[0] if row else None
+            predicate, keyset_params = _keyset(column, descending, anchor_id, anchor_value, before)
+            clauses.append(predicate)
+            params.extend(keyset_params)
+
+        # A previous page is read in reverse order from the anchor, then flipped
+        reverse = descending != before
+        direction = "DESC" if reverse else "ASC"
+        nulls = "NULLS FIRST" if before else "NULLS LAST"
+        order = f"id {direction}" if column == "id" else f"{column} {direction} {nulls}, id {direction}"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor.execute(f"SELECT {', '.join(selected)} FROM tasks {where} ORDER BY {order} LIMIT ?", (*params, limit))
+        rows = [dict(row) for row in cursor.fetchall()]
+    return rows[::-1] if before else rows
+
+def search_tasks(search: str, columns: Optional[Sequence[str]] = None, status: Optional[str] = None,
+                 project_id: Optional[str] = None, assignee: Optional[str] = None,
+                 deadline_from: Union[date, str, None] = None, deadline_to: Union[date, str, None] = None,
+                 limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Full-text search over subject, summary, reasoning and source file,
+    returning the `limit` best matches by bm25 rank (subject and summary
+    hits count most). Takes the same filters and projection as query_tasks.
+    """
+    match = search_expression(search)
+    if not match:
+        return []
+    selected = list(dict.fromkeys(["id", *(columns or TASK_COLUMNS)]))
+    unknown = set(selected) - set(TASK_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown task columns: {sorted(unknown)}")
+
+    clauses, params = _task_filters(status, project_id, assignee, deadline_from, deadline_to)
+    where = "".join(f" AND {clause}" for clause in clauses)
+    weights = ", ".join(str(weight) for weight in _SEARCH_COLUMNS.values())
+    with _cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {", ".join(f"tasks.{column}" for column in selected)}
+            FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid
+            WHERE tasks_fts MATCH ?{where}
+            ORDER BY bm25(tasks_fts, {weights}), tasks.id DESC
+            LIMIT ?
+        """, (match, *params, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+def count_tasks(status: Optional[str] = None, project_id: Optional[str] = None, assignee: Optional[str] = None,
+                deadline_from: Union[date, str, None] = None, deadline_to: Union[date, str, None] = None,
+                search: Optional[str] = None) -> int:
+    """Number of tasks matching the same filters as query_tasks."""
+    clauses, params = _task_filters(status, project_id, assignee, deadline_from, deadline_to, search)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM tasks {where}", params)
+        return cursor.fetchone()[0]
+
 def get_task_by_id(task_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with _cursor() as cursor:
+        cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+        row = cursor.fetchone()
     if row:
         return dict(row)
     return None
 
 def update_task(task_id: int, updates: Dict[str, Any]):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
     if not updates:
-        conn.close()
         return
 
+    updates = dict(updates)
+    if "deadline" in updates:
+        updates["deadline"] = normalize_deadline(updates["deadline"])
     set_clause = ", ".join([f"{key} = ?" for key in updates.keys()])
+    set_clause += f", updated_at = {_NOW}"
     values = list(updates.values())
     values.append(task_id)
-    
-    cursor.execute(f"UPDATE tasks SET {set_clause} WHERE id = ?", values)
-    conn.commit()
-    conn.close()
+
+    with _cursor() as cursor:
+        cursor.execute(f"UPDATE tasks SET {set_clause} WHERE id = ?", values)
 
 def delete_task(task_id: int):
     """Delete a task (mostly for testing or cleanup if needed)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    with _cursor() as cursor:
+        cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+# --- Bulk task operations ---
+# Each runs as one transaction with executemany, so acting on many tasks
+# costs a single commit and either applies to all of them or to none.
+
+_CREATE_FIELDS = ("source_file", "original_subject", "summary", "deadline", "project_id", "assignee", "reasoning", "status")
+_UPDATABLE_FIELDS = set(_CREATE_FIELDS)
+
+def create_tasks_many(tasks: Sequence[Dict[str, Any]]) -> List[int]:
+    """
+    Inserts tasks given as dicts of create_task's arguments (status defaults
+    to PENDING) and returns their ids in the same order.
+    """
+    if not tasks:
+        return []
+    rows = []
+    for task in tasks:
+        task = {"status": "PENDING", **task}
+        task["deadline"] = normalize_deadline(task.get("deadline"))
+        rows.append(tuple(task[field] for field in _CREATE_FIELDS))
+    # The write lock is held from the start, so the new ids are the highest ones
+    with _cursor(immediate=True) as cursor:
+        cursor.executemany(f"""
+            INSERT INTO tasks ({", ".join(_CREATE_FIELDS)})
+            VALUES ({", ".join("?" for _ in _CREATE_FIELDS)})
+        """, rows)
+        cursor.execute("SELECT id FROM tasks ORDER BY id DESC LIMIT ?", (len(rows),))
+        return [row[0] for row in reversed(cursor.fetchall())]
+
+def update_tasks_many(updates: Dict[int, Dict[str, Any]]) -> int:
+    """
+    Applies per-task updates ({task_id: {column: value}}) in one transaction.
+    Tasks updating the same set of columns share one executemany statement.
+    Returns the number of tasks updated.
+    """
+    groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+    for task_id, fields in updates.items():
+        if not fields:
+            continue
+        unknown = set(fields) - _UPDATABLE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown task columns: {sorted(unknown)}")
+        fields = dict(fields)
+        if "deadline" in fields:
+            fields["deadline"] = normalize_deadline(fields["deadline"])
+        keys = tuple(sorted(fields))
+        groups.setdefault(keys, []).append([fields[key] for key in keys] + [task_id])
+
+    updated = 0
+    with _cursor() as cursor:
+        for keys, rows in groups.items():
+            set_clause = ", ".join(f"{key} = ?" for key in keys)
+            cursor.executemany(f"UPDATE tasks SET {set_clause}, updated_at = {_NOW} WHERE id = ?", rows)
+            updated += cursor.rowcount
+    return updated
+
+def set_status_many(task_ids: Sequence[int], status: str) -> int:
+    """Moves the given tasks to `status`. Returns the number of tasks changed."""
+    with _cursor() as cursor:
+        cursor.executemany(f"UPDATE tasks SET status = ?, updated_at = {_NOW} WHERE id = ?",
+                           [(status, task_id) for task_id in task_ids])
+        return max(cursor.rowcount, 0)
+
+def delete_tasks_many(task_ids: Sequence[int]) -> int:
+    """Deletes the given tasks. Returns the number of tasks deleted."""
+    with _cursor() as cursor:
+        cursor.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in task_ids])
+        return max(cursor.rowcount, 0)
+
+# --- Ingestion job queue ---
+
+# Job lifecycle, in pipeline order. DONE and FAILED are terminal.
+JOB_STATES = ["QUEUED", "CLAIMED", "STAGED", "EXTRACTED", "ANALYSED", "INSERTED", "DONE", "FAILED"]
+ACTIVE_JOB_STATES = JOB_STATES[:-2]
+
+# Timestamp column stamped when a job enters each state
+_JOB_STAGE_COLUMNS = {
+    "CLAIMED": "claimed_at",
+    "STAGED": "staged_at",
+    "EXTRACTED": "extracted_at",
+    "ANALYSED": "analysed_at",
+    "INSERTED": "inserted_at",
+    "DONE": "finished_at",
+    "FAILED": "finished_at",
+}
+
+# Millisecond precision so per-stage latencies can be measured
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+def _active_placeholders() -> str:
+    return ", ".join("?" for _ in ACTIVE_JOB_STATES)
+
+def enqueue_job(source_path: str, staging_path: Optional[str] = None) -> int:
+    """
+    Adds a file to the ingestion queue.
+    If an unfinished job already tracks this file (by source or staging path),
+    its id is returned instead of creating a duplicate.
+    """
+    with _cursor(immediate=True) as cursor:
+        cursor.execute(f"""
+            SELECT id FROM ingest_jobs
+            WHERE (source_path = ? OR staging_path = ?) AND state IN ({_active_placeholders()})
+            ORDER BY id LIMIT 1
+        """, (source_path, source_path, *ACTIVE_JOB_STATES))
+        row = cursor.fetchone()
+        if row:
+            job_id = row[0]
+        else:
+            cursor.execute(f"""
+                INSERT INTO ingest_jobs (source_path, staging_path, state, created_at, updated_at)
+                VALUES (?, ?, 'QUEUED', {_NOW}, {_NOW})
+            """, (source_path, staging_path))
+            job_id = cursor.lastrowid
+    if job_id is None:
+        raise ValueError("Failed to retrieve job ID after insertion")
+    return job_id
+
+def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    with _cursor() as cursor:
+        cursor.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+    if row:
+        return dict(row)
+    return None
+
+def claim_job(job_id: int, worker_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claims a specific queued job.
+    Returns the job, or None if it is no longer queued (another worker won).
+    """
+    with _cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE ingest_jobs
+            SET state = 'CLAIMED', worker_id = ?, attempts = attempts + 1,
+                claimed_at = {_NOW}, updated_at = {_NOW}
+            WHERE id = ? AND state = 'QUEUED'
+        """, (worker_id, job_id))
+        claimed = cursor.rowcount == 1
+    return get_job(job_id) if claimed else None
+
+def _retry_delay(retry_delay: Optional[float]) -> float:
+    return retry_delay if retry_delay is not None else float(os.getenv("INGEST_RETRY_DELAY", "30"))
+
+# A failed job is retried retry_delay seconds after its failure, doubling with
+# each further attempt (capped at 2^10 times); new jobs are due at once
+_RETRY_DUE = """(attempts = 0 OR updated_at <= strftime('%Y-%m-%d %H:%M:%f', 'now',
+                 printf('-%.3f seconds', ? * (1 << MIN(attempts - 1, 10)))))"""
+
+def claim_next_job(worker_id: str, retry_delay: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claims the oldest queued job whose retry backoff has passed.
+    Safe to call from several worker processes at once.
+    """
+    # IMMEDIATE takes the write lock up front so two workers can't pick the same row
+    with _cursor(immediate=True) as cursor:
+        cursor.execute(f"SELECT id FROM ingest_jobs WHERE state = 'QUEUED' AND {_RETRY_DUE} ORDER BY id LIMIT 1",
+                       (_retry_delay(retry_delay),))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(f"""
+                UPDATE ingest_jobs
+                SET state = 'CLAIMED', worker_id = ?, attempts = attempts + 1,
+                    claimed_at = {_NOW}, updated_at = {_NOW}
+                WHERE id = ?
+            """, (worker_id, row[0]))
+    return get_job(row[0]) if row else None
+
+def advance_job(job_id: int, state: str, **fields: Any):
+    """
+    Moves a job to the given state, stamping that stage's timestamp.
+    Extra keyword arguments (e.g. staging_path, task_id) are stored on the job.
+    """
+    if state not in JOB_STATES:
+        raise ValueError(f"Unknown job state: {state}")
+
+    updates = dict(fields)
+    updates["state"] = state
+    set_clause = ", ".join([f"{key} = ?" for key in updates.keys()])
+    stage_column = _JOB_STAGE_COLUMNS.get(state)
+    if stage_column:
+        set_clause += f", {stage_column} = {_NOW}"
+    set_clause += f", updated_at = {_NOW}"
+
+    with _cursor() as cursor:
+        cursor.execute(f"UPDATE ingest_jobs SET {set_clause} WHERE id = ?", [*updates.values(), job_id])
+
+def fail_job(job_id: int, error: str, retry: bool = True, max_attempts: int = 3):
+    """
+    Records a failure. Retryable jobs go back to QUEUED until they have been
+    attempted max_attempts times, after which they are marked FAILED. Queued
+    retries are picked up again once their backoff has passed (see
+    get_due_retries and claim_next_job).
+    """
+    with _cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE ingest_jobs
+            SET state = CASE WHEN ? AND attempts < ? THEN 'QUEUED' ELSE 'FAILED' END,
+                finished_at = CASE WHEN ? AND attempts < ? THEN NULL ELSE {_NOW} END,
+                last_error = ?, worker_id = NULL, updated_at = {_NOW}
+            WHERE id = ?
+        """, (retry, max_attempts, retry, max_attempts, error, job_id))
+
+def get_due_retries(retry_delay: Optional[float] = None, limit: int = 100,
+                    job_ids: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Queued jobs that failed before and whose retry backoff has passed, oldest
+    first. If job_ids is given, only those jobs are considered.
+    """
+    query = f"SELECT * FROM ingest_jobs WHERE state = 'QUEUED' AND attempts > 0 AND {_RETRY_DUE}"
+    params: List[Any] = [_retry_delay(retry_delay)]
+    if job_ids is not None:
+        query += f" AND id IN ({', '.join('?' for _ in job_ids)})"
+        params.extend(job_ids)
+    with _cursor() as cursor:
+        cursor.execute(query + " ORDER BY id LIMIT ?", params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+
+def requeue_stale_jobs(worker_id: Optional[str] = None) -> int:
+    """
+    Puts jobs that were in progress back on the queue, e.g. after a crash.
+    If worker_id is given, only that worker's jobs are requeued.
+    Returns the number of jobs requeued.
+    """
+    in_progress = [s for s in ACTIVE_JOB_STATES if s != "QUEUED"]
+    placeholders = ", ".join("?" for _ in in_progress)
+    query = f"UPDATE ingest_jobs SET state = 'QUEUED', worker_id = NULL, updated_at = {_NOW} WHERE state IN ({placeholders})"
+    params: List[Any] = list(in_progress)
+    if worker_id is not None:
+        query += " AND worker_id = ?"
+        params.append(worker_id)
+
+    with _cursor() as cursor:
+        cursor.execute(query, params)
+        count = cursor.rowcount
+    return count
+
+def get_jobs(state: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+    """Returns jobs in the given state (oldest first), or the most recent jobs."""
+    with _cursor() as cursor:
+        # SQLite treats a negative LIMIT as no limit
+        limit = -1 if limit is None else limit
+        if state:
+            cursor.execute("SELECT * FROM ingest_jobs WHERE state = ? ORDER BY id LIMIT ?", (state, limit))
+        else:
+            cursor.execute("SELECT * FROM ingest_jobs ORDER BY id DESC LIMIT ?", (limit,))
+        rows = cursor.fetchall()
+    return [dict(row) for row in rows]
+
+def get_job_counts() -> Dict[str, int]:
+    """Returns the number of jobs in each state."""
+    with _cursor() as cursor:
+        cursor.execute("SELECT state, COUNT(*) FROM ingest_jobs GROUP BY state")
+        counts = {state: 0 for state in JOB_STATES}
+        counts.update({state: count for state, count in cursor.fetchall()})
+    return counts
+
+def get_job_stage_stats(since_hours: float = 24) -> Dict[str, Dict[str, float]]:
+    """
+    Returns per-stage latency for jobs finished in the last `since_hours`.
+    Each stage maps to {"count", "avg_seconds", "max_seconds"}; "total" covers
+    claim to finish and includes throughput in jobs per minute.
+    """
+    stages = [
+        ("claim", "claimed_at", "staged_at"),
+        ("extract", "staged_at", "extracted_at"),
+        ("analyse", "extracted_at", "analysed_at"),
+        ("insert", "analysed_at", "inserted_at"),
+        ("move", "inserted_at", "finished_at"),
+        ("total", "claimed_at", "finished_at"),
+    ]
+    with _cursor() as cursor:
+        stats: Dict[str, Dict[str, float]] = {}
+        for name, start_col, end_col in stages:
+            cursor.execute(f"""
+                SELECT COUNT(*),
+                       AVG((julianday({end_col}) - julianday({start_col})) * 86400),
+                       MAX((julianday({end_col}) - julianday({start_col})) * 86400)
+                FROM ingest_jobs
+                WHERE state = 'DONE' AND {start_col} IS NOT NULL AND {end_col} IS NOT NULL
+                  AND finished_at >= strftime('%Y-%m-%d %H:%M:%f', 'now', ?)
+            """, (f"-{since_hours} hours",))
+            count, avg, peak = cursor.fetchone()
+            stats[name] = {"count": count, "avg_seconds": avg or 0.0, "max_seconds": peak or 0.0}
+
+        cursor.execute("""
+            SELECT (julianday(MAX(finished_at)) - julianday(MIN(claimed_at))) * 1440 FROM ingest_jobs
+            WHERE state = 'DONE' AND finished_at >= strftime('%Y-%m-%d %H:%M:%f', 'now', ?)
+        """, (f"-{since_hours} hours",))
+        span_minutes = cursor.fetchone()[0]
+
+    total = stats["total"]
+    total["jobs_per_minute"] = total["count"] / span_minutes if span_minutes else 0.0
+    return stats
+
+def get_cached_analysis(key: str, ttl_seconds: float) -> Optional[str]:
+    """Returns the cached analysis JSON for a key if it is younger than ttl_seconds."""
+    with _cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE analysis_cache SET last_used_at = {_NOW}
+            WHERE key = ? AND created_at > strftime('%Y-%m-%d %H:%M:%f', 'now', ?)
+            RETURNING result
+        """, (key, f"-{ttl_seconds:.3f} seconds"))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def put_cached_analysis(key: str, model: str, context_version: str, result: str):
+    """Stores (or refreshes) an analysis result in the cache."""
+    with _cursor() as cursor:
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO analysis_cache (key, model, context_version, result, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, {_NOW}, {_NOW})
+        """, (key, model, context_version, result))
+
+def evict_cached_analyses(ttl_seconds: float, max_entries: int) -> int:
+    """
+    Deletes cache entries older than ttl_seconds, then the least recently used
+    entries beyond max_entries. Returns the number of entries removed.
+    """
+    with _cursor() as cursor:
+        cursor.execute("DELETE FROM analysis_cache WHERE created_at <= strftime('%Y-%m-%d %H:%M:%f', 'now', ?)",
+                       (f"-{ttl_seconds:.3f} seconds",))
+        removed = cursor.rowcount
+        cursor.execute("""
+            DELETE FROM analysis_cache WHERE key IN (
+                SELECT key FROM analysis_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (max_entries,))
+        removed += cursor.rowcount
+    return removed
+
+# --- Model usage telemetry ---
+
+# Groupings offered by get_usage_summary; project comes from the linked task
+_USAGE_GROUPS = {
+    "hour": "strftime('%Y-%m-%d %H:00', u.created_at)",
+    "model": "u.model",
+    "project": "COALESCE(t.project_id, '(none)')",
+}
+
+def record_usage(model: str, outcome: str, input_tokens: int, output_tokens: int, retries: int,
+                 latency_seconds: float, batch_size: int = 1, task_id: Optional[int] = None) -> int:
+    """Stores one model call's token counts and latency. Returns the row id."""
+    with _cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO llm_usage (task_id, model, outcome, input_tokens, output_tokens, total_tokens,
+                                   retries, latency_seconds, batch_size, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {_NOW})
+        """, (task_id, model, outcome, input_tokens, output_tokens, input_tokens + output_tokens,
+              retries, latency_seconds, batch_size))
+        usage_id = cursor.lastrowid
+    if usage_id is None:
+        raise ValueError("Failed to retrieve usage ID after insertion")
+    return usage_id
+
+def link_usage(usage_ids: List[int], task_id: int):
+    """Attaches usage rows recorded while analysing an email to the task it produced."""
+    if not usage_ids:
+        return
+    with _cursor() as cursor:
+        cursor.executemany("UPDATE llm_usage SET task_id = ? WHERE id = ?", [(task_id, i) for i in usage_ids])
+
+def get_tokens_used(since_seconds: float) -> int:
+    """Total tokens recorded in the last `since_seconds`."""
+    with _cursor() as cursor:
+        cursor.execute("SELECT COALESCE(SUM(total_tokens), 0) FROM llm_usage WHERE created_at > strftime('%Y-%m-%d %H:%M:%f', 'now', ?)",
+                       (f"-{since_seconds:.3f} seconds",))
+        total = cursor.fetchone()[0]
+    return total
+
+def get_usage_summary(group_by: str = "hour", since_hours: float = 24) -> List[Dict[str, Any]]:
+    """
+    Rolling usage aggregates for the last `since_hours`, grouped by "hour",
+    "model" or "project". Each row has the group key, calls, distinct tasks,
+    token totals, retries and average/max latency.
+    """
+    if group_by not in _USAGE_GROUPS:
+        raise ValueError(f"Unknown usage grouping: {group_by}")
+    with _cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {_USAGE_GROUPS[group_by]} AS key,
+                   COUNT(*) AS calls,
+                   COUNT(DISTINCT u.task_id) AS tasks,
+                   SUM(u.input_tokens) AS input_tokens,
+                   SUM(u.output_tokens) AS output_tokens,
+                   SUM(u.total_tokens) AS total_tokens,
+                   SUM(u.retries) AS retries,
+                   AVG(u.latency_seconds) AS avg_latency_seconds,
+                   MAX(u.latency_seconds) AS max_latency_seconds
+            FROM llm_usage u LEFT JOIN tasks t ON t.id = u.task_id
+            WHERE u.created_at >= strftime('%Y-%m-%d %H:%M:%f', 'now', ?)
+            GROUP BY key ORDER BY key
+        """, (f"-{since_hours} hours",))
+        rows = cursor.fetchall()
+    return [dict(row) for row in rows]
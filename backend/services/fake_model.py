@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelRequest, ModelResponse, ToolCallPart, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.usage import RequestUsage
+from backend.core.preprocess import estimate_tokens
+from backend.utils.config import load_projects, load_team
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Model names starting with this select the fake backend, e.g. OLLAMA_MODEL=fake
+FAKE_MODEL_PREFIX = "fake"
+
+EMAIL_BLOCK = re.compile(r'<email index="(\d+)">\n(.*?)\n</email>', re.DOTALL)
+
+def is_fake_model(name: str) -> bool:
+    return name.split(":")[0] == FAKE_MODEL_PREFIX
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parses a latency distribution in seconds:
+    "fixed:S", "uniform:MIN:MAX", "normal:MEAN:SD" or "lognormal:MEDIAN:SIGMA".
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: values[0] * rng.lognormvariate(0, values[1])
+    raise ValueError(f"Invalid latency distribution: {spec!r}")
+
+class FakeModelBackend:
+    """
+    Offline stand-in for the model endpoint, for benchmarking the pipeline.
+
+    Wraps a pydantic-ai FunctionModel that answers with schema-valid task
+    proposals after a simulated delay. The project is the first one whose id
+    appears in the email (otherwise one picked by hashing the text), and the
+    assignee is an engineer on it. A share of requests fail with HTTP 503 so
+    retries and the circuit breaker can be exercised. Delay, failures and
+    answers are derived from the seed, the message and the attempt number,
+    so a run is reproducible.
+    """
+    def __init__(self, latency: Optional[str] = None, error_rate: Optional[float] = None,
+                 output_tokens: Optional[int] = None, confidence: Optional[float] = None,
+                 seed: Optional[int] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.latency_spec = latency or os.getenv("FAKE_LLM_LATENCY", "lognormal:1.0:0.5")
+        self._latency = parse_latency(self.latency_spec)
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.output_tokens = output_tokens or int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", "150"))
+        self.confidence = confidence if confidence is not None else float(os.getenv("FAKE_LLM_CONFIDENCE", "0.9"))
+        self.seed = seed if seed is not None else int(os.getenv("FAKE_LLM_SEED", "0"))
+        self.model_name = FAKE_MODEL_PREFIX
+        self._attempts: Counter = Counter()
+        self.requests = 0
+        self.errors = 0
+
+    def model(self, name: str = FAKE_MODEL_PREFIX) -> FunctionModel:
+        self.model_name = name
+        return FunctionModel(self._respond, model_name=name)
+
+    def _proposal(self, content: str, digest: str) -> Dict[str, Any]:
+        projects, team = load_projects(), load_team()
+        project = next((p for p in projects if p["id"].lower() in content.lower()), None)
+        if project is None and projects:
+            project = projects[int(digest[:8], 16) % len(projects)]
+        members = [t["name"] for t in team if project and project["id"] in t.get("projects", [])]
+        first_line = next((line.strip() for line in content.splitlines() if line.strip()), "Review correspondence")
+        return {
+            "title": first_line[:100],
+            "description": content[:300],
+            "deadline": None,
+            "assigned_to": members[int(digest[8:16], 16) % len(members)] if members else None,
+            "project_id": project["id"] if project else None,
+            "confidence": self.confidence,
+        }
+
+    async def _respond(self, messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        prompt = "\n".join(part.content for message in messages if isinstance(message, ModelRequest)
+                           for part in message.parts if isinstance(part, UserPromptPart) and isinstance(part.content, str))
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        self._attempts[digest] += 1
+        rng = random.Random(f"{self.seed}:{digest}:{self._attempts[digest]}")
+        self.requests += 1
+
+        await asyncio.sleep(self._latency(rng))
+        if rng.random() < self.error_rate:
+            self.errors += 1
+            raise ModelHTTPError(503, self.model_name, "Simulated overload")
+
+        tool = info.output_tools[0]
+        if "response" in tool.parameters_json_schema.get("properties", {}):
+            # Batched request: one answer per <email index="N"> block
+            items = []
+            for index, content in EMAIL_BLOCK.findall(prompt):
+                item_digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                items.append({**self._proposal(content, item_digest), "index": int(index)})
+            args: Dict[str, Any] = {"response": items}
+        else:
+            args = self._proposal(prompt, digest)
+
+        system = "\n".join(getattr(part, "content", "") for message in messages if isinstance(message, ModelRequest)
+                           for part in message.parts if part.part_kind == "system-prompt")
+        usage = RequestUsage(input_tokens=estimate_tokens(system) + estimate_tokens(prompt),
+                             output_tokens=self.output_tokens)
+        return ModelResponse(parts=[ToolCallPart(tool.name, args)], usage=usage)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors, "latency": self.latency_spec}
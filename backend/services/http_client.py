@@ -0,0 +1,45 @@
+import importlib.util
+import logging
+import os
+from typing import Optional
+import httpx
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+def build_http_client(max_connections: Optional[int] = None, max_keepalive: Optional[int] = None,
+                      keepalive_expiry: Optional[float] = None, connect_timeout: Optional[float] = None,
+                      http2: Optional[bool] = None) -> httpx.AsyncClient:
+    """
+    Builds the pooled async HTTP client shared by every model endpoint.
+
+    Connections are kept alive between requests so only the first one pays
+    for the TCP and TLS handshakes. HTTP/2 is used when enabled and h2 is
+    installed, letting concurrent requests share one connection. Read
+    timeouts are left to the scheduler (LLM_TIMEOUT).
+    """
+    # Priority: constructor arg > environment variable > default value
+    max_connections = max_connections or int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+    max_keepalive = max_keepalive or int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+    keepalive_expiry = keepalive_expiry or float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "120"))
+    connect_timeout = connect_timeout or float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+    if http2 is None:
+        http2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    if http2 and not http2_available():
+        logger.info("h2 is not installed; model requests use HTTP/1.1.")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(None, connect=connect_timeout),
+        follow_redirects=True,
+    )
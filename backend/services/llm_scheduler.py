@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import httpx
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses that mean "try again later" rather than "this request is wrong"
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, rate limiting and server errors are retried."""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, ModelHTTPError):
+        return error.status_code in RETRYABLE_STATUSES
+    # Other API errors (connection reset, bad gateway bodies, ...) carry no status
+    return isinstance(error, ModelAPIError)
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter refilled continuously at `rate` per second.
+    A rate of 0 disables the limit.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate * 60
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Waits until `amount` can be taken. Requests larger than capacity wait for a full bucket."""
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        # One waiter at a time so large requests are not starved by small ones
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def adjust(self, amount: float):
+        """Charges (or refunds, if negative) the difference once the real cost is known."""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+class CircuitBreaker:
+    """
+    Stops calls to an endpoint after `failure_threshold` consecutive failures.
+
+    While open, callers wait instead of failing. After `reset_timeout` seconds
+    one probe call is let through (half-open); success closes the circuit and
+    releases everyone, failure opens it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_until_allowed(self):
+        """Returns when a call may go ahead; this caller becomes the probe when half-open."""
+        while True:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining <= 0:
+                    self.state = self.HALF_OPEN
+                    logger.info("Model endpoint circuit half-open; sending a probe request.")
+                    return
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # A probe is in flight; wait for its outcome
+                await self._changed.wait()
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Model endpoint recovered; circuit closed.")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._notify()
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                logger.warning(f"Model endpoint unhealthy after {self.failures} failures; "
+                               f"pausing requests for {self.reset_timeout:.0f}s.")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._notify()
+
+    def release_probe(self):
+        """Called when a half-open probe ends without a verdict (e.g. a bad request)."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic() - self.reset_timeout
+            self._notify()
+
+class LLMScheduler:
+    """
+    Client-side traffic control for the model endpoint.
+
+    Every call waits for the circuit breaker, a slot under the concurrency
+    cap and the request/token rate limits, then runs with a timeout.
+    Timeouts, connection errors, 429s and 5xx responses are retried with
+    jittered exponential backoff; repeated failures open the circuit so
+    ingestion pauses until the endpoint answers again.
+    """
+    def __init__(self, max_concurrency: Optional[int] = None,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None,
+                 failure_threshold: Optional[int] = None,
+                 reset_timeout: Optional[float] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        requests_per_minute = requests_per_minute if requests_per_minute is not None else float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+        tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "120"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "4"))
+        self.backoff_base = backoff_base or float(os.getenv("LLM_BACKOFF_BASE", "1"))
+        self.backoff_max = backoff_max or float(os.getenv("LLM_BACKOFF_MAX", "60"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=failure_threshold or int(os.getenv("LLM_CIRCUIT_FAILURES", "5")),
+            reset_timeout=reset_timeout or float(os.getenv("LLM_CIRCUIT_RESET", "30")),
+        )
+        self.requests = TokenBucket(requests_per_minute / 60, capacity=max(1.0, requests_per_minute / 60 * 10))
+        self.tokens = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (1-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int = 0,
+                  usage: Optional[Callable[[T], int]] = None) -> T:
+        """
+        Runs call() under the scheduler's limits, retrying transient failures.
+
+        Args:
+            call: Factory returning a fresh awaitable for each attempt.
+            tokens: Estimated tokens the request will use, for the token limit.
+            usage: Optional function returning the real token count of a result,
+                used to correct the token bucket after the call.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.breaker.wait_until_allowed()
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+            async with self._semaphore:
+                self.in_flight += 1
+                self.calls += 1
+                try:
+                    result = await asyncio.wait_for(call(), timeout=self.timeout)
+                except asyncio.CancelledError:
+                    self.breaker.release_probe()
+                    raise
+                except Exception as e:
+                    if not is_retryable(e):
+                        self.breaker.release_probe()
+                        self.failures += 1
+                        raise
+                    self.breaker.record_failure()
+                    if attempt > self.max_retries:
+                        self.failures += 1
+                        raise
+                    error = e
+                else:
+                    self.breaker.record_success()
+                    if usage is not None:
+                        self.tokens.adjust(usage(result) - tokens)
+                    return result
+                finally:
+                    self.in_flight -= 1
+
+            self.retries += 1
+            delay = self.backoff(attempt)
+            logger.warning(f"Model request failed ({type(error).__name__}: {error}); "
+                           f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state == CircuitBreaker.CLOSED
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for logging and the dashboard."""
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+        }
@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from backend.utils.config import config_signature, load_projects, load_team
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# BM25 term-frequency saturation and length normalisation
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words; hyphenated ids like 'sb-01' are kept whole and also split."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(token.split("-"))
+    return tokens
+
+@dataclass
+class PromptSelection:
+    """The projects and engineers put in the system prompt for one email."""
+    projects: List[dict]
+    team: List[dict]
+    top_score: float
+
+class RegistryIndex:
+    """
+    BM25 index over the project registry, used to keep prompts small.
+
+    Each project is indexed on its id, name and context plus the duties of
+    the engineers assigned to it. For each email only the top_k projects and
+    the engineers on them go into the prompt. Registries of fewer than
+    min_projects projects, and emails whose best match scores below
+    min_score, use the full lists.
+
+    The index follows config_signature(); when settings change only the
+    projects whose text changed are re-tokenised.
+    """
+    def __init__(self, top_k: Optional[int] = None, min_score: Optional[float] = None,
+                 min_projects: Optional[int] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.top_k = top_k or int(os.getenv("RETRIEVAL_TOP_K", "8"))
+        self.min_score = min_score if min_score is not None else float(os.getenv("RETRIEVAL_MIN_SCORE", "2.0"))
+        self.min_projects = min_projects if min_projects is not None else int(os.getenv("RETRIEVAL_MIN_PROJECTS", "25"))
+        self._signature = None
+        self.projects: List[dict] = []
+        self.team: List[dict] = []
+        # project id -> (hash of indexed text, term counts)
+        self._docs: Dict[str, Tuple[str, Counter]] = {}
+        self._doc_freq: Counter = Counter()
+        self._avg_length = 0.0
+        self.rebuilds = 0
+        self.retokenized = 0
+        self.selections = 0
+        self.fallbacks = 0
+
+    @property
+    def active(self) -> bool:
+        self.refresh()
+        return len(self.projects) >= self.min_projects
+
+    def refresh(self):
+        """Re-indexes if the settings changed since the last call."""
+        signature = config_signature()
+        if signature == self._signature:
+            return
+        self.projects, self.team = load_projects(), load_team()
+        duties: Dict[str, List[str]] = {}
+        for member in self.team:
+            for project_id in member.get("projects", []):
+                duties.setdefault(project_id, []).extend(member.get("duties", []))
+
+        docs: Dict[str, Tuple[str, Counter]] = {}
+        for project in self.projects:
+            text = " ".join([project["id"], project["name"], project.get("context", ""), *duties.get(project["id"], [])])
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            previous = self._docs.get(project["id"])
+            if previous and previous[0] == digest:
+                docs[project["id"]] = previous
+            else:
+                docs[project["id"]] = (digest, Counter(tokenize(text)))
+                self.retokenized += 1
+        self._docs = docs
+        self._doc_freq = Counter(term for _, counts in docs.values() for term in counts)
+        lengths = [sum(counts.values()) for _, counts in docs.values()]
+        self._avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self._signature = signature
+        self.rebuilds += 1
+
+    def score(self, text: str) -> List[Tuple[float, str]]:
+        """BM25 scores of every project against the text, best first."""
+        query = set(tokenize(text))
+        total = len(self._docs)
+        scores = []
+        for project_id, (_, counts) in self._docs.items():
+            length = sum(counts.values())
+            score = 0.0
+            for term in query & counts.keys():
+                df = self._doc_freq[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                tf = counts[term]
+                score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (self._avg_length or 1)))
+            scores.append((score, project_id))
+        scores.sort(reverse=True)
+        return scores
+
+    def select(self, text: str) -> Optional[PromptSelection]:
+        """
+        Returns the shortlist for an email, or None when the full lists
+        should be used (small registry or no confident match).
+        """
+        if not self.active:
+            return None
+        scores = self.score(text)
+        if not scores or scores[0][0] < self.min_score:
+            self.fallbacks += 1
+            return None
+        chosen = {project_id for score, project_id in scores[:self.top_k] if score > 0}
+        self.selections += 1
+        return PromptSelection(
+            projects=[p for p in self.projects if p["id"] in chosen],
+            team=[t for t in self.team if chosen.intersection(t.get("projects", []))],
+            top_score=scores[0][0],
+        )
+
+    def select_many(self, texts: List[str]) -> Optional[PromptSelection]:
+        """Shortlist covering several emails; None if any of them needs the full lists."""
+        selections = [self.select(text) for text in texts]
+        if not selections or any(s is None for s in selections):
+            return None
+        chosen = {p["id"] for s in selections for p in s.projects}
+        return PromptSelection(
+            projects=[p for p in self.projects if p["id"] in chosen],
+            team=[t for t in self.team if chosen.intersection(t.get("projects", []))],
+            top_score=min(s.top_score for s in selections),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "projects": len(self.projects),
+            "rebuilds": self.rebuilds,
+            "retokenized": self.retokenized,
+            "selections": self.selections,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Union
+from backend.services.db_service import get_tokens_used, record_usage
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Seconds between reads of the last hour's token total from the database
+HOURLY_REFRESH_SECONDS = 5.0
+
+class TokenBudgetExceeded(Exception):
+    """Raised when analysing an email would go over a token budget; the email is deferred."""
+
+class UsageScope:
+    """Model usage recorded while analysing one email."""
+    def __init__(self):
+        self.usage_ids: List[int] = []
+        self.tokens = 0
+
+class SharedScope:
+    """Emails analysed together by one batched call; the call's usage is split between them."""
+    def __init__(self, members: List[Optional[UsageScope]]):
+        self.members = members
+
+_current_scope: ContextVar[Union[UsageScope, SharedScope, None]] = ContextVar("llm_usage_scope", default=None)
+
+@contextmanager
+def usage_scope(scope: Union[UsageScope, SharedScope, None] = None) -> Iterator[Union[UsageScope, SharedScope]]:
+    """Collects the usage of every model call made inside the block."""
+    scope = scope or UsageScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+@contextmanager
+def member_scope(index: int) -> Iterator[None]:
+    """Inside a batch, records further calls against the batch's index-th email only."""
+    scope = _current_scope.get()
+    if not isinstance(scope, SharedScope):
+        yield
+        return
+    with usage_scope(scope.members[index] or UsageScope()):
+        yield
+
+def current_scope() -> Union[UsageScope, SharedScope, None]:
+    return _current_scope.get()
+
+def _split(total: int, parts: int, index: int) -> int:
+    # Even shares; the first email takes the remainder so totals add up
+    return total // parts + (total % parts if index == 0 else 0)
+
+class UsageTelemetry:
+    """
+    Records each model call in the llm_usage table and enforces token budgets.
+
+    Calls are attributed to the email being analysed (see usage_scope), so
+    orchestration can link them to the task they produce; a batched call is
+    split evenly between its emails. Two budgets apply, both off when 0:
+    - max_tokens_per_email: a request that would take an email over it is
+      not sent. The cascade keeps the answer it already has; an email with
+      no answer yet is deferred with TokenBudgetExceeded.
+    - max_tokens_per_hour: requests wait until the rolling hour has room,
+      for up to max_wait seconds, then the email is deferred.
+    """
+    def __init__(self, max_tokens_per_email: Optional[int] = None, max_tokens_per_hour: Optional[int] = None,
+                 max_wait: Optional[float] = None):
+        # Priority: constructor arg > environment variable > default value
+        self.max_tokens_per_email = max_tokens_per_email if max_tokens_per_email is not None else int(os.getenv("LLM_MAX_TOKENS_PER_EMAIL", "0"))
+        self.max_tokens_per_hour = max_tokens_per_hour if max_tokens_per_hour is not None else int(os.getenv("LLM_MAX_TOKENS_PER_HOUR", "0"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("LLM_BUDGET_MAX_WAIT", "3600"))
+        self._hour_tokens = 0
+        self._hour_read_at: Optional[float] = None
+        self._reserved = 0
+        self.recorded = 0
+        self.deferred = 0
+        self.budget_waits = 0
+
+    def record(self, model: str, outcome: str, input_tokens: int, output_tokens: int,
+               retries: int, latency_seconds: float, batch_size: int = 1):
+        """
+        Stores a model call against the current email, or split across the
+        current batch. Calls made outside any usage_scope are not stored.
+        """
+        self._hour_tokens += input_tokens + output_tokens
+        scope = _current_scope.get()
+        if scope is None:
+            return
+        members = scope.members if isinstance(scope, SharedScope) else [scope]
+        for index, member in enumerate(members):
+            share_in = _split(input_tokens, len(members), index)
+            share_out = _split(output_tokens, len(members), index)
+            if member is not None:
+                member.tokens += share_in + share_out
+            try:
+                usage_id = record_usage(model, outcome, share_in, share_out, retries, latency_seconds,
+                                        batch_size=max(batch_size, len(members)))
+            except Exception as e:
+                # Telemetry must never break analysis itself
+                logger.warning(f"Failed to record model usage: {e}")
+                continue
+            self.recorded += 1
+            if member is not None:
+                member.usage_ids.append(usage_id)
+
+    def check_email(self, estimate: int):
+        """Raises TokenBudgetExceeded if the current email cannot afford a request of `estimate` tokens."""
+        scope = _current_scope.get()
+        spent = scope.tokens if isinstance(scope, UsageScope) else 0
+        if self.max_tokens_per_email and spent + estimate > self.max_tokens_per_email:
+            self.deferred += 1
+            raise TokenBudgetExceeded(f"Email token budget exceeded ({spent} used + ~{estimate} requested "
+                                      f"> {self.max_tokens_per_email})")
+
+    def tokens_last_hour(self) -> int:
+        """Tokens used in the rolling hour, re-read from the database every few seconds."""
+        now = time.monotonic()
+        if self._hour_read_at is None or now - self._hour_read_at >= HOURLY_REFRESH_SECONDS:
+            try:
+                self._hour_tokens = get_tokens_used(3600)
+                self._hour_read_at = now
+            except Exception as e:
+                logger.warning(f"Failed to read hourly token usage: {e}")
+        return self._hour_tokens
+
+    @asynccontextmanager
+    async def reserve(self, estimate: int):
+        """Holds `estimate` tokens of the hourly budget for the duration of a request."""
+        if self.max_tokens_per_hour:
+            if estimate > self.max_tokens_per_hour:
+                self.deferred += 1
+                raise TokenBudgetExceeded(f"Request of ~{estimate} tokens exceeds the hourly budget of {self.max_tokens_per_hour}")
+            started = time.monotonic()
+            waiting = False
+            while self.tokens_last_hour() + self._reserved + estimate > self.max_tokens_per_hour:
+                waited = time.monotonic() - started
+                if waited >= self.max_wait:
+                    self.deferred += 1
+                    raise TokenBudgetExceeded(f"Hourly token budget of {self.max_tokens_per_hour} exhausted")
+                if not waiting:
+                    waiting = True
+                    self.budget_waits += 1
+                    logger.warning(f"Hourly token budget of {self.max_tokens_per_hour} reached; waiting for room.")
+                await asyncio.sleep(min(HOURLY_REFRESH_SECONDS * 6, self.max_wait - waited))
+        self._reserved += estimate
+        try:
+            yield
+        finally:
+            self._reserved -= estimate
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "recorded": self.recorded,
+            "deferred": self.deferred,
+            "budget_waits": self.budget_waits,
+            "tokens_last_hour": self._hour_tokens,
+        }
+
+_telemetry_instance: Optional[UsageTelemetry] = None
+
+def get_telemetry() -> UsageTelemetry:
+    global _telemetry_instance
+    if _telemetry_instance is None:
+        _telemetry_instance = UsageTelemetry()
+    return _telemetry_instance
@@ -1,7 +1,7 @@
 import json
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 # Define base paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -13,6 +13,24 @@ PROCESSED_DIR = BASE_DIR / "processed"
 PROJECTS_FILE = DATA_DIR / "projects.json"
 TEAM_FILE = DATA_DIR / "team.json"
 
+# Bumped on every save so in-process caches notice edits even within the
+# filesystem's mtime resolution
+_config_version = 0
+
+def _file_signature(path: Path) -> Tuple[int, int]:
+    try:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return 0, 0
+
+def config_signature() -> Tuple:
+    """
+    Cheap fingerprint of the projects and team settings: the save counter plus
+    the mtime and size of both files, so edits from another process are seen too.
+    """
+    return (_config_version, _file_signature(PROJECTS_FILE), _file_signature(TEAM_FILE))
+
 def load_projects() -> List[Dict[str, Any]]:
     """Loads projects from data/projects.json"""
     if not PROJECTS_FILE.exists():
@@ -27,9 +45,11 @@ def load_projects() -> List[Dict[str, Any]]:
 
 def save_projects(projects: List[Dict[str, Any]]):
     """Saves projects to data/projects.json"""
+    global _config_version
     try:
         with open(PROJECTS_FILE, 'w', encoding='utf-8') as f:
             json.dump({"projects": projects}, f, indent=4)
+        _config_version += 1
     except Exception as e:
         print(f"Error saving projects: {e}")
         raise e
@@ -48,9 +68,11 @@ def load_team() -> List[Dict[str, Any]]:
 
 def save_team(team: List[Dict[str, Any]]):
     """Saves team members to data/team.json"""
+    global _config_version
     try:
         with open(TEAM_FILE, 'w', encoding='utf-8') as f:
             json.dump({"team": team}, f, indent=4)
+        _config_version += 1
     except Exception as e:
         print(f"Error saving team: {e}")
         raise e
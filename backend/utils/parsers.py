@@ -1,43 +1,259 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from datetime import datetime
 from pathlib import Path
-import email
-from email import policy
-import extract_msg
+from typing import Dict, Optional, Tuple, Type
 import codecs
+import logging
+import mmap
+import os
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Entry-point group third-party packages use to contribute parsers
+PLUGIN_GROUP = "ai_sentinel.parsers"
+
+@dataclass
+class ParsedContent:
+    """Structured result of parsing an inbox file."""
+    subject: str
+    body: str
+    sender: Optional[str] = None
+    date: Optional[datetime] = None
+    size: int = 0
+    truncated: bool = False
+    # Length of the body before the character budget was applied
+    original_chars: Optional[int] = None
+
+@dataclass
+class ExtractionBudget:
+    """
+    Limits on how much of a file is read and passed on to the LLM.
+
+    max_bytes caps how much of the file is read at all; max_chars caps the
+    body length. Text files of at least mmap_min_bytes are memory-mapped so
+    only the sections that are kept are ever read.
+    """
+    max_bytes: int = 2 * 1024 * 1024
+    max_chars: int = 20000
+    mmap_min_bytes: int = 256 * 1024
+
+    @classmethod
+    def from_env(cls) -> "ExtractionBudget":
+        return cls(
+            max_bytes=int(os.getenv("EXTRACT_MAX_BYTES", str(cls.max_bytes))),
+            max_chars=int(os.getenv("EXTRACT_MAX_CHARS", str(cls.max_chars))),
+            mmap_min_bytes=int(os.getenv("EXTRACT_MMAP_MIN_BYTES", str(cls.mmap_min_bytes))),
+        )
+
+# Share of the character budget kept from the start of an oversized body;
+# the rest comes from the end, where logs and replies usually conclude.
+HEAD_SHARE = 0.75
+
+def _omission_marker(omitted: int) -> str:
+    return f"\n\n[... {omitted} characters omitted ...]\n\n"
+
+def truncate_text(text: str, max_chars: int) -> Tuple[str, bool]:
+    """
+    Shortens text to roughly max_chars, keeping the opening and closing
+    sections with a marker in between. Returns (text, truncated).
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text, False
+    head = int(max_chars * HEAD_SHARE)
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    return text[:head] + _omission_marker(omitted) + text[-tail:], True
 
 class FileParser(ABC):
+    # File suffixes (lower case, with dot) this parser handles
+    suffixes: Tuple[str, ...] = ()
+
     @abstractmethod
     def parse(self, file_path: Path) -> str:
         """Extract text content from the given file."""
         pass
 
+    def extract(self, file_path: Path, budget: Optional[ExtractionBudget] = None) -> ParsedContent:
+        """
+        Extract the structured content of the file. Defaults to the body only.
+        Parsers that can read incrementally should honour budget.max_bytes;
+        the character budget is applied by parse_file for every parser.
+        """
+        return ParsedContent(
+            subject=file_path.name,
+            body=self.parse(file_path),
+            size=file_path.stat().st_size,
+        )
+
 class TextFileParser(FileParser):
+    suffixes = (".txt",)
+
     def parse(self, file_path: Path) -> str:
-        return file_path.read_text(encoding="utf-8")
+        return file_path.read_text(encoding="utf-8", errors="ignore")
+
+    def extract(self, file_path: Path, budget: Optional[ExtractionBudget] = None) -> ParsedContent:
+        size = file_path.stat().st_size
+        if budget is None or size < budget.mmap_min_bytes:
+            return ParsedContent(subject=file_path.name, body=self.parse(file_path), size=size)
+
+        # Large file: map it and decode only the head and tail sections.
+        # UTF-8 is at most 4 bytes per character, so this covers max_chars.
+        keep_bytes = min(budget.max_bytes, budget.max_chars * 4)
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if size <= keep_bytes:
+                body = mm[:].decode("utf-8", errors="ignore")
+                return ParsedContent(subject=file_path.name, body=body, size=size)
+            head_bytes = int(keep_bytes * HEAD_SHARE)
+            head = mm[:head_bytes].decode("utf-8", errors="ignore")
+            tail = mm[size - (keep_bytes - head_bytes):].decode("utf-8", errors="ignore")
+        body, _ = truncate_text(head + tail, budget.max_chars)
+        # Character count of the whole file is unknown without decoding it;
+        # the byte size is reported instead
+        return ParsedContent(subject=file_path.name, body=body, size=size,
+                             truncated=True, original_chars=size)
 
 class EmailFileParser(FileParser):
+    suffixes = (".msg", ".eml")
+
     def parse(self, file_path: Path) -> str:
+        return self.extract(file_path).body
+
+    def extract(self, file_path: Path, budget: Optional[ExtractionBudget] = None) -> ParsedContent:
         suffix = file_path.suffix.lower()
         if suffix == ".msg":
-            msg = extract_msg.Message(str(file_path))
-            return msg.body
+            return self._extract_msg(file_path)
         elif suffix == ".eml":
-            with open(file_path, "rb") as f:
-                raw_data = f.read()
-            
-            # Remove UTF-8 BOM if present
-            if raw_data.startswith(codecs.BOM_UTF8):
-                raw_data = raw_data[len(codecs.BOM_UTF8):]
-                
-            msg = email.message_from_bytes(raw_data, policy=policy.default)
-            
-            body = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        body += part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8")
-            else:
-                body = msg.get_payload(decode=True).decode(msg.get_content_charset() or "utf-8")
-            return body
+            return self._extract_eml(file_path, budget)
         else:
-            raise ValueError(f"Unsupported email format: {suffix}")
\ No newline at end of file
+            raise ValueError(f"Unsupported email format: {suffix}")
+
+    def _extract_msg(self, file_path: Path) -> ParsedContent:
+        # Imported on first use: extract_msg is slow to import
+        import extract_msg
+
+        # extract_msg requires string path; attachments are never needed
+        msg = extract_msg.Message(str(file_path), delayAttachments=True)
+        try:
+            date = msg.date if isinstance(msg.date, datetime) else None
+            sender = msg.sender if isinstance(msg.sender, str) else None
+            subject = msg.subject if isinstance(msg.subject, str) and msg.subject else file_path.name
+            return ParsedContent(
+                subject=subject,
+                body=msg.body or "",
+                sender=sender,
+                date=date,
+                size=file_path.stat().st_size,
+            )
+        finally:
+            msg.close()
+
+    def _extract_eml(self, file_path: Path, budget: Optional[ExtractionBudget] = None) -> ParsedContent:
+        from email import policy
+        from email.feedparser import BytesFeedParser
+
+        size = file_path.stat().st_size
+        max_bytes = budget.max_bytes if budget else size
+        parser = BytesFeedParser(policy=policy.default)
+        read = 0
+        first = True
+        with open(file_path, "rb") as f:
+            # Feed the message in chunks and stop at the byte budget; the text
+            # body normally precedes any attachments.
+            while read < max_bytes:
+                chunk = f.read(min(64 * 1024, max_bytes - read))
+                if not chunk:
+                    break
+                # Counted before the BOM is stripped, so it compares with the file size
+                read += len(chunk)
+                # Remove UTF-8 BOM if present
+                if first and chunk.startswith(codecs.BOM_UTF8):
+                    chunk = chunk[len(codecs.BOM_UTF8):]
+                first = False
+                parser.feed(chunk)
+        msg = parser.close()
+
+        # get_body only decodes the chosen text part; attachments and other
+        # non-text parts are never decoded.
+        body_part = msg.get_body(preferencelist=("plain", "html"))
+        body = body_part.get_content() if body_part else ""
+        date = None
+        try:
+            date = msg["date"].datetime if msg["date"] else None
+        except (AttributeError, TypeError, ValueError):
+            pass
+        truncated = read < size
+        if truncated and budget is not None:
+            # As for large text files, the byte size stands in for the
+            # unknown character count, and the character budget is applied here
+            body, _ = truncate_text(body, budget.max_chars)
+        return ParsedContent(
+            subject=msg["subject"] or file_path.name,
+            body=body,
+            sender=str(msg["from"]) if msg["from"] else None,
+            date=date,
+            size=size,
+            truncated=truncated,
+            original_chars=size if truncated else None,
+        )
+
+# Suffix -> parser instance
+_registry: Dict[str, FileParser] = {}
+_plugins_loaded = False
+
+def register_parser(parser_cls: Type[FileParser]) -> Type[FileParser]:
+    """
+    Registers a parser for each of its suffixes, replacing any existing one.
+    Usable as a class decorator.
+    """
+    parser = parser_cls()
+    for suffix in parser_cls.suffixes:
+        _registry[suffix.lower()] = parser
+    return parser_cls
+
+def _load_plugins():
+    """Registers parsers exposed under the ai_sentinel.parsers entry-point group."""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=PLUGIN_GROUP):
+        try:
+            register_parser(entry_point.load())
+            logger.info(f"Loaded parser plugin: {entry_point.name}")
+        except Exception as e:
+            logger.error(f"Failed to load parser plugin {entry_point.name}: {e}")
+
+def get_parser(file_path: Path) -> Optional[FileParser]:
+    """Returns the parser registered for the file's suffix, or None."""
+    _load_plugins()
+    return _registry.get(file_path.suffix.lower())
+
+def apply_budget(parsed: ParsedContent, budget: ExtractionBudget) -> ParsedContent:
+    """Applies the character budget to a parsed body, flagging any truncation."""
+    if parsed.truncated and parsed.original_chars is not None:
+        return parsed  # The parser already applied the budget itself
+    body, truncated = truncate_text(parsed.body, budget.max_chars)
+    original_chars = parsed.original_chars or len(parsed.body)
+    if not truncated:
+        return replace(parsed, original_chars=original_chars)
+    return replace(parsed, body=body, truncated=True, original_chars=original_chars)
+
+def parse_file(file_path: Path, budget: Optional[ExtractionBudget] = None) -> ParsedContent:
+    """
+    Parses a file with the registered parser for its suffix.
+    If a budget is given, reading and the body length are bounded by it.
+
+    Raises:
+        ValueError: If no parser handles the file type.
+    """
+    parser = get_parser(file_path)
+    if parser is None:
+        raise ValueError(f"Unsupported file type: {file_path.suffix}")
+    parsed = parser.extract(file_path, budget)
+    return apply_budget(parsed, budget) if budget else parsed
+
+register_parser(TextFileParser)
+register_parser(EmailFileParser)
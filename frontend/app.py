@@ -27,6 +27,16 @@ def main():
         
         if manager.is_running:
             st.success("🟢 Watcher: Running")
+            stats = manager.pool_stats()
+            if stats:
+                c1, c2 = st.columns(2)
+                c1.metric("Queued", stats["queue_depth"])
+                c2.metric("Workers Busy", f"{stats['in_flight']}/{stats['max_in_flight']}")
+                if stats["intake_paused"]:
+                    st.warning("Intake paused: queue above high-water mark.")
+            backlog = manager.backlog_progress()
+            if backlog:
+                st.caption(f"Recovering backlog: {backlog['submitted']} of {backlog['scanned']} files queued so far.")
             if st.button("Stop Watcher"):
                 manager.stop()
                 st.rerun()
@@ -1,25 +1,71 @@
 import streamlit as st
 import pandas as pd
-from frontend.services.api_client import fetch_tasks, update_task_details, archive_task, reject_task, fetch_projects, fetch_team
+from frontend.components.pagination import page_cursor, render_pager
+from frontend.services.api_client import (
+    fetch_task, fetch_task_page, search_task_page, count_matching_tasks, update_task_details,
+    archive_task, reject_task, archive_tasks, reject_tasks,
+    fetch_projects, fetch_team, deadline_as_date,
+)
+
+PAGE_SIZE = 50
+TABLE_COLUMNS = ['summary', 'project_id', 'assignee', 'deadline']
+SORT_OPTIONS = {"Newest first": "-id", "Oldest first": "id", "Due date": "deadline", "Due date (latest first)": "-deadline"}
 
 def render_active_view():
     st.header("Active Tasks (Execution)")
-    
-    tasks = fetch_tasks("APPROVED")
-    
-    if not tasks:
+
+    # Load options
+    projects = fetch_projects()
+    team = fetch_team()
+    project_options = [p['id'] for p in projects]
+    assignee_options = [t['name'] for t in team]
+
+    # --- Filters ---
+    # Filtering, sorting and paging run in the database, so only one page of
+    # tasks is loaded however many there are
+    with st.expander("🔍 Filters", expanded=True):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            search_query = st.text_input("Search Tasks", placeholder="Subject, summary, notes or source file...")
+        with c2:
+            selected_project = st.selectbox("Filter by Project", ["All"] + project_options)
+        with c3:
+            selected_assignee = st.selectbox("Filter by Assignee", ["All"] + assignee_options)
+        c4, c5, c6 = st.columns(3)
+        with c4:
+            due_from = st.date_input("Due From", value=None)
+        with c5:
+            due_to = st.date_input("Due To", value=None)
+        with c6:
+            sort_label = st.selectbox("Sort by", list(SORT_OPTIONS))
+
+    filters = {
+        "status": "APPROVED",
+        "search": search_query or None,
+        "project_id": None if selected_project == "All" else selected_project,
+        "assignee": None if selected_assignee == "All" else selected_assignee,
+        "deadline_from": due_from,
+        "deadline_to": due_to,
+    }
+    total = count_matching_tasks(**filters)
+    if total == 0 and not any(v for k, v in filters.items() if k != "status"):
         st.info("No active tasks.")
         return
 
     # --- Part 1: Task Table ---
     st.subheader("Overview")
-    
+
+    if search_query:
+        # Full-text matches, best first; refine the search to narrow them down
+        other_filters = {k: v for k, v in filters.items() if k != "search"}
+        tasks, has_prev, has_next = search_task_page(search_query, TABLE_COLUMNS, PAGE_SIZE, **other_filters), False, False
+    else:
+        cursor = page_cursor("active", {**filters, "sort": SORT_OPTIONS[sort_label]})
+        tasks, has_prev, has_next = fetch_task_page(TABLE_COLUMNS, cursor, PAGE_SIZE, sort=SORT_OPTIONS[sort_label], **filters)
+
     # Create DataFrame for display
-    df = pd.DataFrame(tasks)
-    
-    # Select columns to display
-    display_df = df[['id', 'summary', 'project_id', 'assignee', 'deadline']].copy()
-    display_df.rename(columns={
+    filtered_df = pd.DataFrame(tasks, columns=['id'] + TABLE_COLUMNS)
+    filtered_df.rename(columns={
         'id': 'ID',
         'summary': 'Summary',
         'project_id': 'Project',
@@ -27,66 +73,47 @@ def render_active_view():
         'deadline': 'Due Date'
     }, inplace=True)
 
-    # --- Filters ---
-    with st.expander("🔍 Filters", expanded=True):
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            search_query = st.text_input("Search Summary", placeholder="Type to search...").lower()
-        with c2:
-            unique_projects = ["All"] + sorted(display_df['Project'].unique().tolist())
-            selected_project = st.selectbox("Filter by Project", unique_projects)
-        with c3:
-            unique_assignees = ["All"] + sorted(display_df['Assignee'].unique().tolist())
-            selected_assignee = st.selectbox("Filter by Assignee", unique_assignees)
-
-    # Apply Filters
-    filtered_df = display_df.copy()
-    
-    if search_query:
-        filtered_df = filtered_df[filtered_df['Summary'].str.lower().str.contains(search_query)]
-        
-    if selected_project != "All":
-        filtered_df = filtered_df[filtered_df['Project'] == selected_project]
-        
-    if selected_assignee != "All":
-        filtered_df = filtered_df[filtered_df['Assignee'] == selected_assignee]
-
     # Use session state to track selection
     if "selected_task_id" not in st.session_state:
         st.session_state["selected_task_id"] = None
 
-    # Use filtered dataframe for display
     event = st.dataframe(
         filtered_df,
         use_container_width=True,
         hide_index=True,
-        selection_mode="single-row",
+        selection_mode="multi-row",
         on_select="rerun"
     )
+    if tasks:
+        render_pager("active", tasks, has_prev, has_next, total)
 
-    # Handle selection (must map back to original full tasks list safely)
-    selected_rows = event.selection.rows
-    if selected_rows:
-        index = selected_rows[0]
-        # Get ID from the *filtered* dataframe using the selected index
-        selected_task_id = filtered_df.iloc[index]['ID']
-        st.session_state["selected_task_id"] = selected_task_id
+    # Handle selection: one row opens the editor, several offer bulk actions
+    selected_ids = [int(filtered_df.iloc[index]['ID']) for index in event.selection.rows]
+    if len(selected_ids) == 1:
+        st.session_state["selected_task_id"] = selected_ids[0]
+    elif len(selected_ids) > 1:
+        st.session_state["selected_task_id"] = None
+        with st.container(border=True):
+            st.write(f"**{len(selected_ids)} tasks selected**")
+            c_done, c_del, c_space = st.columns([1.5, 1, 4])
+            with c_done:
+                if st.button("✅ Complete All", type="primary"):
+                    archive_tasks(selected_ids)
+                    st.rerun()
+            with c_del:
+                if st.button("🗑️ Delete All", type="secondary"):
+                    reject_tasks(selected_ids)
+                    st.rerun()
     
     # --- Part 2: Detail/Edit View ---
     st.divider()
     
     if st.session_state["selected_task_id"]:
-        # Find the full task object from the ORIGINAL list (so we get fields like source_file, reasoning)
-        selected_task = next((t for t in tasks if t['id'] == st.session_state["selected_task_id"]), None)
-        
-        if selected_task:
+        # The table only holds a few columns; load the full task (source_file, reasoning)
+        selected_task = fetch_task(st.session_state["selected_task_id"])
+
+        if selected_task and selected_task['status'] == "APPROVED":
             st.subheader(f"Editing: {selected_task['summary']}")
-            
-            # Load options
-            projects = fetch_projects()
-            team = fetch_team()
-            project_options = [p['id'] for p in projects]
-            assignee_options = [t['name'] for t in team]
 
             with st.container(border=True):
                 # Actions Bar
@@ -118,7 +145,7 @@ def render_active_view():
                         new_assignee = st.selectbox("Assignee", assignee_options, index=a_idx)
                         
                     with c3:
-                        new_deadline = st.text_input("Deadline", value=selected_task['deadline'])
+                        new_deadline = st.date_input("Deadline", value=deadline_as_date(selected_task))
                     
                     st.text_area("AI Reasoning / Notes", value=selected_task.get('reasoning', ''), disabled=True)
                     st.caption(f"Source File: {selected_task['source_file']}")
@@ -136,5 +163,5 @@ def render_active_view():
             st.info("Selected task not found (it might have been completed or deleted).")
     elif filtered_df.empty:
         st.warning("No tasks match the selected filters.")
-    else:
+    elif not selected_ids:
         st.info("Select a task from the table above to view details and edit.")
@@ -1,22 +1,59 @@
 import streamlit as st
 import pandas as pd
-from frontend.services.api_client import fetch_tasks, update_task_details
+from frontend.components.pagination import page_cursor, render_pager
+from frontend.services.api_client import (
+    fetch_task, fetch_task_page, search_task_page, count_matching_tasks, update_task_details, restore_tasks,
+    fetch_projects, fetch_team,
+)
+
+PAGE_SIZE = 50
+TABLE_COLUMNS = ['summary', 'project_id', 'assignee', 'deadline', 'source_file']
 
 def render_history_view():
     st.header("History (Archived)")
-    
-    tasks = fetch_tasks("COMPLETED")
-    
-    if not tasks:
+
+    # --- Filters ---
+    # Run in the database; only one page of the archive is loaded at a time
+    with st.expander("🔍 Filters", expanded=True):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            search_query = st.text_input("Search History", placeholder="Subject, summary, notes or source file...")
+        with c2:
+            project_options = [p['id'] for p in fetch_projects()]
+            selected_project = st.selectbox("Filter by Project", ["All"] + project_options, key="hist_proj")
+        with c3:
+            assignee_options = [t['name'] for t in fetch_team()]
+            selected_assignee = st.selectbox("Filter by Assignee", ["All"] + assignee_options, key="hist_assign")
+        c4, c5 = st.columns(2)
+        with c4:
+            due_from = st.date_input("Due From", value=None, key="hist_due_from")
+        with c5:
+            due_to = st.date_input("Due To", value=None, key="hist_due_to")
+
+    filters = {
+        "status": "COMPLETED",
+        "search": search_query or None,
+        "project_id": None if selected_project == "All" else selected_project,
+        "assignee": None if selected_assignee == "All" else selected_assignee,
+        "deadline_from": due_from,
+        "deadline_to": due_to,
+    }
+    total = count_matching_tasks(**filters)
+    if total == 0 and not any(v for k, v in filters.items() if k != "status"):
         st.info("No archived tasks found.")
         return
 
+    if search_query:
+        # Full-text matches, best first; refine the search to narrow them down
+        other_filters = {k: v for k, v in filters.items() if k != "search"}
+        tasks, has_prev, has_next = search_task_page(search_query, TABLE_COLUMNS, PAGE_SIZE, **other_filters), False, False
+    else:
+        cursor = page_cursor("hist", filters)
+        tasks, has_prev, has_next = fetch_task_page(TABLE_COLUMNS, cursor, PAGE_SIZE, **filters)
+
     # Create DataFrame for display
-    df = pd.DataFrame(tasks)
-    
-    # Select columns to display
-    display_df = df[['id', 'summary', 'project_id', 'assignee', 'deadline', 'source_file']].copy()
-    display_df.rename(columns={
+    filtered_df = pd.DataFrame(tasks, columns=['id'] + TABLE_COLUMNS)
+    filtered_df.rename(columns={
         'id': 'ID',
         'summary': 'Summary',
         'project_id': 'Project',
@@ -25,34 +62,6 @@ def render_history_view():
         'source_file': 'Source File'
     }, inplace=True)
 
-    # --- Filters ---
-    with st.expander("🔍 Filters", expanded=True):
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            search_query = st.text_input("Search History", placeholder="Type summary or source...").lower()
-        with c2:
-            unique_projects = ["All"] + sorted(display_df['Project'].unique().tolist())
-            selected_project = st.selectbox("Filter by Project", unique_projects, key="hist_proj")
-        with c3:
-            unique_assignees = ["All"] + sorted(display_df['Assignee'].unique().tolist())
-            selected_assignee = st.selectbox("Filter by Assignee", unique_assignees, key="hist_assign")
-
-    # Apply Filters
-    filtered_df = display_df.copy()
-    
-    if search_query:
-        # Search in Summary OR Source File
-        filtered_df = filtered_df[
-            filtered_df['Summary'].str.lower().str.contains(search_query) | 
-            filtered_df['Source File'].str.lower().str.contains(search_query)
-        ]
-        
-    if selected_project != "All":
-        filtered_df = filtered_df[filtered_df['Project'] == selected_project]
-        
-    if selected_assignee != "All":
-        filtered_df = filtered_df[filtered_df['Assignee'] == selected_assignee]
-
     if "hist_selected_task_id" not in st.session_state:
         st.session_state["hist_selected_task_id"] = None
 
@@ -60,27 +69,34 @@ def render_history_view():
         filtered_df,
         use_container_width=True,
         hide_index=True,
-        selection_mode="single-row",
+        selection_mode="multi-row",
         on_select="rerun"
     )
+    if tasks:
+        render_pager("hist", tasks, has_prev, has_next, total)
 
-    selected_rows = event.selection.rows
-    if selected_rows:
-        index = selected_rows[0]
-        selected_task_id = filtered_df.iloc[index]['ID']
-        st.session_state["hist_selected_task_id"] = selected_task_id
+    # One row shows its details, several can be restored together
+    selected_ids = [int(filtered_df.iloc[index]['ID']) for index in event.selection.rows]
+    if len(selected_ids) == 1:
+        st.session_state["hist_selected_task_id"] = selected_ids[0]
+    elif len(selected_ids) > 1:
+        st.session_state["hist_selected_task_id"] = None
+        if st.button(f"↩️ Restore All ({len(selected_ids)}) to Active", key="restore_all_btn"):
+            restore_tasks(selected_ids)
+            st.success(f"{len(selected_ids)} tasks moved back to Active.")
+            st.rerun()
 
     st.divider()
 
     if st.session_state["hist_selected_task_id"]:
-        selected_task = next((t for t in tasks if t['id'] == st.session_state["hist_selected_task_id"]), None)
-        
-        if selected_task:
+        selected_task = fetch_task(st.session_state["hist_selected_task_id"])
+
+        if selected_task and selected_task['status'] == "COMPLETED":
             st.subheader(f"Details: {selected_task['summary']}")
             with st.container(border=True):
                 st.write(f"**Project:** {selected_task['project_id']}")
                 st.write(f"**Assignee:** {selected_task['assignee']}")
-                st.write(f"**Due Date:** {selected_task['deadline']}")
+                st.write(f"**Due Date:** {selected_task['deadline'] or 'Not set'}")
                 st.write(f"**Source File:** {selected_task['source_file']}")
                 st.write(f"**AI Reasoning:** {selected_task.get('reasoning', 'N/A')}")
                 
@@ -93,5 +109,5 @@ def render_history_view():
             st.info("Selected task not found.")
     elif filtered_df.empty:
         st.warning("No history items match the selected filters.")
-    else:
+    elif not selected_ids:
         st.info("Select a task to view details or undo archival.")
\ No newline at end of file
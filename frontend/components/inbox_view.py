@@ -1,5 +1,12 @@
 import streamlit as st
-from frontend.services.api_client import fetch_tasks, approve_task, fetch_projects, fetch_team, update_task_details, reject_task
+from frontend.services.api_client import (
+    fetch_tasks, approve_task, approve_tasks, fetch_projects, fetch_team, update_task_details, reject_task, reject_tasks,
+    deadline_as_date,
+)
+
+def _select_all(task_ids):
+    for task_id in task_ids:
+        st.session_state[f"sel_{task_id}"] = True
 
 def render_inbox_view():
     st.header("Inbox (Pending Triage)")
@@ -17,6 +24,12 @@ def render_inbox_view():
     project_options = [p['id'] for p in projects]
     assignee_options = [t['name'] for t in team]
 
+    # Bulk actions sit above the list but are filled in once every card has
+    # been rendered, so they see each selected card's edited fields
+    bulk_bar = st.container()
+    edits = {}
+    selected = []
+
     for task in tasks:
         with st.container(border=True):
             col1, col2 = st.columns([3, 1])
@@ -43,9 +56,9 @@ def render_inbox_view():
                         key=f"assign_{task['id']}"
                     )
                 with c3:
-                    new_deadline = st.text_input(
-                        "Deadline", 
-                        value=task['deadline'],
+                    new_deadline = st.date_input(
+                        "Deadline",
+                        value=deadline_as_date(task),
                         key=f"dead_{task['id']}"
                     )
                 
@@ -55,22 +68,38 @@ def render_inbox_view():
                     value=task['summary'], 
                     key=f"sum_{task['id']}"
                 )
+                edits[task['id']] = {
+                    "project_id": new_project,
+                    "assignee": new_assignee,
+                    "deadline": new_deadline,
+                    "summary": new_summary
+                }
 
             with col2:
                 st.write("Actions")
+                if st.checkbox("Select", key=f"sel_{task['id']}"):
+                    selected.append(task['id'])
                 col_approve, col_reject = st.columns(2)
                 with col_approve:
                     if st.button("Approve", key=f"btn_approve_{task['id']}", type="primary"):
-                        updates = {
-                            "project_id": new_project,
-                            "assignee": new_assignee,
-                            "deadline": new_deadline,
-                            "summary": new_summary
-                        }
-                        approve_task(task['id'], updates)
+                        approve_task(task['id'], edits[task['id']])
                         st.rerun()
                 
                 with col_reject:
                     if st.button("Reject", key=f"btn_reject_{task['id']}", type="secondary"):
                         reject_task(task['id'])
-                        st.rerun()
\ No newline at end of file
+                        st.rerun()
+
+    with bulk_bar:
+        c_all, c_approve, c_reject = st.columns([1, 1.5, 1.5])
+        with c_all:
+            # A callback, because checkboxes cannot be set after they are drawn
+            st.button("Select All", on_click=_select_all, args=([task['id'] for task in tasks],))
+        with c_approve:
+            if st.button(f"Approve Selected ({len(selected)})", type="primary", disabled=not selected):
+                approve_tasks({task_id: edits[task_id] for task_id in selected})
+                st.rerun()
+        with c_reject:
+            if st.button(f"Reject Selected ({len(selected)})", disabled=not selected):
+                reject_tasks(selected)
+                st.rerun()
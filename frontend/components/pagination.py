@@ -0,0 +1,27 @@
+import streamlit as st
+from typing import Any, Dict, List
+
+def page_cursor(key: str, filters: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Returns the table's current page cursor, going back to the first page
+    whenever its filters change.
+    """
+    cursor_key, filters_key = f"{key}_cursor", f"{key}_filters"
+    if st.session_state.get(filters_key) != filters:
+        st.session_state[filters_key] = filters
+        st.session_state[cursor_key] = None
+    return st.session_state.get(cursor_key)
+
+def render_pager(key: str, rows: List[Dict[str, Any]], has_prev: bool, has_next: bool, total: int):
+    """Previous/Next buttons moving the table's cursor to the neighbouring page."""
+    c_prev, c_info, c_next = st.columns([1, 4, 1])
+    with c_prev:
+        if st.button("◀ Previous", key=f"{key}_prev", disabled=not has_prev):
+            st.session_state[f"{key}_cursor"] = {"before_id": rows[0]['id']}
+            st.rerun()
+    with c_info:
+        st.caption(f"Showing {len(rows)} of {total} tasks")
+    with c_next:
+        if st.button("Next ▶", key=f"{key}_next", disabled=not has_next):
+            st.session_state[f"{key}_cursor"] = {"after_id": rows[-1]['id']}
+            st.rerun()
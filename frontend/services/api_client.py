@@ -1,11 +1,15 @@
 import sys
+from datetime import date
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
 # Ensure backend is in path
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
-from backend.services.db_service import get_tasks, update_task, delete_task as db_delete_task
+from backend.services.db_service import (
+    get_tasks, get_task_by_id, query_tasks, count_tasks, search_tasks, update_task, delete_task as db_delete_task,
+    update_tasks_many, set_status_many, delete_tasks_many,
+)
 from backend.utils.config import load_projects, load_team, save_projects as db_save_projects, save_team as db_save_team
 
 def fetch_tasks(status: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -14,6 +18,52 @@ def fetch_tasks(status: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     return get_tasks(status)
 
+def fetch_task(task_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Fetches a single task with all of its fields.
+    """
+    return get_task_by_id(task_id)
+
+def fetch_task_page(columns: Sequence[str], cursor: Optional[Dict[str, int]] = None, page_size: int = 50,
+                    **filters: Any) -> Tuple[List[Dict[str, Any]], bool, bool]:
+    """
+    Fetches one page of tasks with only the given columns.
+
+    `cursor` is None for the first page, {"after_id": id} for the page after
+    the row with that id or {"before_id": id} for the page before it; filters
+    and sort are passed through to query_tasks. Returns the rows and whether
+    there are previous and next pages.
+    """
+    cursor = cursor or {}
+    # One extra row tells whether another page follows in the direction read
+    rows = query_tasks(columns, limit=page_size + 1, **cursor, **filters)
+    if "before_id" in cursor:
+        if len(rows) > page_size:
+            return rows[-page_size:], True, True
+        # Paged back to the start: show a full first page instead
+        return fetch_task_page(columns, None, page_size, **filters)
+    has_next = len(rows) > page_size
+    return rows[:page_size], "after_id" in cursor, has_next
+
+def search_task_page(search: str, columns: Sequence[str], page_size: int = 50, **filters: Any) -> List[Dict[str, Any]]:
+    """
+    Full-text searches tasks (words match as prefixes), returning the best
+    `page_size` matches by relevance with only the given columns.
+    """
+    return search_tasks(search, columns, limit=page_size, **filters)
+
+def count_matching_tasks(**filters: Any) -> int:
+    """
+    Counts the tasks matching the same filters as fetch_task_page.
+    """
+    return count_tasks(**filters)
+
+def deadline_as_date(task: Dict[str, Any]) -> Optional[date]:
+    """
+    Returns a task's deadline as a date for date inputs, or None if it has none.
+    """
+    return date.fromisoformat(task['deadline']) if task.get('deadline') else None
+
 def update_task_details(task_id: int, updates: Dict[str, Any]):
     """
     Updates a task with new details.
@@ -28,11 +78,9 @@ def archive_task(task_id: int):
 
 def approve_task(task_id: int, updates: Optional[Dict[str, Any]] = None):
     """
-    Moves a task to APPROVED status, optionally applying updates first.
+    Moves a task to APPROVED status, applying any updates in the same write.
     """
-    if updates:
-        update_task(task_id, updates)
-    update_task(task_id, {"status": "APPROVED"})
+    update_task(task_id, {**(updates or {}), "status": "APPROVED"})
 
 def reject_task(task_id: int):
     """
@@ -40,6 +88,30 @@ def reject_task(task_id: int):
     """
     db_delete_task(task_id)
 
+def approve_tasks(updates: Dict[int, Dict[str, Any]]) -> int:
+    """
+    Approves several tasks in one transaction, applying each task's updates.
+    """
+    return update_tasks_many({task_id: {**fields, "status": "APPROVED"} for task_id, fields in updates.items()})
+
+def archive_tasks(task_ids: List[int]) -> int:
+    """
+    Moves several tasks to COMPLETED status in one transaction.
+    """
+    return set_status_many(task_ids, "COMPLETED")
+
+def restore_tasks(task_ids: List[int]) -> int:
+    """
+    Moves several archived tasks back to APPROVED status in one transaction.
+    """
+    return set_status_many(task_ids, "APPROVED")
+
+def reject_tasks(task_ids: List[int]) -> int:
+    """
+    Permanently deletes several tasks in one transaction.
+    """
+    return delete_tasks_many(task_ids)
+
 def fetch_projects() -> List[Dict[str, Any]]:
     """
     Fetches the list of active projects.
@@ -3,15 +3,20 @@ import threading
 import logging
 import streamlit as st
 from pathlib import Path
+from backend.core.ingestion import IngestionPool
+from backend.core.recovery import BacklogScanner
 from backend.core.watcher import start_watcher
 from backend.utils.config import INBOX_DIR
 from backend.services.db_service import init_db
+from backend.services.ai_service import warm_up
 
 logger = logging.getLogger(__name__)
 
 class WatcherManager:
     def __init__(self):
         self.observer = None
+        self.pool = None
+        self.scanner = None
         self.loop = None
         self.thread = None
         self._running = False
@@ -36,14 +41,23 @@ class WatcherManager:
             import time
             time.sleep(0.5)
 
-        # 3. Start the watchdog observer
-        self.observer = start_watcher(INBOX_DIR, self.loop)
+        # 3. Warm up the model endpoint in the background so the first file
+        # does not pay for connecting and loading the model
+        asyncio.run_coroutine_threadsafe(warm_up(), self.loop)
+
+        # 4. Start the watchdog observer
+        self.pool = IngestionPool()
+        self.scanner = BacklogScanner()
+        self.observer = start_watcher(INBOX_DIR, self.loop, self.pool, self.scanner)
         self._running = True
         logger.info("Watcher Manager started successfully.")
 
     def stop(self):
         if self.observer:
             self.observer.stop()
+            if self.pool:
+                # Unblocks the observer thread if it is waiting on backpressure
+                self.pool.stop()
             self.observer.join()
         self._running = False
         logger.info("Watcher Manager stopped.")
@@ -52,6 +66,16 @@ class WatcherManager:
     def is_running(self):
         return self._running and self.observer and self.observer.is_alive()
 
+    def pool_stats(self):
+        """Returns the ingestion pool's queue depth and utilisation, if running."""
+        return self.pool.stats() if self.pool else None
+
+    def backlog_progress(self):
+        """Returns the startup backlog scan's progress while it is running."""
+        if self.scanner and self.scanner.is_running:
+            return self.scanner.progress()
+        return None
+
 @st.cache_resource
 def get_watcher_manager():
     return WatcherManager()
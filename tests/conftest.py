@@ -0,0 +1,28 @@
+import pytest
+from backend.services import db_service
+from backend.utils import config
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """A fresh SQLite database in the test's temporary directory."""
+    monkeypatch.setattr(db_service, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(db_service, "DB_PATH", tmp_path / "tasks.db")
+    db_service.init_db()
+
+@pytest.fixture
+def projects():
+    """Projects saved by the registry fixture; override in a module for other data."""
+    return [{"id": "SB-01", "name": "Suspension Bridge", "context": "Cables"}]
+
+@pytest.fixture
+def team():
+    """Team saved by the registry fixture; override in a module for other data."""
+    return [{"name": "Alice", "role": "Engineer", "duties": [], "projects": ["SB-01"]}]
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch, projects, team):
+    """Settings files in the test's temporary directory, holding `projects` and `team`."""
+    monkeypatch.setattr(config, "PROJECTS_FILE", tmp_path / "projects.json")
+    monkeypatch.setattr(config, "TEAM_FILE", tmp_path / "team.json")
+    config.save_projects(projects)
+    config.save_team(team)
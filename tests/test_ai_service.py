@@ -59,3 +59,43 @@ async def test_analyze_content_failure():
     
     with pytest.raises(Exception, match="AI Error"):
         await agent_service.analyze_content("Analyze this")
+
+def test_system_prompt_cached_until_settings_change(tmp_path, monkeypatch):
+    from backend.utils import config
+    monkeypatch.setattr(config, "PROJECTS_FILE", tmp_path / "projects.json")
+    monkeypatch.setattr(config, "TEAM_FILE", tmp_path / "team.json")
+    config.save_projects([{"id": "SB-01", "name": "South Bridge", "context": "Steel"}])
+    config.save_team([])
+
+    agent_service = TaskAnalysisAgent()
+    cache = agent_service.prompt_cache
+    with patch("backend.services.ai_service.load_projects", wraps=config.load_projects) as loader:
+        prompt = cache.get()
+        version = agent_service.prompt_version
+        assert cache.get() is prompt
+        assert loader.call_count == 1
+        assert "SB-01: South Bridge" in prompt
+
+        config.save_projects([{"id": "NT-02", "name": "North Tunnel", "context": "TBM"}])
+        assert "NT-02: North Tunnel" in cache.get()
+        assert loader.call_count == 2
+        assert agent_service.prompt_version != version
+    assert cache.builds == 2
+
+def test_endpoints_share_pooled_http_client():
+    agent_service = TaskAnalysisAgent(model_name="big", base_url="http://cloud/v1/", cascade=["small@http://local/v1/"])
+    clients = [provider.client._client for provider in agent_service._providers.values()]
+    assert len(clients) == 2
+    assert all(client is agent_service.http_client for client in clients)
+
+@pytest.mark.asyncio
+async def test_warm_up_pings_each_model():
+    agent_service = TaskAnalysisAgent(model_name="big", base_url="http://cloud/v1/", cascade=["small@http://local/v1/"])
+    for provider in agent_service._providers.values():
+        provider.client.chat.completions.create = AsyncMock()
+    timings = await agent_service.warm_up()
+    assert set(timings) == {"small", "big"}
+    assert all(seconds is not None for seconds in timings.values())
+
+    agent_service._providers["http://local/v1/"].client.chat.completions.create = AsyncMock(side_effect=ConnectionError())
+    assert (await agent_service.warm_up())["small"] is None
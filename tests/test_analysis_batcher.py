@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from backend.core.models import BatchTaskProposal, TaskProposal
+from backend.services.ai_service import TaskAnalysisAgent, format_batch
+from backend.services.analysis_batcher import AnalysisBatcher
+
+def test_format_batch_numbers_emails():
+    message = format_batch(["first", "second"])
+    assert '<email index="1">\nfirst\n</email>' in message
+    assert '<email index="2">\nsecond\n</email>' in message
+
+@pytest.mark.asyncio
+async def test_analyze_batch_maps_results_and_falls_back():
+    agent_service = TaskAnalysisAgent()
+    batch_result = MagicMock()
+    # Out of order, and email 2 is missing from the answer
+    batch_result.output = [
+        BatchTaskProposal(index=3, title="Third"),
+        BatchTaskProposal(index=1, title="First"),
+    ]
+    agent_service.batch_agent.run = AsyncMock(return_value=batch_result)
+    single_result = MagicMock()
+    single_result.output = TaskProposal(title="Second")
+    agent_service.agent.run = AsyncMock(return_value=single_result)
+
+    results = await agent_service.analyze_batch(["one", "two", "three"])
+    assert [r.title for r in results] == ["First", "Second", "Third"]
+    assert all(type(r) is TaskProposal for r in results)
+    agent_service.agent.run.assert_called_once_with("two")
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_per_item():
+    agent_service = TaskAnalysisAgent()
+    agent_service.batch_agent.run = AsyncMock(side_effect=ValueError("invalid output"))
+
+    async def single(content):
+        if content == "bad":
+            raise ValueError("AI Error")
+        result = MagicMock()
+        result.output = TaskProposal(title=content)
+        return result
+
+    agent_service.agent.run = AsyncMock(side_effect=single)
+    results = await agent_service.analyze_batch(["good", "bad"])
+    assert results[0].title == "good"
+    assert isinstance(results[1], ValueError)
+
+def test_should_batch_needs_deep_backlog_and_short_email():
+    backlog = 0
+    batcher = AnalysisBatcher(MagicMock(), backlog=lambda: backlog, max_size=4, max_chars=100, min_backlog=10)
+    assert not batcher.should_batch("short")
+    backlog = 20
+    assert batcher.should_batch("short")
+    assert not batcher.should_batch("x" * 101)
+    assert not AnalysisBatcher(MagicMock(), backlog=None).should_batch("short")
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions_share_one_call():
+    agent = MagicMock()
+    agent.analyze_batch = AsyncMock(side_effect=lambda contents: [TaskProposal(title=c) for c in contents])
+    batcher = AnalysisBatcher(agent, backlog=lambda: 100, max_size=3, max_wait=0.05)
+
+    results = await asyncio.gather(*(batcher.submit(c) for c in ["a", "b", "c", "d"]))
+    assert [r.title for r in results] == ["a", "b", "c", "d"]
+    # Three fill a batch immediately; the fourth is sent when the wait expires
+    assert agent.analyze_batch.call_count == 2
+    assert batcher.stats()["batched_items"] == 4
+
+@pytest.mark.asyncio
+async def test_batch_is_sent_once_every_concurrent_email_waits():
+    agent = MagicMock()
+    agent.analyze_batch = AsyncMock(side_effect=lambda contents: [TaskProposal(title=c) for c in contents])
+    # Only two files are analysed at once, so a batch of five could never fill
+    batcher = AnalysisBatcher(agent, backlog=lambda: 100, max_size=5, max_wait=30, concurrency=2)
+    assert batcher.batch_size == 2
+
+    results = await asyncio.wait_for(asyncio.gather(batcher.submit("a"), batcher.submit("b")), 1)
+    assert [r.title for r in results] == ["a", "b"]
+    agent.analyze_batch.assert_called_once_with(["a", "b"])
+    assert not AnalysisBatcher(agent, backlog=lambda: 100, concurrency=1).should_batch("short")
@@ -0,0 +1,57 @@
+import pytest
+from unittest.mock import AsyncMock
+from backend.core.models import TaskProposal
+from backend.services import ai_service
+from backend.services.analysis_cache import AnalysisCache, make_cache_key
+
+pytestmark = pytest.mark.usefixtures("temp_db")
+
+def proposal(title="Check pile caps"):
+    return TaskProposal(title=title, project_id="SB-01", assigned_to="Alice", confidence=0.9)
+
+def test_cache_key_ignores_whitespace_but_not_model_or_context():
+    key = make_cache_key("Check  the\n pile caps ", "model-a", "v1")
+    assert key == make_cache_key("Check the pile caps", "model-a", "v1")
+    assert key != make_cache_key("Check the pile caps", "model-b", "v1")
+    assert key != make_cache_key("Check the pile caps", "model-a", "v2")
+
+def test_memory_and_disk_levels():
+    cache = AnalysisCache(enabled=True)
+    assert cache.get("k") is None
+    cache.put("k", proposal(), "model-a", "v1")
+    assert cache.get("k").title == "Check pile caps"
+
+    # A fresh process only has the SQLite level
+    restarted = AnalysisCache(enabled=True)
+    assert restarted.get("k").title == "Check pile caps"
+    assert restarted.get("k") is not None
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_lru_and_size_eviction():
+    cache = AnalysisCache(enabled=True, memory_entries=2, max_entries=2, evict_every=1)
+    for key in ("a", "b", "c"):
+        cache.put(key, proposal(key), "model-a", "v1")
+    assert list(cache._memory) == ["b", "c"]
+    assert AnalysisCache(enabled=True).get("a") is None
+
+def test_expired_entries_are_misses():
+    cache = AnalysisCache(enabled=True, ttl=0.000001)
+    cache.put("k", proposal(), "model-a", "v1")
+    assert cache.get("k") is None
+
+@pytest.mark.asyncio
+async def test_analyze_content_uses_cache(monkeypatch):
+    agent = ai_service.TaskAnalysisAgent(model_name="test-model")
+    agent.analyze_content = AsyncMock(return_value=proposal())
+    monkeypatch.setattr(ai_service, "_agent_instance", agent)
+    monkeypatch.setattr(ai_service, "_cache_instance", AnalysisCache(enabled=True))
+
+    first = await ai_service.analyze_content("Check the pile caps")
+    second = await ai_service.analyze_content("Check the  pile caps\n")
+    assert first == second
+    agent.analyze_content.assert_called_once_with("Check the pile caps")
+
+    await ai_service.analyze_content("Check the pile caps", use_cache=False)
+    assert agent.analyze_content.call_count == 2
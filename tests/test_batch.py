@@ -0,0 +1,95 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from backend.core.batch import BatchIngestor, format_report, percentile
+from backend.core.models import TaskProposal
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+@pytest.mark.asyncio
+async def test_dry_run_reports_and_resumes(tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    for i in range(3):
+        (archive / f"mail_{i}.txt").write_text(f"Please check beam B{i}.")
+    (archive / "empty.txt").write_text("")
+    (archive / "notes.pdf").write_text("ignored")
+    checkpoint = tmp_path / "checkpoint.jsonl"
+
+    proposal = TaskProposal(title="Check beam", project_id="SB-01", confidence=0.9)
+    with patch("backend.core.orchestration.analyze_content", new=AsyncMock(return_value=proposal)) as mock_analyze:
+        report = await BatchIngestor(archive, concurrency=2, dry_run=True, checkpoint_path=checkpoint).run()
+
+        assert report["files"] == 4
+        assert report["succeeded"] == 3
+        assert report["failed"] == 1
+        assert report["failures"][0]["error"] == "No content extracted"
+        assert report["stages"]["analyse"]["count"] == 3
+        assert mock_analyze.await_count == 3
+        assert "files/sec" in format_report(report)
+
+        resumed = await BatchIngestor(archive, dry_run=True, resume=True, checkpoint_path=checkpoint).run()
+
+    assert resumed["skipped"] == 3
+    assert resumed["files"] == 1
+    assert (archive / "mail_0.txt").exists()
+
+@pytest.mark.asyncio
+async def test_concurrency_is_not_capped_by_pool_env(tmp_path, monkeypatch):
+    import asyncio
+    monkeypatch.setenv("INGEST_MAX_IN_FLIGHT", "2")
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    for i in range(6):
+        (archive / f"mail_{i}.txt").write_text(f"Please check beam B{i}.")
+
+    running = peak = 0
+
+    async def analyse(content):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return TaskProposal(title="Check beam", project_id="SB-01", confidence=0.9)
+
+    with patch("backend.core.orchestration.analyze_content", new=analyse):
+        report = await BatchIngestor(archive, concurrency=6, dry_run=True,
+                                     checkpoint_path=tmp_path / "checkpoint.jsonl").run()
+
+    assert report["succeeded"] == 6
+    assert peak == 6
+
+@pytest.mark.asyncio
+async def test_failed_files_are_retried_before_the_run_ends(tmp_path, monkeypatch, temp_db):
+    from backend.core import orchestration
+    from backend.services import db_service
+    monkeypatch.setattr(orchestration, "STAGING_DIR", tmp_path / "staging")
+    monkeypatch.setattr(orchestration, "PROCESSED_DIR", tmp_path / "processed")
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    (archive / "flaky.txt").write_text("Please check beam B1.")
+    (archive / "broken.txt").write_text("Please check beam B2.")
+    calls = {"flaky": 0, "broken": 0}
+
+    async def analyse(content):
+        key = "flaky" if "B1" in content else "broken"
+        calls[key] += 1
+        if key == "broken" or calls[key] == 1:
+            raise ValueError("model unavailable")
+        return TaskProposal(title="Check beam", project_id="SB-01", confidence=0.9)
+
+    with patch("backend.core.orchestration.analyze_content", new=analyse):
+        report = await BatchIngestor(archive, concurrency=2, checkpoint_path=tmp_path / "checkpoint.jsonl",
+                                     retry_delay=0, retry_interval=0.01).run()
+
+    assert calls == {"flaky": 2, "broken": 3}
+    assert (report["files"], report["succeeded"], report["failed"]) == (2, 1, 1)
+    assert db_service.get_jobs("FAILED")[0]["source_path"] == str(archive / "broken.txt")
+    # The failed file sits in staging, where a rescan would not find it
+    assert report["stranded"][0]["file"] == str(archive / "broken.txt")
+    assert "Left in staging" in format_report(report)
+    assert "flaky.txt" in (tmp_path / "checkpoint.jsonl").read_text()
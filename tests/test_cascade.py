@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from backend.core.models import BatchTaskProposal, TaskProposal
+from backend.services.ai_service import TaskAnalysisAgent, parse_cascade
+
+pytestmark = pytest.mark.usefixtures("registry")
+
+def run_result(proposal):
+    result = MagicMock()
+    result.output = proposal
+    return result
+
+def make_agent(small_answer):
+    agent_service = TaskAnalysisAgent(model_name="big", cascade=["small@http://localhost:11434/v1/"], min_confidence=0.7)
+    big_answer = TaskProposal(title="Big", project_id="SB-01", assigned_to="Alice", confidence=0.95)
+
+    async def run(content, model=None, **kwargs):
+        if model is None:
+            return run_result(big_answer)
+        if isinstance(small_answer, Exception):
+            raise small_answer
+        return run_result(small_answer)
+
+    agent_service.agent.run = AsyncMock(side_effect=run)
+    return agent_service
+
+def test_parse_cascade():
+    assert parse_cascade("a, b@http://x/v1/ ,") == [("a", None), ("b", "http://x/v1/")]
+
+def test_tiers_share_schedulers_per_endpoint():
+    agent_service = TaskAnalysisAgent(model_name="big", base_url="http://cloud/v1/",
+                                      cascade=["tiny@http://local/v1/", "mid@http://local/v1/"])
+    assert [t.name for t in agent_service.tiers] == ["tiny", "mid", "big"]
+    assert agent_service.tiers[0].scheduler is agent_service.tiers[1].scheduler
+    assert agent_service.tiers[2].scheduler is agent_service.scheduler
+
+@pytest.mark.asyncio
+async def test_confident_small_answer_is_accepted():
+    agent_service = make_agent(TaskProposal(title="Small", project_id="SB-01", assigned_to="Alice", confidence=0.8))
+    assert (await agent_service.analyze_content("Check cables")).title == "Small"
+    stats = agent_service.cascade_stats()
+    assert stats["small"]["hit_rate"] == 1.0
+    assert stats["big"]["calls"] == 0
+
+@pytest.mark.parametrize("small_answer", [
+    TaskProposal(title="Small", project_id="SB-01", assigned_to="Alice", confidence=0.3),
+    TaskProposal(title="Small", project_id="XX-00", assigned_to="Alice", confidence=0.9),
+    TaskProposal(title="Small", project_id="SB-01", assigned_to="Mallory", confidence=0.9),
+    ValueError("Exceeded maximum retries for output validation"),
+])
+@pytest.mark.asyncio
+async def test_escalates_to_the_large_model(small_answer):
+    agent_service = make_agent(small_answer)
+    assert (await agent_service.analyze_content("Check cables")).title == "Big"
+    stats = agent_service.cascade_stats()
+    assert stats["small"]["escalated"] == 1
+    assert stats["big"]["accepted"] == 1
+
+@pytest.mark.asyncio
+async def test_batch_goes_to_the_first_tier_and_escalates_per_email():
+    agent_service = make_agent(None)
+    small = agent_service.tiers[0]
+    batch_result = MagicMock()
+    batch_result.output = [
+        BatchTaskProposal(index=1, title="Small", project_id="SB-01", assigned_to="Alice", confidence=0.9),
+        BatchTaskProposal(index=2, title="Small", project_id="SB-01", assigned_to="Alice", confidence=0.3),
+    ]
+    agent_service.batch_agent.run = AsyncMock(return_value=batch_result)
+
+    results = await agent_service.analyze_batch(["Check cables", "Check bolts"])
+    assert [r.title for r in results] == ["Small", "Big"]
+    assert agent_service.batch_agent.run.call_args.kwargs["model"] is small.model
+    # Only the unsure email reached the large model
+    agent_service.agent.run.assert_called_once_with("Check bolts")
+    stats = agent_service.cascade_stats()
+    assert stats["small"]["accepted"] == 1
+    assert stats["small"]["escalated"] == 1
+    assert stats["big"]["accepted"] == 1
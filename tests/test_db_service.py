@@ -0,0 +1,291 @@
+import pytest
+from backend.services import db_service
+
+pytestmark = pytest.mark.usefixtures("temp_db")
+
+def test_enqueue_job_deduplicates_active_jobs():
+    first = db_service.enqueue_job("/inbox/a.txt")
+    second = db_service.enqueue_job("/inbox/a.txt")
+    assert first == second
+
+    db_service.advance_job(first, "STAGED", staging_path="/staging/a.txt")
+    # A staging orphan maps back onto the job that staged it
+    assert db_service.enqueue_job("/staging/a.txt") == first
+
+def test_enqueue_job_after_completion_creates_new_job():
+    first = db_service.enqueue_job("/inbox/a.txt")
+    db_service.advance_job(first, "DONE")
+    assert db_service.enqueue_job("/inbox/a.txt") != first
+
+def test_claim_job_is_exclusive():
+    job_id = db_service.enqueue_job("/inbox/a.txt")
+    job = db_service.claim_job(job_id, "worker-1")
+    assert job["state"] == "CLAIMED"
+    assert job["attempts"] == 1
+    assert job["worker_id"] == "worker-1"
+    assert db_service.claim_job(job_id, "worker-2") is None
+
+def test_claim_next_job_in_fifo_order():
+    first = db_service.enqueue_job("/inbox/a.txt")
+    second = db_service.enqueue_job("/inbox/b.txt")
+    assert db_service.claim_next_job("w1")["id"] == first
+    assert db_service.claim_next_job("w2")["id"] == second
+    assert db_service.claim_next_job("w3") is None
+
+def test_fail_job_retries_until_max_attempts():
+    job_id = db_service.enqueue_job("/inbox/a.txt")
+    for _ in range(2):
+        db_service.claim_job(job_id, "w1")
+        db_service.fail_job(job_id, "timeout", max_attempts=3)
+        assert db_service.get_job(job_id)["state"] == "QUEUED"
+
+    db_service.claim_job(job_id, "w1")
+    db_service.fail_job(job_id, "timeout", max_attempts=3)
+    job = db_service.get_job(job_id)
+    assert job["state"] == "FAILED"
+    assert job["last_error"] == "timeout"
+
+def test_requeue_stale_jobs_by_worker():
+    a = db_service.enqueue_job("/inbox/a.txt")
+    b = db_service.enqueue_job("/inbox/b.txt")
+    db_service.claim_job(a, "dead")
+    db_service.claim_job(b, "alive")
+
+    assert db_service.requeue_stale_jobs("dead") == 1
+    assert db_service.get_job(a)["state"] == "QUEUED"
+    assert db_service.get_job(b)["state"] == "CLAIMED"
+
+def test_job_counts_and_stage_stats():
+    job_id = db_service.enqueue_job("/inbox/a.txt")
+    db_service.claim_job(job_id, "w1")
+    for state in ["STAGED", "EXTRACTED", "ANALYSED", "INSERTED", "DONE"]:
+        db_service.advance_job(job_id, state)
+
+    assert db_service.get_job_counts()["DONE"] == 1
+    stats = db_service.get_job_stage_stats()
+    assert stats["total"]["count"] == 1
+    assert stats["analyse"]["avg_seconds"] >= 0
+
+def test_advance_job_rejects_unknown_state():
+    job_id = db_service.enqueue_job("/inbox/a.txt")
+    with pytest.raises(ValueError):
+        db_service.advance_job(job_id, "BOGUS")
+
+def test_connections_are_persistent_per_thread():
+    import threading
+    conn = db_service.get_connection()
+    assert db_service.get_connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db_service.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+def test_concurrent_writers_and_readers():
+    import threading
+    errors = []
+
+    def write(n):
+        try:
+            for i in range(25):
+                db_service.create_task(f"{n}-{i}.txt", "Subject", "Summary", None, "SB-01", "Alice", "")
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            for _ in range(25):
+                db_service.get_tasks("PENDING")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(db_service.get_tasks()) == 100
+
+def test_failed_write_is_rolled_back():
+    with pytest.raises(ValueError):
+        with db_service._cursor() as cursor:
+            cursor.execute("INSERT INTO tasks (summary) VALUES ('half done')")
+            raise ValueError("boom")
+    assert db_service.get_tasks() == []
+
+def test_init_db_is_idempotent():
+    version = db_service.get_schema_version()
+    assert version == len(db_service.MIGRATIONS)
+    db_service.init_db()
+    assert db_service.get_schema_version() == version
+
+def test_legacy_database_is_migrated(tmp_path, monkeypatch):
+    import sqlite3
+    legacy = tmp_path / "legacy.db"
+    conn = sqlite3.connect(legacy)
+    conn.execute("""
+        CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, source_file TEXT, original_subject TEXT,
+                            summary TEXT, deadline TEXT, project_id TEXT, assignee TEXT, reasoning TEXT,
+                            status TEXT DEFAULT 'PENDING')
+    """)
+    conn.executemany("INSERT INTO tasks (summary, deadline, reasoning) VALUES (?, ?, ?)", [
+        ("Dated", "2025-05-01", "AI"),
+        ("Undated", "None", "AI"),
+        ("Vague", "end of May", "AI"),
+    ])
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db_service, "DB_PATH", legacy)
+    db_service.init_db()
+
+    tasks = {t["summary"]: t for t in db_service.get_tasks()}
+    assert tasks["Dated"]["deadline"] == "2025-05-01"
+    assert tasks["Undated"]["deadline"] is None
+    assert tasks["Vague"]["deadline"] is None
+    assert "end of May" in tasks["Vague"]["reasoning"]
+    assert tasks["Dated"]["created_at"] is not None
+    # Existing tasks are indexed for search, including the moved deadline text
+    assert [t["summary"] for t in db_service.search_tasks("may")] == ["Vague"]
+
+    plan = db_service.get_connection().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM tasks WHERE status = ? AND project_id = ? ORDER BY id DESC", ("PENDING", "SB-01")
+    ).fetchall()
+    assert "idx_tasks_status_project" in str([tuple(row) for row in plan])
+
+def test_deadlines_are_stored_as_iso_dates():
+    from datetime import datetime
+    task_id = db_service.create_task("a.txt", "Subject", "Summary", datetime(2025, 5, 1, 17, 0), "SB-01", "Alice", "")
+    assert db_service.get_task_by_id(task_id)["deadline"] == "2025-05-01"
+
+    db_service.update_task(task_id, {"deadline": "None"})
+    task = db_service.get_task_by_id(task_id)
+    assert task["deadline"] is None
+    assert task["updated_at"] >= task["created_at"]
+
+    with pytest.raises(ValueError):
+        db_service.update_task(task_id, {"deadline": "next Friday"})
+
+def _walk(**kwargs):
+    """Pages forward through query_tasks, three rows at a time, returning the ids seen."""
+    pages, after_id = [], None
+    while True:
+        page = db_service.query_tasks(columns=["summary"], limit=3, after_id=after_id, **kwargs)
+        if not page:
+            return pages
+        pages.append([row["id"] for row in page])
+        after_id = page[-1]["id"]
+
+def test_query_tasks_keyset_pagination():
+    deadlines = ["2025-03-01", None, "2025-01-01", "2025-03-01", None, "2025-02-01", "2025-01-01"]
+    ids = [db_service.create_task(f"{i}.txt", "S", f"Summary {i}", d, "SB-01" if i % 2 else "RD-02", "Alice", "", "APPROVED")
+           for i, d in enumerate(deadlines)]
+    db_service.create_task("x.txt", "S", "Pending", None, "SB-01", "Alice", "", "PENDING")
+
+    assert sum(_walk(status="APPROVED"), []) == ids[::-1]
+    by_deadline = sum(_walk(status="APPROVED", sort="deadline"), [])
+    assert by_deadline == [ids[2], ids[6], ids[5], ids[0], ids[3], ids[1], ids[4]]
+    assert sum(_walk(status="APPROVED", sort="-deadline"), []) == [ids[3], ids[0], ids[5], ids[6], ids[2], ids[4], ids[1]]
+
+    # Paging back from any row returns the rows just before it
+    for position in range(1, len(by_deadline)):
+        page = db_service.query_tasks(status="APPROVED", sort="deadline", before_id=by_deadline[position], limit=2)
+        assert [row["id"] for row in page] == by_deadline[max(0, position - 2):position]
+
+    row = db_service.query_tasks(columns=["summary"], status="APPROVED", limit=1)[0]
+    assert set(row) == {"id", "summary"}
+    with pytest.raises(ValueError):
+        db_service.query_tasks(columns=["summary; DROP TABLE tasks"])
+    with pytest.raises(ValueError):
+        db_service.query_tasks(sort="assignee")
+
+def test_query_tasks_filters_and_count():
+    db_service.create_task("a.txt", "S", "Cable check", "2025-01-10", "SB-01", "Alice", "", "APPROVED")
+    db_service.create_task("b.txt", "S", "Budget 100% review", "2025-02-10", "SB-01", "Bob", "", "APPROVED")
+    db_service.create_task("c.txt", "S", "Cable order", None, "RD-02", "Alice", "", "APPROVED")
+
+    assert db_service.count_tasks(status="APPROVED") == 3
+    assert db_service.count_tasks(status="APPROVED", project_id="SB-01", assignee="Alice") == 1
+    assert db_service.count_tasks(deadline_from="2025-02-01") == 1
+    assert db_service.count_tasks(deadline_to="2025-02-01") == 1
+    assert db_service.count_tasks(search="cable") == 2
+    assert db_service.count_tasks(search="cab ord") == 1
+    assert db_service.count_tasks(search="100%") == 1
+    assert [row["summary"] for row in db_service.query_tasks(status="APPROVED", assignee="Bob")] == ["Budget 100% review"]
+
+    plan = db_service.get_connection().execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE status = ? AND deadline > ? ORDER BY deadline, id LIMIT 50",
+        ("APPROVED", "2025-01-01")
+    ).fetchall()
+    assert "idx_tasks_status_deadline" in str([tuple(row) for row in plan])
+
+def test_bulk_task_operations():
+    ids = db_service.create_tasks_many([
+        {"source_file": f"{i}.txt", "original_subject": "S", "summary": f"Summary {i}", "deadline": "2025-01-0%d" % (i + 1),
+         "project_id": "SB-01", "assignee": "Alice", "reasoning": ""}
+        for i in range(4)
+    ])
+    assert [db_service.get_task_by_id(task_id)["summary"] for task_id in ids] == [f"Summary {i}" for i in range(4)]
+    assert db_service.count_tasks(status="PENDING") == 4
+
+    updated = db_service.update_tasks_many({
+        ids[0]: {"assignee": "Bob", "status": "APPROVED"},
+        ids[1]: {"assignee": "Carol", "status": "APPROVED"},
+        ids[2]: {"deadline": None, "status": "APPROVED"},
+    })
+    assert updated == 3
+    assert db_service.get_task_by_id(ids[1])["assignee"] == "Carol"
+    assert db_service.get_task_by_id(ids[2])["deadline"] is None
+
+    assert db_service.set_status_many(ids[:2], "COMPLETED") == 2
+    assert db_service.count_tasks(status="COMPLETED") == 2
+    assert db_service.delete_tasks_many(ids[2:]) == 2
+    assert db_service.count_tasks() == 2
+
+def test_bulk_update_is_all_or_nothing():
+    ids = db_service.create_tasks_many([
+        {"source_file": "a.txt", "original_subject": "S", "summary": "A", "project_id": "SB-01", "assignee": "Alice", "reasoning": ""},
+        {"source_file": "b.txt", "original_subject": "S", "summary": "B", "project_id": "SB-01", "assignee": "Alice", "reasoning": ""},
+    ])
+    with pytest.raises(ValueError):
+        db_service.update_tasks_many({ids[0]: {"status": "APPROVED"}, ids[1]: {"deadline": "someday"}})
+    with pytest.raises(ValueError):
+        db_service.update_tasks_many({ids[0]: {"id": 99}})
+    assert db_service.count_tasks(status="PENDING") == 2
+
+def test_full_text_search_is_ranked_and_kept_in_sync():
+    first = db_service.create_task("site-visit.eml", "Site visit", "Walk the deck", None, "SB-01", "Alice",
+                                   "Mentions the cable inspection in passing", "APPROVED")
+    second = db_service.create_task("main-span.eml", "Cable inspection", "Inspect the main cables", None, "SB-01", "Bob",
+                                    "", "APPROVED")
+    db_service.create_task("budget.eml", "Budget", "Review the budget", None, "RD-02", "Alice", "", "COMPLETED")
+
+    assert [row["id"] for row in db_service.search_tasks("cable insp")] == [second, first]
+    assert [row["id"] for row in db_service.search_tasks("CABLE", assignee="Alice")] == [first]
+    assert db_service.search_tasks("site-visit", columns=["summary"]) == [{"id": first, "summary": "Walk the deck"}]
+    assert db_service.search_tasks('" OR *') == []
+
+    # The index follows edits and deletes
+    db_service.update_task(second, {"summary": "Repaint the railings", "original_subject": "Paint"})
+    db_service.set_status_many([first], "COMPLETED")
+    assert [row["id"] for row in db_service.search_tasks("railing")] == [second]
+    assert [row["id"] for row in db_service.search_tasks("cable", status="COMPLETED")] == [first]
+    db_service.delete_tasks_many([first])
+    assert db_service.search_tasks("cable") == []
+    assert db_service.count_tasks(search="budget", status="COMPLETED") == 1
+
+def test_failed_jobs_wait_for_their_backoff():
+    fresh = db_service.enqueue_job("/inbox/fresh.txt")
+    failed = db_service.enqueue_job("/inbox/failed.txt")
+    db_service.claim_job(failed, "w1")
+    db_service.fail_job(failed, "AI Analysis failed: timeout")
+
+    assert db_service.get_due_retries(retry_delay=60) == []
+    assert db_service.claim_next_job("w2", retry_delay=60)["id"] == fresh
+    assert db_service.claim_next_job("w2", retry_delay=60) is None
+
+    assert [job["id"] for job in db_service.get_due_retries(retry_delay=0)] == [failed]
+    assert db_service.claim_next_job("w2", retry_delay=0)["id"] == failed
@@ -0,0 +1,99 @@
+import time
+import pytest
+from unittest.mock import patch
+from backend.core import extraction
+from backend.core.extraction import ExtractionExecutor, ExtractionTimeout
+from backend.utils.parsers import ExtractionBudget, ParsedContent
+
+def test_extract_content_txt(tmp_path):
+    f = tmp_path / "note.txt"
+    f.write_text("Check the pile caps.")
+    assert extraction.extract_content(f) == ("note.txt", "Check the pile caps.")
+
+def test_extract_content_unsupported(tmp_path):
+    f = tmp_path / "drawing.dwg"
+    f.write_bytes(b"x")
+    assert extraction.extract_content(f) == ("drawing.dwg", "Unsupported file type: .dwg")
+
+def test_extract_parsed_applies_budget(tmp_path):
+    f = tmp_path / "thread.txt"
+    f.write_text("z" * 1000)
+    parsed = extraction.extract_parsed(f, ExtractionBudget(max_chars=100))
+    assert parsed.truncated
+    assert parsed.original_chars == 1000
+
+def test_pool_selection(tmp_path):
+    small = tmp_path / "small.txt"
+    small.write_text("x")
+    big = tmp_path / "big.txt"
+    big.write_bytes(b"x" * 2048)
+    msg = tmp_path / "mail.msg"
+    msg.write_bytes(b"x")
+
+    executor = ExtractionExecutor(process_workers=1, process_min_bytes=1024)
+    assert executor._use_process_pool(small) is False
+    assert executor._use_process_pool(big) is True
+    assert executor._use_process_pool(msg) is True
+    # Process pool disabled: everything runs in threads
+    assert ExtractionExecutor(process_workers=0)._use_process_pool(msg) is False
+
+@pytest.mark.asyncio
+async def test_extract_in_thread_pool(tmp_path):
+    f = tmp_path / "note.txt"
+    f.write_text("Review drawing S-101.")
+    executor = ExtractionExecutor(process_workers=0)
+    parsed = await executor.extract(f)
+    assert (parsed.subject, parsed.body) == ("note.txt", "Review drawing S-101.")
+    executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_extract_in_process_pool(tmp_path):
+    f = tmp_path / "note.txt"
+    f.write_text("Review drawing S-102.")
+    executor = ExtractionExecutor(process_workers=1, process_min_bytes=0, timeout=60)
+    parsed = await executor.extract(f)
+    assert (parsed.subject, parsed.body) == ("note.txt", "Review drawing S-102.")
+    executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_extract_timeout(tmp_path):
+    f = tmp_path / "slow.txt"
+    f.write_text("x")
+
+    def slow_extract(path, budget=None):
+        time.sleep(0.5)
+        return ParsedContent(subject=path.name, body="x")
+
+    executor = ExtractionExecutor(process_workers=0, timeout=0.05)
+    with patch.object(extraction, "extract_parsed", slow_extract):
+        with pytest.raises(ExtractionTimeout):
+            await executor.extract(f)
+    executor.shutdown()
+
+def _hang_on_slow_files(path, budget=None):
+    # Module level so the spawned extraction processes can unpickle it
+    if "slow" in path.name:
+        time.sleep(60)
+    return ParsedContent(subject=path.name, body="parsed")
+
+@pytest.mark.asyncio
+async def test_timeout_reset_resubmits_other_files(tmp_path):
+    import asyncio
+    slow = tmp_path / "slow.txt"
+    fast = tmp_path / "fast.txt"
+    slow.write_text("x")
+    fast.write_text("x")
+
+    # One process: the fast file waits behind the slow one and is killed with it
+    executor = ExtractionExecutor(process_workers=1, process_min_bytes=0, timeout=4)
+    with patch.object(extraction, "extract_parsed", _hang_on_slow_files):
+        slow_task = asyncio.ensure_future(executor.extract(slow))
+        await asyncio.sleep(0.5)
+        fast_task = asyncio.ensure_future(executor.extract(fast))
+        with pytest.raises(ExtractionTimeout):
+            await slow_task
+        parsed = await fast_task
+
+    assert parsed.body == "parsed"
+    assert executor.resubmitted == 1
+    executor.shutdown()
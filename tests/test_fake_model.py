@@ -0,0 +1,70 @@
+import pytest
+from pydantic_ai.exceptions import ModelHTTPError
+from backend.services.ai_service import TaskAnalysisAgent
+from backend.services.fake_model import is_fake_model, parse_latency
+from backend.services.llm_scheduler import LLMScheduler
+
+pytestmark = pytest.mark.usefixtures("registry")
+
+@pytest.fixture
+def projects():
+    return [
+        {"id": "SB-01", "name": "Suspension Bridge", "context": "Cables"},
+        {"id": "TN-02", "name": "Tunnel", "context": "Boring"},
+    ]
+
+@pytest.fixture
+def team():
+    return [
+        {"name": "Alice", "role": "Engineer", "duties": [], "projects": ["SB-01"]},
+        {"name": "Bob", "role": "Engineer", "duties": [], "projects": ["TN-02"]},
+    ]
+
+@pytest.fixture(autouse=True)
+def fake_env(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY", "fixed:0")
+    monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "0")
+
+def test_latency_distributions():
+    import random
+    rng = random.Random(1)
+    assert parse_latency("fixed:0.2")(rng) == 0.2
+    assert 1 <= parse_latency("uniform:1:2")(rng) <= 2
+    assert parse_latency("normal:0:0.001")(rng) >= 0
+    with pytest.raises(ValueError):
+        parse_latency("poisson:3")
+
+def test_fake_model_names():
+    assert is_fake_model("fake")
+    assert is_fake_model("fake:small")
+    assert not is_fake_model("gpt-oss:120b")
+
+@pytest.mark.asyncio
+async def test_agent_runs_offline_with_fake_model():
+    agent_service = TaskAnalysisAgent(model_name="fake")
+    proposal = await agent_service.analyze_content("Tunnel boring update for TN-02\nThe machine is stuck.")
+    assert proposal.project_id == "TN-02"
+    assert proposal.assigned_to == "Bob"
+    assert proposal.title == "Tunnel boring update for TN-02"
+    assert agent_service.fake_backend.stats()["requests"] == 1
+
+@pytest.mark.asyncio
+async def test_fake_model_answers_batches():
+    agent_service = TaskAnalysisAgent(model_name="fake")
+    results = await agent_service.analyze_batch(["Cable check on SB-01", "TN-02 shaft flooding"])
+    assert [r.project_id for r in results] == ["SB-01", "TN-02"]
+
+@pytest.mark.asyncio
+async def test_fake_errors_are_retried_by_scheduler(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "1")
+    scheduler = LLMScheduler(max_retries=2, backoff_base=0.001, backoff_max=0.001)
+    agent_service = TaskAnalysisAgent(model_name="fake", scheduler=scheduler)
+    with pytest.raises(ModelHTTPError):
+        await agent_service.analyze_content("Cable check on SB-01")
+    assert agent_service.fake_backend.stats()["errors"] == 3
+
+@pytest.mark.asyncio
+async def test_fake_answers_are_reproducible():
+    first = await TaskAnalysisAgent(model_name="fake").analyze_content("Site visit next week")
+    second = await TaskAnalysisAgent(model_name="fake").analyze_content("Site visit next week")
+    assert first == second
@@ -0,0 +1,104 @@
+import pytest
+from datetime import date, datetime
+from backend.core.fastpath import FastPathClassifier, find_deadline
+
+# A Wednesday
+REFERENCE = date(2025, 3, 12)
+
+pytestmark = pytest.mark.usefixtures("registry")
+
+@pytest.fixture
+def projects():
+    return [
+        {"id": "SB-01", "name": "Suspension Bridge Feasibility", "context": "Cables"},
+        {"id": "DDU-99", "name": "Downtown Drainage Upgrade", "context": "Pipes", "aliases": ["City Drainage"]},
+    ]
+
+@pytest.fixture
+def team():
+    return [
+        {"name": "Alice Smith", "role": "Bridge Engineer", "duties": [], "projects": ["SB-01"]},
+        {"name": "Bob Jones", "role": "Hydraulics", "duties": [], "projects": ["DDU-99"]},
+        {"name": "Cara Lee", "role": "Hydraulics", "duties": [], "projects": ["DDU-99"]},
+    ]
+
+@pytest.mark.parametrize("text, expected", [
+    ("Please respond by 2025-03-20.", date(2025, 3, 20)),
+    ("Due: 14/03/2025", date(2025, 3, 14)),
+    ("Deadline is 3rd April", date(2025, 4, 3)),
+    ("by March 1st", date(2026, 3, 1)),
+    ("Send it by Friday please", date(2025, 3, 14)),
+    ("by next Wednesday", date(2025, 3, 19)),
+    ("needed by tomorrow", date(2025, 3, 13)),
+    ("by end of the month", date(2025, 3, 31)),
+    ("within 3 working days", date(2025, 3, 17)),
+])
+def test_find_deadline(text, expected):
+    assert find_deadline(text, REFERENCE)[0] == expected
+
+@pytest.mark.parametrize("text", [
+    "Deadline is the next site meeting",
+    "Alice, please send the anchorage calcs by 5pm Friday",
+    "Reply before the 5th",
+    "The drawings were issued by 3 May 2024",
+    "We need this by Wednesday",
+    # Any wording that does not resolve wins over one that does
+    "Sent by Alice. Please reply by Friday",
+])
+def test_unresolved_deadline_wording(text):
+    deadline, phrase = find_deadline(text, REFERENCE)
+    assert deadline is None
+    assert phrase
+
+def test_no_deadline_wording():
+    assert find_deadline("Thanks for the update on the cables", REFERENCE) == (None, None)
+
+def test_certain_match_skips_the_model():
+    classifier = FastPathClassifier(enabled=True)
+    result = classifier.classify("RE: SB01 cable anchorage", "Please check the anchor bolts by Friday.",
+                                 datetime(2025, 3, 12, 9, 30))
+    proposal = result.proposal
+    assert proposal.project_id == "SB-01"
+    assert proposal.assigned_to == "Alice Smith"
+    assert proposal.deadline == datetime(2025, 3, 14)
+    assert proposal.title == "SB01 cable anchorage"
+    assert classifier.stats()["avoided_share"] == 1.0
+
+def test_ambiguous_match_becomes_hints():
+    classifier = FastPathClassifier(enabled=True)
+    result = classifier.classify("City drainage query", "Pipe sizes for the outfall?")
+    assert result.proposal is None
+    assert result.project_ids == ["DDU-99"]
+    assert result.assignees == ["Bob Jones", "Cara Lee"]
+    assert "DDU-99" in result.hints()
+
+    # Naming one of the engineers settles it, given the project id in the subject
+    named = classifier.classify("DDU-99 outfall", "Hi Cara, pipe sizes for the outfall?")
+    assert named.proposal.assigned_to == "Cara Lee"
+    assert classifier.stats()["hinted"] == 1
+
+@pytest.mark.parametrize("subject, body", [
+    # Project named only by its name, in the subject or body
+    ("Newsletter", "News from the Downtown Drainage Upgrade team. Bob presented the outfall design."),
+    ("City drainage query", "Hi Cara, pipe sizes for the outfall?"),
+    # Project id only in the body
+    ("Question", "Alice, what is the status of SB-01?"),
+    # Another project mentioned alongside the subject's
+    ("SB-01 cables", "Alice, does this affect the Downtown Drainage Upgrade?"),
+    # Deadline wording that does not resolve
+    ("SB-01 anchorage", "Alice, please send the anchorage calcs by 5pm Friday"),
+])
+def test_uncertain_emails_go_to_the_model(subject, body):
+    result = FastPathClassifier(enabled=True).classify(subject, body, datetime(2025, 3, 12, 9, 30))
+    assert result.proposal is None
+    assert result.has_hints
+
+def test_title_falls_back_to_body_when_subject_is_only_the_id():
+    result = FastPathClassifier(enabled=True).classify("RE: SB-01", "\nCheck the anchor bolts.\nThanks, Alice",
+                                                       datetime(2025, 3, 12, 9, 30))
+    assert result.proposal.title == "Check the anchor bolts."
+
+def test_disabled_classifier_only_gives_hints():
+    result = FastPathClassifier(enabled=False).classify("SB-01", "Check cables")
+    assert result.proposal is None
+    assert result.has_hints
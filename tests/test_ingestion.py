@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from backend.core.ingestion import IngestionPool
+
+@pytest.mark.asyncio
+async def test_pool_processes_all_items():
+    processed = []
+
+    async def handler(item):
+        await asyncio.sleep(0)
+        processed.append(item)
+
+    pool = IngestionPool(handler, workers=3, high_water=10)
+    pool.start(asyncio.get_running_loop())
+    for i in range(20):
+        await pool.put(i)
+    await pool.join()
+
+    assert sorted(processed) == list(range(20))
+    assert pool.stats()["processed"] == 20
+    assert pool.stats()["queue_depth"] == 0
+    pool.stop()
+
+@pytest.mark.asyncio
+async def test_pool_caps_in_flight():
+    active = 0
+    peak = 0
+
+    async def handler(item):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    pool = IngestionPool(handler, workers=5, max_in_flight=2)
+    pool.start(asyncio.get_running_loop())
+    for i in range(10):
+        await pool.put(i)
+    await pool.join()
+
+    assert peak == 2
+    pool.stop()
+
+@pytest.mark.asyncio
+async def test_pool_pauses_intake_at_high_water():
+    release = asyncio.Event()
+
+    async def handler(item):
+        await release.wait()
+
+    pool = IngestionPool(handler, workers=1, high_water=3, low_water=1)
+    pool.start(asyncio.get_running_loop())
+    for i in range(4):
+        pool._increment_depth()
+        pool._enqueue(i)
+    await asyncio.sleep(0)
+
+    assert pool.intake_paused
+    # Threaded producers give up once the timeout expires
+    submitted = await asyncio.to_thread(pool.submit_threadsafe, 99, 0.5)
+    assert submitted is False
+
+    release.set()
+    await pool.join()
+    assert not pool.intake_paused
+    pool.stop()
+
+@pytest.mark.asyncio
+async def test_pool_counts_failures():
+    async def handler(item):
+        raise RuntimeError("boom")
+
+    pool = IngestionPool(handler, workers=1)
+    pool.start(asyncio.get_running_loop())
+    await pool.put("bad.txt")
+    await pool.join()
+
+    assert pool.stats()["failed"] == 1
+    pool.stop()
+
+def test_pool_requires_handler():
+    loop = asyncio.new_event_loop()
+    with pytest.raises(RuntimeError):
+        IngestionPool().start(loop)
+    loop.close()
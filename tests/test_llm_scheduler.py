@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from pydantic_ai.exceptions import ModelHTTPError
+from backend.services.llm_scheduler import CircuitBreaker, LLMScheduler, TokenBucket, is_retryable
+
+def make_scheduler(**kwargs):
+    options = dict(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0, timeout=1,
+                   max_retries=3, backoff_base=0.001, backoff_max=0.001,
+                   failure_threshold=2, reset_timeout=0.05)
+    options.update(kwargs)
+    return LLMScheduler(**options)
+
+def test_retryable_errors():
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(ModelHTTPError(503, "m"))
+    assert is_retryable(ModelHTTPError(429, "m"))
+    assert not is_retryable(ModelHTTPError(400, "m"))
+    assert not is_retryable(ValueError("bad"))
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped():
+    scheduler = make_scheduler()
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        peak = max(peak, scheduler.in_flight)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    results = await asyncio.gather(*(scheduler.run(call) for _ in range(6)))
+    assert results == ["ok"] * 6
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    scheduler = make_scheduler(failure_threshold=10)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ModelHTTPError(503, "m")
+        return "ok"
+
+    assert await scheduler.run(flaky) == "ok"
+    assert scheduler.retries == 2
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried():
+    scheduler = make_scheduler()
+
+    async def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await scheduler.run(broken)
+    assert scheduler.calls == 1
+
+@pytest.mark.asyncio
+async def test_timeout_is_enforced():
+    scheduler = make_scheduler(timeout=0.01, max_retries=0)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.run(slow)
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Callers wait until the reset timeout, then one probe goes through
+    await asyncio.wait_for(breaker.wait_until_allowed(), timeout=1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    waiter = asyncio.create_task(breaker.wait_until_allowed())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    breaker.record_success()
+    await asyncio.wait_for(waiter, timeout=1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(4):
+        await bucket.acquire(1)
+    # The first token is free; the next three wait ~10ms each
+    assert loop.time() - started >= 0.025
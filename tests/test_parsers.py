@@ -1,6 +1,9 @@
 import pytest
 from pathlib import Path
-from backend.utils.parsers import FileParser, TextFileParser, EmailFileParser
+from backend.utils.parsers import (
+    ExtractionBudget, FileParser, TextFileParser, EmailFileParser,
+    get_parser, parse_file, register_parser, truncate_text,
+)
 from unittest.mock import MagicMock, patch
 from email.message import EmailMessage
 
@@ -65,4 +68,103 @@ def test_email_file_parser_unsupported(tmp_path):
     
     parser = EmailFileParser()
     with pytest.raises(ValueError, match="Unsupported email format"):
-        parser.parse(f)
\ No newline at end of file
+        parser.parse(f)
+
+
+def test_eml_structured_fields(tmp_path):
+    f = tmp_path / "rfi.eml"
+    msg = EmailMessage()
+    msg["Subject"] = "RFI 12: Pile cap reinforcement"
+    msg["From"] = "site@contractor.com"
+    msg["Date"] = "Tue, 06 Jan 2026 09:30:00 +0000"
+    msg.set_content("Please confirm bar sizes.")
+    f.write_bytes(msg.as_bytes())
+
+    parsed = EmailFileParser().extract(f)
+    assert parsed.subject == "RFI 12: Pile cap reinforcement"
+    assert parsed.sender == "site@contractor.com"
+    assert parsed.date.year == 2026
+    assert "Please confirm bar sizes." in parsed.body
+    assert parsed.size == f.stat().st_size
+
+def test_registry_resolves_by_suffix(tmp_path):
+    assert isinstance(get_parser(Path("a.TXT")), TextFileParser)
+    assert isinstance(get_parser(Path("a.msg")), EmailFileParser)
+    assert get_parser(Path("a.pdf")) is None
+
+    f = tmp_path / "note.txt"
+    f.write_text("Hello")
+    parsed = parse_file(f)
+    assert parsed.subject == "note.txt"
+    assert parsed.body == "Hello"
+
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        parse_file(tmp_path / "drawing.pdf")
+
+def test_register_custom_parser(tmp_path):
+    class CsvParser(FileParser):
+        suffixes = (".csv",)
+
+        def parse(self, file_path):
+            return file_path.read_text().replace(",", " ")
+
+    register_parser(CsvParser)
+    f = tmp_path / "schedule.csv"
+    f.write_text("beam,B1")
+    assert parse_file(f).body == "beam B1"
+
+    from backend.utils import parsers
+    parsers._registry.pop(".csv")
+
+def test_truncate_text_keeps_head_and_tail():
+    text = "A" * 100 + "B" * 100
+    short, truncated = truncate_text(text, 40)
+    assert truncated
+    assert short.startswith("A" * 30) and short.endswith("B" * 10)
+    assert "[... 160 characters omitted ...]" in short
+    assert truncate_text("short", 40) == ("short", False)
+
+def test_budget_truncates_any_parser(tmp_path):
+    f = tmp_path / "long.txt"
+    f.write_text("x" * 500)
+    parsed = parse_file(f, ExtractionBudget(max_chars=100))
+    assert parsed.truncated
+    assert parsed.original_chars == 500
+    assert parsed.body.count("x") == 100
+
+def test_large_text_file_is_memory_mapped(tmp_path):
+    f = tmp_path / "log.txt"
+    f.write_text("START " + "y" * 10000 + " END")
+    budget = ExtractionBudget(max_chars=200, mmap_min_bytes=1024)
+    with patch.object(TextFileParser, "parse", side_effect=AssertionError("read in full")):
+        parsed = parse_file(f, budget)
+    assert parsed.truncated
+    assert parsed.body.startswith("START") and parsed.body.endswith("END")
+    assert parsed.body.count("y") < 200
+
+def test_eml_skips_attachments_past_byte_budget(tmp_path):
+    msg = EmailMessage()
+    msg["Subject"] = "Site photos"
+    msg.set_content("Please review the attached photos.")
+    msg.add_attachment(b"\x00" * 200000, maintype="image", subtype="jpeg", filename="a.jpg")
+    f = tmp_path / "photos.eml"
+    f.write_bytes(msg.as_bytes())
+
+    parsed = parse_file(f, ExtractionBudget(max_bytes=4096))
+    assert "Please review the attached photos." in parsed.body
+    assert parsed.truncated
+    assert parsed.original_chars == f.stat().st_size
+
+@pytest.mark.parametrize("budget", [None, ExtractionBudget(max_bytes=4096)])
+def test_small_eml_with_bom_is_not_truncated(tmp_path, budget):
+    msg = EmailMessage()
+    msg["Subject"] = "Pile caps"
+    msg.set_content("Please confirm bar sizes.")
+    f = tmp_path / "bom.eml"
+    f.write_bytes(b"\xef\xbb\xbf" + msg.as_bytes())
+
+    parsed = parse_file(f, budget)
+    assert parsed.subject == "Pile caps"
+    assert "Please confirm bar sizes." in parsed.body
+    assert not parsed.truncated
+    assert "Please confirm bar sizes." in EmailFileParser().parse(f)
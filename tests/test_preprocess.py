@@ -0,0 +1,50 @@
+from backend.core.preprocess import clean_content, estimate_tokens, prepare_content
+
+RFI_THREAD = """Hi Jane,
+
+Please confirm the rebar spacing for the pile caps at grid C4 by Friday.
+
+Kind regards,
+Bob Smith
+Site Engineer | Acme Construction
++44 20 7946 0000
+
+This email and any attachments are confidential and intended solely for the addressee.
+
+From: Jane Doe <jane@example.com>
+Sent: Monday, 3 March 2025 09:12
+To: Bob Smith <bob@example.com>
+Subject: RE: RFI-042 pile caps
+
+> Can you send the revised drawings?
+> Thanks
+"""
+
+def test_strips_reply_chain_signature_and_disclaimer():
+    cleaned = clean_content(RFI_THREAD)
+    assert "rebar spacing" in cleaned
+    assert cleaned.endswith("Kind regards,")
+    assert "confidential" not in cleaned
+    assert "revised drawings" not in cleaned
+
+def test_strips_gmail_quote_and_mobile_footer():
+    text = "Approved, go ahead.\nSent from my iPhone\n\nOn Tue, 4 Mar 2025 at 10:00, Jane Doe <jane@example.com> wrote:\n> Can we pour on Thursday?"
+    assert clean_content(text) == "Approved, go ahead."
+
+def test_leading_header_block_is_kept():
+    text = "From: Jane Doe\nSent: Monday\nTo: Bob\nSubject: Slab pour\n\nPour moved to Thursday."
+    assert "Pour moved to Thursday." in clean_content(text)
+
+def test_all_quoted_email_falls_back_to_original():
+    text = "> Only quoted text here"
+    assert clean_content(text) == text
+
+def test_prepare_content_reports_token_estimates():
+    prepared = prepare_content(RFI_THREAD, enabled=True)
+    assert prepared.tokens_before == estimate_tokens(RFI_THREAD)
+    assert prepared.tokens_after < prepared.tokens_before
+    assert prepared.reduction > 0.4
+
+    unchanged = prepare_content(RFI_THREAD, enabled=False)
+    assert unchanged.text == RFI_THREAD
+    assert unchanged.reduction == 0.0
@@ -0,0 +1,56 @@
+import asyncio
+import time
+import pytest
+from backend.core.readiness import FileReadinessTracker
+
+@pytest.mark.asyncio
+async def test_small_file_is_ready_quickly(tmp_path):
+    f = tmp_path / "note.txt"
+    f.write_text("Please review drawing S-101.")
+
+    tracker = FileReadinessTracker(initial_delay=0.01, max_delay=0.1, timeout=5)
+    start = time.monotonic()
+    assert await tracker.wait_until_ready(f) is True
+    assert time.monotonic() - start < 0.5
+
+@pytest.mark.asyncio
+async def test_waits_while_file_is_growing(tmp_path):
+    f = tmp_path / "big.msg"
+    f.write_bytes(b"x")
+
+    async def writer():
+        for _ in range(5):
+            await asyncio.sleep(0.005)
+            with open(f, "ab") as fh:
+                fh.write(b"x" * 1024)
+
+    tracker = FileReadinessTracker(initial_delay=0.01, max_delay=0.1, timeout=5)
+    write_task = asyncio.create_task(writer())
+    assert await tracker.wait_until_ready(f) is True
+    assert write_task.done()
+    assert f.stat().st_size == 1 + 5 * 1024
+
+@pytest.mark.asyncio
+async def test_close_event_short_circuits_polling(tmp_path):
+    f = tmp_path / "closed.eml"
+    f.write_text("Subject: Test\n\nBody")
+
+    tracker = FileReadinessTracker(initial_delay=10, max_delay=10, timeout=30)
+    tracker.mark_ready(f)
+    assert await asyncio.wait_for(tracker.wait_until_ready(f), timeout=1) is True
+
+@pytest.mark.asyncio
+async def test_forget_discards_stale_event(tmp_path):
+    f = tmp_path / "reused.txt"
+    f.write_text("")
+
+    tracker = FileReadinessTracker(initial_delay=0.01, max_delay=1, timeout=0.05)
+    tracker.mark_ready(f)
+    tracker.forget(f)
+    # An empty file never settles within the timeout
+    assert await tracker.wait_until_ready(f) is False
+
+@pytest.mark.asyncio
+async def test_vanished_file_is_not_ready(tmp_path):
+    tracker = FileReadinessTracker(initial_delay=0.01, timeout=1)
+    assert await tracker.wait_until_ready(tmp_path / "missing.txt") is False
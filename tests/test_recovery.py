@@ -0,0 +1,108 @@
+import pytest
+from backend.core.recovery import BacklogScanner, iter_files
+from backend.core import orchestration
+
+def test_iter_files_recurses(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    sub = tmp_path / "project"
+    sub.mkdir()
+    (sub / "b.eml").write_text("b")
+
+    found = sorted(p.name for p in iter_files(tmp_path))
+    assert found == ["a.txt", "b.eml"]
+
+def test_iter_files_missing_dir(tmp_path):
+    assert list(iter_files(tmp_path / "missing")) == []
+
+@pytest.mark.asyncio
+async def test_scanner_drains_staging_before_inbox(tmp_path):
+    staging = tmp_path / "staging"
+    inbox = tmp_path / "inbox"
+    staging.mkdir()
+    inbox.mkdir()
+    (staging / "orphan.msg").write_text("x")
+    (inbox / "new.txt").write_text("y")
+    (inbox / "dup.txt").write_text("z")
+
+    seen = []
+
+    async def submit(path):
+        seen.append(path.name)
+        return path.name != "dup.txt"
+
+    scanner = BacklogScanner(rate=1000)
+    await scanner.run(submit, [staging, inbox])
+
+    assert seen[0] == "orphan.msg"
+    assert scanner.progress()["scanned"] == 3
+    assert scanner.progress()["submitted"] == 2
+    assert scanner.progress()["skipped"] == 1
+    assert not scanner.is_running
+
+def test_claim_file_keeps_staging_orphans(tmp_path, monkeypatch):
+    monkeypatch.setattr(orchestration, "STAGING_DIR", tmp_path)
+    orphan = tmp_path / "orphan.txt"
+    orphan.write_text("x")
+
+    assert orchestration.claim_file(orphan) == orphan
+    assert orphan.exists()
+
+def test_claim_file_moves_inbox_file(tmp_path, monkeypatch):
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    monkeypatch.setattr(orchestration, "STAGING_DIR", staging)
+    f = tmp_path / "mail.txt"
+    f.write_text("x")
+    (staging / "mail.txt").write_text("older")
+
+    claimed = orchestration.claim_file(f)
+    assert claimed.parent == staging
+    assert claimed.name != "mail.txt"
+    assert not f.exists()
+
+def test_reconcile_jobs(tmp_path, temp_db):
+    from backend.services import db_service
+    from backend.core import recovery
+
+    present = tmp_path / "present.txt"
+    present.write_text("x")
+    interrupted = db_service.enqueue_job(str(present))
+    db_service.claim_job(interrupted, "dead-worker")
+    missing = db_service.enqueue_job(str(tmp_path / "gone.txt"))
+
+    assert recovery.reconcile_jobs() == {"requeued": 1, "missing": 1}
+    assert db_service.get_job(interrupted)["state"] == "QUEUED"
+    assert db_service.get_job(missing)["state"] == "FAILED"
+
+@pytest.mark.asyncio
+async def test_watcher_resubmits_due_retries(tmp_path, temp_db):
+    import asyncio
+    from backend.services import db_service
+    from backend.core.ingestion import IngestionPool
+    from backend.core.watcher import InboxHandler
+
+    mail = tmp_path / "mail.txt"
+    mail.write_text("x")
+    job_id = db_service.enqueue_job(str(mail))
+    handled = []
+
+    async def handle(item):
+        # Stands in for the pipeline, failing every attempt
+        handled.append(item)
+        db_service.claim_job(item[0], "me")
+        db_service.fail_job(item[0], "AI Analysis failed")
+        handler._release(item[1])
+
+    handler = InboxHandler(asyncio.get_running_loop(), IngestionPool(handle, workers=1))
+    await handler.pool.put((job_id, mail))
+    await handler.pool.join()
+    # Not due yet, then retried until fail_job gives up after three attempts
+    assert await handler.submit_due_retries(retry_delay=60) == 0
+    for _ in range(2):
+        assert await handler.submit_due_retries(retry_delay=0) == 1
+        await handler.pool.join()
+
+    assert handled == [(job_id, mail)] * 3
+    assert db_service.get_job(job_id)["state"] == "FAILED"
+    assert await handler.submit_due_retries(retry_delay=0) == 0
+    handler.pool.stop()
@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from backend.core.models import TaskProposal
+from backend.services.ai_service import TaskAnalysisAgent
+from backend.services.retrieval import RegistryIndex, tokenize
+from backend.utils import config
+
+PROJECTS = [
+    {"id": "SB-01", "name": "Suspension Bridge Feasibility", "context": "Cable anchorage and pylon aesthetics"},
+    {"id": "DDU-99", "name": "Downtown Drainage Upgrade", "context": "Stormwater pipe sizing"},
+    {"id": "CE40", "name": "CE40 HSK to LSF", "context": "Tunnel design"},
+    {"id": "RW-07", "name": "Harbour Retaining Wall", "context": "Sheet piles and tie-back anchors"},
+]
+TEAM = [
+    {"name": "Alice", "role": "Bridge Engineer", "duties": ["Cable design"], "projects": ["SB-01"]},
+    {"name": "Bob", "role": "Hydraulic Engineer", "duties": ["Stormwater modelling"], "projects": ["DDU-99"]},
+    {"name": "Cara", "role": "Tunnel Engineer", "duties": ["Segment lining"], "projects": ["CE40", "RW-07"]},
+]
+
+pytestmark = pytest.mark.usefixtures("registry")
+
+@pytest.fixture
+def projects():
+    return PROJECTS
+
+@pytest.fixture
+def team():
+    return TEAM
+
+def test_tokenize_keeps_ids():
+    assert tokenize("Re: SB-01 cable") == ["re", "sb-01", "sb", "01", "cable"]
+
+def test_select_shortlists_projects_and_their_engineers():
+    index = RegistryIndex(top_k=1, min_score=0.5, min_projects=2)
+    selection = index.select("Please review the stormwater pipe sizing for DDU-99.")
+    assert [p["id"] for p in selection.projects] == ["DDU-99"]
+    assert [t["name"] for t in selection.team] == ["Bob"]
+
+def test_falls_back_to_full_list():
+    index = RegistryIndex(top_k=1, min_score=0.5, min_projects=2)
+    assert index.select("Lunch on Friday?") is None
+    assert index.stats()["fallbacks"] == 1
+    # Small registries are never narrowed
+    assert RegistryIndex(min_projects=10).select("DDU-99 stormwater") is None
+
+def test_rebuild_is_incremental():
+    index = RegistryIndex(min_projects=2)
+    index.refresh()
+    assert index.retokenized == 4
+    config.save_projects(PROJECTS[:3] + [{**PROJECTS[3], "context": "Secant piles"}])
+    index.refresh()
+    assert index.rebuilds == 2
+    assert index.retokenized == 5
+
+@pytest.mark.asyncio
+async def test_agent_passes_selection_as_deps():
+    agent_service = TaskAnalysisAgent()
+    agent_service.retrieval = RegistryIndex(top_k=1, min_score=0.5, min_projects=2)
+    result = MagicMock()
+    result.output = TaskProposal(title="Pipe sizing")
+    agent_service.agent.run = AsyncMock(return_value=result)
+
+    await agent_service.analyze_content("Stormwater pipe sizing for DDU-99")
+    selection = agent_service.agent.run.call_args.kwargs["deps"]
+    prompt = agent_service._system_prompt(selection)
+    assert "DDU-99: Downtown Drainage Upgrade" in prompt
+    assert "SB-01" not in prompt
@@ -0,0 +1,152 @@
+import pytest
+from backend.services import db_service, telemetry
+from backend.services.ai_service import TaskAnalysisAgent, format_batch
+from backend.services.telemetry import (
+    SharedScope, TokenBudgetExceeded, UsageScope, UsageTelemetry, usage_scope,
+)
+
+pytestmark = pytest.mark.usefixtures("temp_db", "registry")
+
+@pytest.fixture(autouse=True)
+def fake_env(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY", "fixed:0")
+
+def use_telemetry(monkeypatch, **kwargs) -> UsageTelemetry:
+    instance = UsageTelemetry(**kwargs)
+    monkeypatch.setattr(telemetry, "_telemetry_instance", instance)
+    return instance
+
+def test_usage_summary_by_model_and_project():
+    task_id = db_service.create_task("a.txt", "Subject", "Summary", None, "SB-01", "Alice", "", "PENDING")
+    first = db_service.record_usage("small", "ok", 100, 20, 0, 0.5)
+    second = db_service.record_usage("big", "ok", 300, 50, 2, 1.5)
+    db_service.record_usage("big", "failed", 0, 0, 4, 3.0)
+    db_service.link_usage([first, second], task_id)
+
+    by_model = {row["key"]: row for row in db_service.get_usage_summary("model")}
+    assert by_model["big"]["calls"] == 2
+    assert by_model["big"]["retries"] == 6
+    assert by_model["small"]["total_tokens"] == 120
+
+    by_project = {row["key"]: row for row in db_service.get_usage_summary("project")}
+    assert by_project["SB-01"]["total_tokens"] == 470
+    assert by_project["SB-01"]["tasks"] == 1
+    assert by_project["(none)"]["calls"] == 1
+
+    assert len(db_service.get_usage_summary("hour")) == 1
+    assert db_service.get_tokens_used(3600) == 470
+    with pytest.raises(ValueError):
+        db_service.get_usage_summary("assignee")
+
+def test_batched_usage_is_split_between_emails(monkeypatch):
+    instance = use_telemetry(monkeypatch)
+    first, second = UsageScope(), UsageScope()
+    with usage_scope(SharedScope([first, second])):
+        instance.record("big", "batch", 101, 40, 0, 1.0)
+    assert (first.tokens, second.tokens) == (71, 70)
+    assert len(first.usage_ids) == len(second.usage_ids) == 1
+    assert db_service.get_tokens_used(3600) == 141
+
+def test_calls_outside_a_scope_are_not_stored(monkeypatch):
+    instance = use_telemetry(monkeypatch)
+    instance.record("big", "ok", 100, 20, 0, 1.0)
+    assert db_service.get_usage_summary("model") == []
+
+@pytest.mark.asyncio
+async def test_agent_runs_are_recorded(monkeypatch):
+    use_telemetry(monkeypatch)
+    agent_service = TaskAnalysisAgent(model_name="fake")
+    with usage_scope() as usage:
+        await agent_service.analyze_content("Cable check on SB-01")
+    assert usage.tokens > 0
+    row = db_service.get_usage_summary("model")[0]
+    assert row["key"] == "fake"
+    assert row["total_tokens"] == usage.tokens
+
+@pytest.mark.asyncio
+async def test_email_budget_stops_escalation(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_CONFIDENCE", "0.3")
+    content = "Cable check on SB-01"
+    agent_service = TaskAnalysisAgent(model_name="fake:big", cascade=["fake:small"])
+    estimate = agent_service.estimate_request_tokens(content)
+    use_telemetry(monkeypatch, max_tokens_per_email=estimate + 10)
+
+    with usage_scope():
+        proposal = await agent_service.analyze_content(content)
+    # The small model's low-confidence answer is kept rather than going over budget
+    assert proposal.confidence == 0.3
+    assert agent_service.cascade_stats()["fake:big"]["calls"] == 0
+
+    use_telemetry(monkeypatch, max_tokens_per_email=estimate - 1)
+    with usage_scope(), pytest.raises(TokenBudgetExceeded):
+        await agent_service.analyze_content(content)
+
+@pytest.mark.asyncio
+async def test_hourly_budget_defers_when_exhausted(monkeypatch):
+    db_service.record_usage("big", "ok", 900, 100, 0, 1.0)
+    instance = use_telemetry(monkeypatch, max_tokens_per_hour=1500, max_wait=0)
+    async with instance.reserve(400):
+        pass
+    with pytest.raises(TokenBudgetExceeded):
+        async with instance.reserve(600):
+            pass
+    assert instance.stats()["deferred"] == 1
+
+@pytest.mark.asyncio
+async def test_batch_defers_emails_over_their_budget(monkeypatch):
+    agent_service = TaskAnalysisAgent(model_name="fake")
+    contents = ["Cable check on SB-01", "Anchor bolts on SB-01"]
+    share = agent_service.estimate_request_tokens(format_batch(contents)) // 2
+    single = agent_service.estimate_request_tokens(contents[1], agent_service.retrieval.select(contents[1]))
+    budget = max(share, single) + 10
+    use_telemetry(monkeypatch, max_tokens_per_email=budget)
+
+    # The first email has already used its whole budget
+    spent, fresh = UsageScope(), UsageScope()
+    spent.tokens = budget
+    with usage_scope(SharedScope([spent, fresh])):
+        results = await agent_service.analyze_batch(contents)
+
+    assert isinstance(results[0], TokenBudgetExceeded)
+    assert results[1].project_id
+    assert spent.usage_ids == []
+    assert fresh.tokens > 0
+
+@pytest.mark.asyncio
+async def test_deferred_job_is_retried_once_the_budget_allows(tmp_path, monkeypatch):
+    import asyncio
+    from backend.core import orchestration
+    from backend.core.ingestion import IngestionPool
+    from backend.core.models import TaskProposal
+    from backend.core.readiness import FileReadinessTracker
+    from backend.core.watcher import InboxHandler
+    monkeypatch.setattr(orchestration, "STAGING_DIR", tmp_path / "staging")
+    monkeypatch.setattr(orchestration, "PROCESSED_DIR", tmp_path / "processed")
+
+    async def analyse(content):
+        async with telemetry.get_telemetry().reserve(500):
+            return TaskProposal(title="Check cables", project_id="SB-01", assigned_to="Alice", confidence=0.9)
+    monkeypatch.setattr(orchestration, "analyze_content", analyse)
+
+    mail = tmp_path / "mail.txt"
+    mail.write_text("Please check the cables.")
+    job_id = db_service.enqueue_job(str(mail))
+    handler = InboxHandler(asyncio.get_running_loop(), IngestionPool(workers=1),
+                           readiness=FileReadinessTracker(initial_delay=0.01))
+
+    # The hourly budget is used up, so the file is deferred and its job requeued
+    db_service.record_usage("big", "ok", 1000, 0, 0, 1.0)
+    use_telemetry(monkeypatch, max_tokens_per_hour=1000, max_wait=0)
+    await handler.pool.put((job_id, mail))
+    await handler.pool.join()
+    job = db_service.get_job(job_id)
+    assert (job["state"], job["last_error"][:9]) == ("QUEUED", "Deferred:")
+
+    # Once there is room again, the retry loop picks it up
+    use_telemetry(monkeypatch, max_tokens_per_hour=10000, max_wait=0)
+    assert await handler.submit_due_retries(retry_delay=0) == 1
+    await handler.pool.join()
+    job = db_service.get_job(job_id)
+    assert job["state"] == "DONE"
+    assert db_service.get_task_by_id(job["task_id"])["summary"] == "Check cables"
+    handler.pool.stop()
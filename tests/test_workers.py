@@ -0,0 +1,32 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from backend.core import workers
+from backend.core.readiness import FileReadinessTracker
+
+@pytest.mark.asyncio
+async def test_run_job_prefers_existing_staging_copy(tmp_path):
+    staged = tmp_path / "worker-3" / "mail.eml"
+    staged.parent.mkdir()
+    staged.write_text("Subject: RFI\n\nBody")
+    job = {"id": 7, "source_path": str(tmp_path / "inbox" / "mail.eml"), "staging_path": str(staged)}
+    own_staging = tmp_path / "worker-0"
+
+    with patch.object(workers, "process_file", new=AsyncMock()) as mock_process:
+        await workers._run_job(job, own_staging, FileReadinessTracker(initial_delay=0.01))
+
+    mock_process.assert_awaited_once_with(staged, job_id=7, staging_dir=own_staging)
+
+@pytest.mark.asyncio
+async def test_run_job_fails_vanished_file(tmp_path):
+    job = {"id": 8, "source_path": str(tmp_path / "gone.txt"), "staging_path": None}
+
+    with patch.object(workers, "fail_job") as mock_fail, \
+         patch.object(workers, "process_file", new=AsyncMock()) as mock_process:
+        await workers._run_job(job, tmp_path, FileReadinessTracker(initial_delay=0.01))
+
+    mock_fail.assert_called_once_with(8, "File vanished before processing", retry=False)
+    mock_process.assert_not_awaited()
+
+def test_worker_staging_dirs_are_per_slot():
+    assert workers.worker_staging_dir(0) != workers.worker_staging_dir(1)
+    assert workers.worker_staging_dir(2).name == "worker-2"